@@ -1,52 +1,204 @@
 import { MongoClient } from 'mongodb'
 import { v4 as uuidv4 } from 'uuid'
 import { NextResponse } from 'next/server'
-import bcrypt from 'bcryptjs'
 import jwt from 'jsonwebtoken'
 import OpenAI from 'openai'
 import { Resend } from 'resend'
 import Stripe from 'stripe'
-
-// Initialize OpenAI
+import { findPage, parsePageParams, summaryProjection, InvalidCursorError } from '@/lib/pagination'
+import { bootstrapIndexes, DUPLICATE_KEY } from '@/lib/indexes'
+import { enqueueJob, JobWorker, JOBS_COLLECTION } from '@/lib/jobs'
+import { createBcryptPool, HashQueueFullError } from '@/lib/bcrypt-pool'
+import { createUserCache } from '@/lib/user-cache'
+import { bearerToken, createTokenCache } from '@/lib/auth'
+import { Router } from '@/lib/router'
+import { adminSummary } from '@/lib/admin-summary'
+import { createOpenAIGate, OverloadedError } from '@/lib/concurrency-gate'
+import { createGenerationDedupe } from '@/lib/dedupe'
+import { Gauge, instrumentMongoClient, observeRequest, registry, timeDependency } from '@/lib/metrics'
+import { recordSpan, runWithTiming, serverTimingHeader, timeSpan, withoutTiming } from '@/lib/server-timing'
+import { createWebhookProcessor } from '@/lib/webhook-inbox'
+import { createLogWriter } from '@/lib/log-writer'
+import { createEmailOutboxWorker, EmailProviderError, enqueueEmail, OUTBOX_COLLECTION } from '@/lib/email-outbox'
+import { renderLetterEmail } from '@/lib/email-templates'
+import { collectionVersion, etagMatches, weakEtag } from '@/lib/etag'
+import { DOCUMENT_TYPES_ETAG, DOCUMENT_TYPES_JSON } from '@/lib/document-types'
+
+// Initialize OpenAI (OPENAI_BASE_URL points at a local stand-in for offline benchmarks)
 const openai = new OpenAI({
   apiKey: process.env.OPENAI_API_KEY,
+  baseURL: process.env.OPENAI_BASE_URL || 'https://api.openai.com/v1',
 });
 
+// Bounded concurrency and wait queue for OpenAI calls (OPENAI_MAX_CONCURRENCY, OPENAI_MAX_QUEUE)
+const openaiGate = createOpenAIGate()
+
+// Identical generation requests share one OpenAI call (GENERATION_DEDUPE_TTL_MS)
+const generationDedupe = createGenerationDedupe()
+
 // Initialize Resend
 const resend = new Resend(process.env.RESEND_API_KEY);
 
 // Initialize Stripe
 const stripe = new Stripe(process.env.STRIPE_SECRET_KEY);
 
+// bcrypt runs on worker threads so hashing never blocks the event loop (BCRYPT_WORKERS=0 runs inline)
+const passwordHasher = createBcryptPool()
+
+// User documents cached by id for authenticated routes
+const userCache = createUserCache()
+
+// Verified JWT claims cached by token until expiry
+const tokenCache = createTokenCache()
+
+// Queue gauges exported on /api/metrics alongside route and dependency histograms
+registry.register(new Gauge('ttml_openai_gate', 'OpenAI concurrency gate occupancy', () => {
+  const gate = openaiGate.stats()
+  return [
+    { labels: { state: 'active' }, value: gate.active },
+    { labels: { state: 'queued' }, value: gate.queue_depth }
+  ]
+}))
+
 // MongoDB connection
 let client
 let db
+let connecting
 
 async function connectToMongo() {
-  if (!client) {
-    client = new MongoClient(process.env.MONGO_URL)
-    await client.connect()
-    db = client.db(process.env.DB_NAME)
+  if (!db) {
+    // Share one connection attempt between concurrent first requests. The client, its pool
+    // and the job worker outlive the request that happens to create them, so keep them out
+    // of that request's Server-Timing context.
+    connecting = connecting || withoutTiming(async () => {
+      client = new MongoClient(process.env.MONGO_URL, { monitorCommands: true })
+      instrumentMongoClient(client)
+      await client.connect()
+      const database = client.db(process.env.DB_NAME)
+
+      // Ensure declared indexes once per process without holding up the first request
+      bootstrapIndexes(database).catch(error => {
+        console.error('Index bootstrap failed:', error)
+      })
+
+      if (generationWorker.concurrency > 0) {
+        generationWorker.start()
+      }
+      if (webhookProcessor.concurrency > 0) {
+        webhookProcessor.start()
+      }
+      if (emailWorker.concurrency > 0) {
+        emailWorker.start()
+      }
+
+      return database
+    }).catch(error => {
+      connecting = null
+      throw error
+    })
+    db = await connecting
   }
   return db
 }
 
+// Background worker for queued letter/document generation (GENERATION_WORKERS=0 disables it)
+const generationWorker = new JobWorker({
+  getDb: connectToMongo,
+  handler: runGenerationJob,
+  onFailure: failGenerationJob,
+  concurrency: parseInt(process.env.GENERATION_WORKERS || '2', 10)
+})
+
+// Audit rows are buffered and bulk-inserted off the request path (LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL_MS)
+const logWriter = createLogWriter({ getDb: connectToMongo })
+
+// Outbox sender for letter emails, batched through Resend (EMAIL_WORKERS=0 disables it,
+// RESEND_BASE_URL points at tests/resend_stub.py for offline runs)
+const emailWorker = createEmailOutboxWorker({
+  getDb: connectToMongo,
+  provider: {
+    async send(message) {
+      const { data, error } = await timeDependency('resend', 'emails.send', () => resend.emails.send(message))
+      if (error) throw new EmailProviderError(error)
+      return data
+    },
+    async sendBatch(messages) {
+      const { data, error } = await timeDependency('resend', 'batch.send', () => resend.batch.send(messages))
+      if (error) throw new EmailProviderError(error)
+      return data.data
+    }
+  },
+  onDelivery: (email, status, error) => {
+    logWriter.write('email_logs', {
+      id: uuidv4(),
+      outbox_id: email.id,
+      letter_id: email.letter_id,
+      recipient_email: email.to,
+      sent_at: new Date(),
+      status,
+      ...(error ? { error: error.message } : {})
+    })
+  }
+})
+
+// Background processor for stored Stripe webhook events (WEBHOOK_WORKERS=0 disables it)
+const webhookProcessor = createWebhookProcessor({
+  getDb: connectToMongo,
+  handler: applyStripeEvent
+})
+
 // Helper function to handle CORS
 function handleCORS(response) {
   response.headers.set('Access-Control-Allow-Origin', '*')
   response.headers.set('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization, stripe-signature')
+  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization, stripe-signature, If-None-Match')
   response.headers.set('Access-Control-Allow-Credentials', 'true')
+  response.headers.set('Access-Control-Expose-Headers', 'Server-Timing, ETag')
+  response.headers.set('Timing-Allow-Origin', '*')
+  return response
+}
+
+// Helper function to mark a response as revalidate-on-every-use: browsers and pollers keep
+// the body and send If-None-Match next time
+function withEtag(response, etag) {
+  response.headers.set('ETag', etag)
+  response.headers.set('Cache-Control', 'private, no-cache')
   return response
 }
 
+// Helper function to answer a conditional GET whose ETag still matches
+function notModified(etag) {
+  return handleCORS(withEtag(new NextResponse(null, { status: 304 }), etag))
+}
+
 // Helper function to verify JWT token
 function verifyToken(token) {
-  try {
-    return jwt.verify(token, process.env.JWT_SECRET)
-  } catch (error) {
-    return null
+  return tokenCache.verify(token)
+}
+
+// Helper function to authenticate a request against a route's auth options
+// Returns { decoded } on success (decoded is null for public routes) or { response } to send back
+function authenticate(request, options) {
+  if (!options) {
+    return { decoded: null }
+  }
+  const rule = options === true ? {} : options
+
+  const token = bearerToken(request)
+  if (token === null) {
+    return { response: handleCORS(NextResponse.json({ error: rule.missing || 'Authorization required' }, { status: 401 })) }
   }
+
+  const decoded = verifyToken(token)
+  if (rule.role) {
+    if (!decoded || decoded.role !== rule.role) {
+      return { response: handleCORS(NextResponse.json({ error: rule.forbidden }, { status: 403 })) }
+    }
+  } else if (!decoded) {
+    return { response: handleCORS(NextResponse.json({ error: rule.invalid || 'Invalid authorization token' }, { status: 401 })) }
+  }
+
+  return { decoded }
 }
 
 // Helper function to generate random coupon code
@@ -55,1251 +207,1462 @@ function generateCouponCode() {
 }
 
 // Helper function to log webhook events
-async function logWebhookEvent(db, event, status, error = null) {
-  try {
-    await db.collection('webhook_logs').insertOne({
-      id: uuidv4(),
-      event_id: event.id,
-      event_type: event.type,
-      status: status,
-      error: error,
-      event_data: event.data,
-      timestamp: new Date(),
-      created_at: new Date()
-    })
-  } catch (logError) {
-    console.error('Failed to log webhook event:', logError)
-  }
+function logWebhookEvent(event, status, error = null) {
+  logWriter.write('webhook_logs', {
+    id: uuidv4(),
+    event_id: event.id,
+    event_type: event.type,
+    status: status,
+    error: error,
+    event_data: event.data,
+    timestamp: new Date(),
+    created_at: new Date()
+  })
 }
 
-// OPTIONS handler for CORS
-export async function OPTIONS() {
-  return handleCORS(new NextResponse(null, { status: 200 }))
+// Headers for Server-Sent Events responses
+const SSE_HEADERS = {
+  'Content-Type': 'text/event-stream; charset=utf-8',
+  'Cache-Control': 'no-cache, no-transform',
+  'Connection': 'keep-alive',
+  'X-Accel-Buffering': 'no'
 }
 
-// Route handler function
-async function handleRoute(request, { params }) {
-  const { path = [] } = params
-  const route = `/${path.join('/')}`
-  const method = request.method
+// Helper function to detect clients asking for a Server-Sent Events response
+function wantsEventStream(request) {
+  return (request.headers.get('accept') || '').includes('text/event-stream')
+}
 
+// Helper function to stream a chat completion as Server-Sent Events.
+// Emits `start` immediately, one `token` event per delta, then `done` with the result
+// of onComplete(fullContent) once the completion has been persisted, or `error` after
+// calling onError (used to refund the reserved credit).
+async function streamCompletion(completionParams, { onComplete, onError, errorMessage }) {
+  // Wait for an OpenAI slot before committing to a 200 event stream, so overload is still a 503
+  let release
   try {
-    const db = await connectToMongo()
-
-    // Root endpoint
-    if (route === '/' && method === 'GET') {
-      return handleCORS(NextResponse.json({ 
-        message: "Talk To My Lawyer API is running!",
-        timestamp: new Date().toISOString(),
-        version: "2.0.0"
-      }))
-    }
+    release = await openaiGate.acquire()
+  } catch (error) {
+    if (onError) await onError(error)
+    throw error
+  }
+
+  const encoder = new TextEncoder()
+  let closed = false
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event, data) => {
+        if (closed) return
+        try {
+          controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`))
+        } catch (error) {
+          closed = true
+        }
+      }
+
+      send('start', { timestamp: new Date().toISOString() })
 
-    // Health check endpoint
-    if (route === '/health' && method === 'GET') {
       try {
-        // Test database connection
-        await db.admin().ping()
-        return handleCORS(NextResponse.json({ 
-          status: "healthy",
-          database: "connected",
-          timestamp: new Date().toISOString()
-        }))
+        const generatedContent = await timeDependency('openai', 'chat.completions.stream', async () => {
+          const completion = await openai.chat.completions.create({ ...completionParams, stream: true })
+          let content = ''
+          for await (const chunk of completion) {
+            const token = chunk.choices[0]?.delta?.content
+            if (token) {
+              content += token
+              send('token', { content: token })
+            }
+          }
+          return content
+        })
+
+        // Persist even if the client went away mid-stream; the credit has been reserved
+        send('done', await onComplete(generatedContent))
       } catch (error) {
-        return handleCORS(NextResponse.json({ 
-          status: "unhealthy",
-          database: "disconnected",
-          timestamp: new Date().toISOString()
-        }, { status: 503 }))
+        console.error('OpenAI API Error:', error)
+        if (onError) {
+          await onError(error).catch(refundError => console.error('Credit refund failed:', refundError))
+        }
+        send('error', { error: errorMessage, ai_service_error: true })
+      } finally {
+        release()
+        if (!closed) {
+          closed = true
+          controller.close()
+        }
       }
+    },
+    cancel() {
+      closed = true
     }
+  })
 
-    // AUTH ROUTES
-    // Register - POST /api/auth/register
-    if (route === '/auth/register' && method === 'POST') {
-      const { email, password, name, role = 'user' } = await request.json()
-      
-      // Validation
-      if (!email || !password || !name) {
-        return handleCORS(NextResponse.json({ error: 'All fields are required' }, { status: 400 }))
-      }
-
-      if (password.length < 6) {
-        return handleCORS(NextResponse.json({ error: 'Password must be at least 6 characters' }, { status: 400 }))
-      }
+  return handleCORS(new NextResponse(stream, { headers: SSE_HEADERS }))
+}
 
-      // Check if user already exists
-      const existingUser = await db.collection('users').findOne({ email: email.toLowerCase() })
-      if (existingUser) {
-        return handleCORS(NextResponse.json({ error: 'User already exists with this email' }, { status: 400 }))
-      }
+// Helper function to answer a resubmitted generation with the first request's result,
+// as JSON or as a complete event stream depending on what the client asked for
+function duplicateGenerationResponse(request, kind, payload) {
+  const result = { ...payload, deduplicated: true }
+  if (!wantsEventStream(request)) {
+    return handleCORS(NextResponse.json(result))
+  }
 
-      // Hash password
-      const hashedPassword = await bcrypt.hash(password, 12)
-      
-      // Create user
-      const user = {
-        id: uuidv4(),
-        email: email.toLowerCase(),
-        password: hashedPassword,
-        name: name.trim(),
-        role,
-        subscription: {
-          status: 'free',
-          planId: null,
-          packageType: null,
-          lettersRemaining: 0,
-          currentPeriodEnd: null
-        },
-        stripeCustomerId: null,
-        isActive: true,
-        created_at: new Date(),
-        updated_at: new Date()
-      }
+  const events = [
+    ['start', { timestamp: new Date().toISOString() }],
+    ['token', { content: payload[kind].content }],
+    ['done', result]
+  ]
+  const body = events.map(([event, data]) => `event: ${event}\ndata: ${JSON.stringify(data)}\n\n`).join('')
+  return handleCORS(new NextResponse(body, { headers: SSE_HEADERS }))
+}
 
-      await db.collection('users').insertOne(user)
-
-      // Create role-specific profile
-      if (role === 'contractor') {
-        // Create contractor profile with username as referral code
-        const universalCode = generateCouponCode()
-        
-        await db.collection('contractors').insertOne({
-          id: uuidv4(),
-          user_id: user.id,
-          points: 0,
-          total_signups: 0,
-          username: user.name.toLowerCase().replace(/\s+/g, '').substring(0, 5), // 5 chars max
-          created_at: new Date()
-        })
-      } else if (role === 'admin') {
-        await db.collection('admins').insertOne({
-          id: uuidv4(),
-          user_id: user.id,
-          permissions: ['manage_users', 'manage_contractors', 'manage_letters'],
-          created_at: new Date()
-        })
-      }
+// Helper function to atomically take one letter credit from a paid user.
+// Returns the updated user, or null when the user is missing, unpaid or out of credits.
+async function reserveCredit(db, userId) {
+  const user = await db.collection('users').findOneAndUpdate(
+    { id: userId, 'subscription.status': 'paid', 'subscription.lettersRemaining': { $gt: 0 } },
+    {
+      $inc: { 'subscription.lettersRemaining': -1 },
+      $set: { updated_at: new Date() }
+    },
+    { returnDocument: 'after', projection: { _id: 0, id: 1, subscription: 1 } }
+  )
+  userCache.invalidate(userId)
+  return user
+}
 
-      const token = jwt.sign({ 
-        userId: user.id, 
-        email: user.email, 
-        role: user.role 
-      }, process.env.JWT_SECRET, { expiresIn: '7d' })
-      
-      return handleCORS(NextResponse.json({ 
-        user: { 
-          id: user.id, 
-          email: user.email, 
-          name: user.name, 
-          role: user.role, 
-          subscription: user.subscription 
-        },
-        token,
-        message: 'Registration successful with 20% discount applied!'
-      }))
+// Helper function to give back a credit taken by reserveCredit when generation fails
+async function refundCredit(db, userId) {
+  await db.collection('users').updateOne(
+    { id: userId },
+    {
+      $inc: { 'subscription.lettersRemaining': 1 },
+      $set: { updated_at: new Date() }
     }
+  )
+  userCache.invalidate(userId)
+}
 
-    // Register with coupon - POST /api/auth/register-with-coupon
-    if (route === '/auth/register-with-coupon' && method === 'POST') {
-      const { email, password, name, role = 'user', coupon_code } = await request.json()
-      
-      if (!email || !password || !name) {
-        return handleCORS(NextResponse.json({ error: 'Email, password, and name are required' }, { status: 400 }))
-      }
-      
-      if (!coupon_code) {
-        return handleCORS(NextResponse.json({ error: 'Coupon code is required' }, { status: 400 }))
-      }
-
-      // Check if user already exists
-      const existingUser = await db.collection('users').findOne({ 
-        email: email.toLowerCase() 
-      })
-      
-      if (existingUser) {
-        return handleCORS(NextResponse.json({ error: 'User already exists' }, { status: 400 }))
-      }
+// Helper function to detect clients asking for a 202 + job id instead of waiting
+function prefersAsync(request) {
+  return (request.headers.get('prefer') || '').includes('respond-async')
+}
 
-      // Validate coupon code (Remote Employee username)
-      const contractor = await db.collection('contractors').findOne({ username: coupon_code })
-      if (!contractor) {
-        return handleCORS(NextResponse.json({ error: 'Invalid referral code' }, { status: 400 }))
-      }
+// Helper function to store a placeholder letter/document and queue its generation
+// The caller has already reserved a credit; it is refunded if the job cannot be queued
+async function queueGeneration(db, { kind, collection, placeholder, completionParams }) {
+  let job
+  try {
+    await db.collection(collection).insertOne(placeholder)
+    job = await enqueueJob(db, {
+      kind,
+      userId: placeholder.user_id,
+      targetId: placeholder.id,
+      payload: { completionParams, credit_reserved: true }
+    })
+  } catch (error) {
+    await refundCredit(db, placeholder.user_id)
+    throw error
+  }
+  generationWorker.kick()
+
+  return handleCORS(NextResponse.json({
+    job_id: job.id,
+    status: job.status,
+    status_url: `/api/jobs/${job.id}`,
+    [kind]: { ...placeholder, _id: undefined }
+  }, { status: 202 }))
+}
 
-      // Create user with 20% discount
-      const hashedPassword = await bcrypt.hash(password, 10)
-      const user = {
-        id: uuidv4(),
-        email: email.toLowerCase(),
-        password: hashedPassword,
-        name,
-        role,
-        subscription: { 
-          status: 'free',
-          discount_percent: 20,
-          referred_by: contractor.user_id
-        },
-        isActive: true,
-        created_at: new Date(),
+// Worker handler: generate the content for a queued job and complete its letter/document
+async function runGenerationJob(db, job) {
+  const collection = job.kind === 'document' ? 'documents' : 'letters'
+
+  await db.collection(collection).updateOne(
+    { id: job.target_id },
+    { $set: { status: 'generating', stage: 2, updated_at: new Date() } }
+  )
+
+  const completion = await openaiGate.run(() => timeDependency('openai', 'chat.completions.create', () => (
+    openai.chat.completions.create(job.payload.completionParams, { timeout: 120000 })
+  )))
+  const generatedContent = completion.choices[0].message.content
+
+  await db.collection(collection).updateOne(
+    { id: job.target_id },
+    {
+      $set: {
+        content: generatedContent,
+        status: 'ready',
+        stage: 4, // Ready to send
+        professional_generated: true,
         updated_at: new Date()
       }
+    }
+  )
+
+  // Jobs queued before credits were reserved up front still pay on completion
+  if (!job.payload.credit_reserved) {
+    await db.collection('users').updateOne(
+      { id: job.user_id },
+      {
+        $inc: { 'subscription.lettersRemaining': -1 },
+        $set: { updated_at: new Date() }
+      }
+    )
+    userCache.invalidate(job.user_id)
+  }
+
+  return { target_id: job.target_id }
+}
 
-      await db.collection('users').insertOne(user)
+async function failGenerationJob(db, job, error) {
+  const collection = job.kind === 'document' ? 'documents' : 'letters'
+  await db.collection(collection).updateOne(
+    { id: job.target_id },
+    { $set: { status: 'failed', error: error.message, updated_at: new Date() } }
+  )
+  if (job.payload.credit_reserved) {
+    await refundCredit(db, job.user_id)
+  }
+}
 
-      // Update contractor stats
-      await db.collection('contractors').updateOne(
-        { id: contractor.id },
-        { 
-          $inc: { 
-            points: 1,
-            total_signups: 1
-          },
-          $set: { updated_at: new Date() }
+// Webhook processor handler: apply one stored Stripe event. Throwing schedules a retry.
+async function applyStripeEvent(db, event) {
+  try {
+    switch (event.type) {
+      case 'checkout.session.completed':
+        const session = event.data.object
+        const { userId, packageType } = session.metadata
+
+        if (!userId || !packageType) {
+          throw new Error('Missing metadata in checkout session')
         }
-      )
 
-      const token = jwt.sign({ 
-        userId: user.id, 
-        email: user.email, 
-        role: user.role 
-      }, process.env.JWT_SECRET, { expiresIn: '7d' })
-      
-      return handleCORS(NextResponse.json({ 
-        user: { 
-          id: user.id, 
-          email: user.email, 
-          name: user.name, 
-          role: user.role, 
-          subscription: user.subscription 
-        },
-        token,
-        message: 'Registration successful with 20% discount applied!'
-      }))
-    }
+        // Update user subscription
+        let lettersCount = packageType === '4letters' ? 4 : 
+                         packageType === '6letters' ? 6 : 8
 
-    // Validate coupon - POST /api/coupons/validate
-    if (route === '/coupons/validate' && method === 'POST') {
-      const { coupon_code } = await request.json()
-      
-      if (!coupon_code) {
-        return handleCORS(NextResponse.json({ error: 'Referral code is required' }, { status: 400 }))
-      }
+        const updateResult = await db.collection('users').updateOne(
+          { id: userId },
+          { 
+            $set: {
+              'subscription.status': 'paid',
+              'subscription.planId': session.payment_intent,
+              'subscription.packageType': packageType,
+              'subscription.lettersRemaining': lettersCount,
+              'subscription.currentPeriodEnd': new Date(Date.now() + 365 * 24 * 60 * 60 * 1000), // 1 year from now
+              updated_at: new Date()
+            }
+          }
+        )
 
-      const contractor = await db.collection('contractors').findOne({ username: coupon_code })
-      if (!contractor) {
-        return handleCORS(NextResponse.json({ 
-          valid: false, 
-          error: 'Invalid referral code' 
-        }, { status: 400 }))
-      }
+        userCache.invalidate(userId)
 
-      return handleCORS(NextResponse.json({ 
-        valid: true,
-        discount_percent: 20,
-        message: 'Valid referral code - 20% discount will be applied'
-      }))
-    }
+        if (updateResult.matchedCount === 0) {
+          throw new Error(`User not found: ${userId}`)
+        }
 
-    // Login - POST /api/auth/login
-    if (route === '/auth/login' && method === 'POST') {
-      const { email, password } = await request.json()
-      
-      if (!email || !password) {
-        return handleCORS(NextResponse.json({ error: 'Email and password are required' }, { status: 400 }))
-      }
-      
-      const user = await db.collection('users').findOne({ 
-        email: email.toLowerCase(),
-        isActive: true
-      })
-      
-      if (!user || !await bcrypt.compare(password, user.password)) {
-        return handleCORS(NextResponse.json({ error: 'Invalid email or password' }, { status: 401 }))
-      }
+        // Update payment session status
+        await db.collection('payment_sessions').updateOne(
+          { stripe_session_id: session.id },
+          { 
+            $set: { 
+              status: 'completed',
+              completed_at: new Date(),
+              updated_at: new Date()
+            }
+          }
+        )
 
-      // Update last login
-      await db.collection('users').updateOne(
-        { id: user.id },
-        { $set: { lastLogin: new Date(), updated_at: new Date() } }
-      )
+        logWebhookEvent(event, 'success')
+        console.log(`Successfully processed payment for user ${userId}`)
+        break
+
+      case 'payment_intent.payment_failed':
+        const paymentIntent = event.data.object
+        const failedUserId = paymentIntent.metadata?.userId
+
+        if (failedUserId) {
+          await db.collection('payment_sessions').updateOne(
+            { user_id: failedUserId },
+            { 
+              $set: { 
+                status: 'failed',
+                failed_at: new Date(),
+                updated_at: new Date()
+              }
+            }
+          )
+        }
 
-      const token = jwt.sign({ 
-        userId: user.id, 
-        email: user.email, 
-        role: user.role 
-      }, process.env.JWT_SECRET, { expiresIn: '7d' })
-      
-      return handleCORS(NextResponse.json({ 
-        user: { 
-          id: user.id, 
-          email: user.email, 
-          name: user.name, 
-          role: user.role, 
-          subscription: user.subscription || { status: 'free' }
-        },
-        token,
-        message: 'Login successful!'
-      }))
-    }
+        logWebhookEvent(event, 'processed')
+        console.log(`Payment failed for user ${failedUserId}`)
+        break
 
-    // Get current user - GET /api/auth/me
-    if (route === '/auth/me' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'No authorization token provided' }, { status: 401 }))
-      }
+      default:
+        logWebhookEvent(event, 'unhandled')
+        console.log(`Unhandled event type: ${event.type}`)
+    }
+  } catch (error) {
+    logWebhookEvent(event, 'error', error.message)
+    throw error
+  }
+}
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid or expired token' }, { status: 401 }))
-      }
+// OPTIONS handler for CORS
+export async function OPTIONS() {
+  return handleCORS(new NextResponse(null, { status: 200 }))
+}
 
-      const user = await db.collection('users').findOne({ 
-        id: decoded.userId,
-        isActive: true
-      })
-      
-      if (!user) {
-        return handleCORS(NextResponse.json({ error: 'User not found or deactivated' }, { status: 404 }))
-      }
+// API routes, compiled into a dispatch table once at module load.
+// `auth: true` requires a valid bearer token; `auth: { role }` also requires that role.
+// `db: false` serves the route without connecting to MongoDB.
+const router = new Router()
 
-      return handleCORS(NextResponse.json({ 
-        user: { 
-          id: user.id, 
-          email: user.email, 
-          name: user.name, 
-          role: user.role, 
-          subscription: user.subscription || { status: 'free' }
-        }
-      }))
-    }
 
-    // STRIPE SUBSCRIPTION ROUTES
-    // Create subscription checkout session - POST /api/subscription/create-checkout
-    if (route === '/subscription/create-checkout' && method === 'POST') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+// Root endpoint
+router.get('/', async () => {
+  return handleCORS(NextResponse.json({ 
+    message: "Talk To My Lawyer API is running!",
+    timestamp: new Date().toISOString(),
+    version: "2.0.0"
+  }))
+})
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid authorization token' }, { status: 401 }))
-      }
+// Health check endpoint
+router.get('/health', async ({ db }) => {
+  try {
+    // Test database connection
+    await db.admin().ping()
+    return handleCORS(NextResponse.json({ 
+      status: "healthy",
+      database: "connected",
+      password_hashing: passwordHasher.stats(),
+      user_cache: userCache.stats(),
+      token_cache: tokenCache.stats(),
+      openai_gate: openaiGate.stats(),
+      generation_dedupe: generationDedupe.stats(),
+      generation_jobs: generationWorker.stats(),
+      webhook_inbox: webhookProcessor.stats(),
+      log_writer: logWriter.stats(),
+      email_outbox: emailWorker.stats(),
+      timestamp: new Date().toISOString()
+    }))
+  } catch (error) {
+    return handleCORS(NextResponse.json({ 
+      status: "unhealthy",
+      database: "disconnected",
+      timestamp: new Date().toISOString()
+    }, { status: 503 }))
+  }
+})
 
-      const { packageType } = await request.json()
-      
-      if (!packageType || !['4letters', '6letters', '8letters'].includes(packageType)) {
-        return handleCORS(NextResponse.json({ error: 'Invalid package type' }, { status: 400 }))
-      }
-      
-      const user = await db.collection('users').findOne({ id: decoded.userId })
-      if (!user) {
-        return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
-      }
+// Prometheus metrics - GET /api/metrics (bearer METRICS_TOKEN when set)
+router.get('/metrics', async ({ request }) => {
+  const token = process.env.METRICS_TOKEN
+  if (token && bearerToken(request) !== token) {
+    return handleCORS(NextResponse.json({ error: 'Invalid metrics token' }, { status: 401 }))
+  }
 
-      try {
-        // Create or get Stripe customer
-        let stripeCustomerId = user.stripeCustomerId
-        if (!stripeCustomerId) {
-          const customer = await stripe.customers.create({
-            email: user.email,
-            name: user.name,
-            metadata: {
-              userId: user.id
-            }
-          })
-          stripeCustomerId = customer.id
-          await db.collection('users').updateOne(
-            { id: decoded.userId },
-            { $set: { stripeCustomerId, updated_at: new Date() } }
-          )
-        }
+  return handleCORS(new NextResponse(registry.render(), {
+    headers: { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' }
+  }))
+}, { db: false })
 
-        const packageDetails = {
-          '4letters': { amount: 19999, name: '4 Letters Package' },
-          '6letters': { amount: 49999, name: '6 Letters Package' },
-          '8letters': { amount: 99999, name: '8 Letters Package' }
-        }
+// AUTH ROUTES
+// Helper function to insert a user; false when the unique email index rejects it
+async function insertNewUser(db, user) {
+  try {
+    await db.collection('users').insertOne(user)
+    return true
+  } catch (error) {
+    if (error.code === DUPLICATE_KEY) return false
+    throw error
+  }
+}
 
-        // Create checkout session
-        const session = await stripe.checkout.sessions.create({
-          mode: 'payment',
-          payment_method_types: ['card'],
-          line_items: [{
-            price_data: {
-              currency: 'usd',
-              product_data: {
-                name: packageDetails[packageType].name,
-                description: `Professional legal letters - ${packageType.replace('letters', ' letters')}`,
-                metadata: {
-                  packageType: packageType
-                }
-              },
-              unit_amount: packageDetails[packageType].amount
-            },
-            quantity: 1
-          }],
-          customer: stripeCustomerId,
-          success_url: `${process.env.NEXT_PUBLIC_BASE_URL}?session_id={CHECKOUT_SESSION_ID}&success=true`,
-          cancel_url: `${process.env.NEXT_PUBLIC_BASE_URL}?canceled=true`,
-          metadata: {
-            userId: decoded.userId,
-            packageType: packageType
-          },
-          payment_intent_data: {
-            metadata: {
-              userId: decoded.userId,
-              packageType: packageType
-            }
-          }
-        })
+// Register - POST /api/auth/register
+router.post('/auth/register', async ({ request, db }) => {
+  const { email, password, name, role = 'user' } = await request.json()
 
-        // Log the checkout session creation
-        await db.collection('payment_sessions').insertOne({
-          id: uuidv4(),
-          user_id: decoded.userId,
-          stripe_session_id: session.id,
-          package_type: packageType,
-          amount: packageDetails[packageType].amount,
-          status: 'created',
-          created_at: new Date()
-        })
+  // Validation
+  if (!email || !password || !name) {
+    return handleCORS(NextResponse.json({ error: 'All fields are required' }, { status: 400 }))
+  }
 
-        return handleCORS(NextResponse.json({ 
-          sessionId: session.id,
-          url: session.url
-        }))
-      } catch (error) {
-        console.error('Stripe Checkout Error:', error)
-        return handleCORS(NextResponse.json({ 
-          error: 'Failed to create checkout session. Please try again.' 
-        }, { status: 500 }))
-      }
-    }
+  if (password.length < 6) {
+    return handleCORS(NextResponse.json({ error: 'Password must be at least 6 characters' }, { status: 400 }))
+  }
 
-    // Stripe webhook - POST /api/webhooks/stripe
-    if (route === '/webhooks/stripe' && method === 'POST') {
-      const body = await request.text()
-      const sig = request.headers.get('stripe-signature')
-      
-      if (!sig) {
-        console.error('Missing stripe-signature header')
-        return handleCORS(NextResponse.json({ error: 'Missing signature' }, { status: 400 }))
-      }
+  // Check if user already exists
+  const existingUser = await db.collection('users').findOne({ email: email.toLowerCase() })
+  if (existingUser) {
+    return handleCORS(NextResponse.json({ error: 'User already exists with this email' }, { status: 400 }))
+  }
 
-      let event
-      try {
-        // Verify webhook signature if webhook secret is available
-        if (process.env.STRIPE_WEBHOOK_SECRET && process.env.STRIPE_WEBHOOK_SECRET !== 'whsec_placeholder') {
-          event = stripe.webhooks.constructEvent(body, sig, process.env.STRIPE_WEBHOOK_SECRET)
-        } else {
-          // For development, parse the event without verification
-          event = JSON.parse(body)
-          console.warn('Webhook signature verification skipped - using development mode')
-        }
-      } catch (err) {
-        console.error('Webhook signature verification failed:', err.message)
-        await logWebhookEvent(db, { id: 'unknown', type: 'signature_verification_failed' }, 'failed', err.message)
-        return handleCORS(NextResponse.json({ error: 'Webhook signature verification failed' }, { status: 400 }))
-      }
+  // Hash password
+  const hashedPassword = await timeSpan('auth.hash', () => passwordHasher.hash(password, 12))
+
+  // Create user
+  const user = {
+    id: uuidv4(),
+    email: email.toLowerCase(),
+    password: hashedPassword,
+    name: name.trim(),
+    role,
+    subscription: {
+      status: 'free',
+      planId: null,
+      packageType: null,
+      lettersRemaining: 0,
+      currentPeriodEnd: null
+    },
+    stripeCustomerId: null,
+    isActive: true,
+    created_at: new Date(),
+    updated_at: new Date()
+  }
 
-      console.log(`Received webhook event: ${event.type}`)
+  // A concurrent registration for the same email can pass the check above; the unique index decides
+  if (!await insertNewUser(db, user)) {
+    return handleCORS(NextResponse.json({ error: 'User already exists with this email' }, { status: 400 }))
+  }
 
-      try {
-        switch (event.type) {
-          case 'checkout.session.completed':
-            const session = event.data.object
-            const { userId, packageType } = session.metadata
-            
-            if (!userId || !packageType) {
-              throw new Error('Missing metadata in checkout session')
-            }
-            
-            // Update user subscription
-            let lettersCount = packageType === '4letters' ? 4 : 
-                             packageType === '6letters' ? 6 : 8
-            
-            const updateResult = await db.collection('users').updateOne(
-              { id: userId },
-              { 
-                $set: {
-                  'subscription.status': 'paid',
-                  'subscription.planId': session.payment_intent,
-                  'subscription.packageType': packageType,
-                  'subscription.lettersRemaining': lettersCount,
-                  'subscription.currentPeriodEnd': new Date(Date.now() + 365 * 24 * 60 * 60 * 1000), // 1 year from now
-                  updated_at: new Date()
-                }
-              }
-            )
+  // Create role-specific profile
+  if (role === 'contractor') {
+    // Create contractor profile with username as referral code
+    const universalCode = generateCouponCode()
 
-            if (updateResult.matchedCount === 0) {
-              throw new Error(`User not found: ${userId}`)
-            }
+    await db.collection('contractors').insertOne({
+      id: uuidv4(),
+      user_id: user.id,
+      points: 0,
+      total_signups: 0,
+      username: user.name.toLowerCase().replace(/\s+/g, '').substring(0, 5), // 5 chars max
+      created_at: new Date()
+    })
+  } else if (role === 'admin') {
+    await db.collection('admins').insertOne({
+      id: uuidv4(),
+      user_id: user.id,
+      permissions: ['manage_users', 'manage_contractors', 'manage_letters'],
+      created_at: new Date()
+    })
+  }
 
-            // Update payment session status
-            await db.collection('payment_sessions').updateOne(
-              { stripe_session_id: session.id },
-              { 
-                $set: { 
-                  status: 'completed',
-                  completed_at: new Date(),
-                  updated_at: new Date()
-                }
-              }
-            )
-
-            await logWebhookEvent(db, event, 'success')
-            console.log(`Successfully processed payment for user ${userId}`)
-            break
-
-          case 'payment_intent.payment_failed':
-            const paymentIntent = event.data.object
-            const failedUserId = paymentIntent.metadata?.userId
-            
-            if (failedUserId) {
-              await db.collection('payment_sessions').updateOne(
-                { user_id: failedUserId },
-                { 
-                  $set: { 
-                    status: 'failed',
-                    failed_at: new Date(),
-                    updated_at: new Date()
-                  }
-                }
-              )
-            }
+  const token = jwt.sign({ 
+    userId: user.id, 
+    email: user.email, 
+    role: user.role 
+  }, process.env.JWT_SECRET, { expiresIn: '7d' })
+
+  return handleCORS(NextResponse.json({ 
+    user: { 
+      id: user.id, 
+      email: user.email, 
+      name: user.name, 
+      role: user.role, 
+      subscription: user.subscription 
+    },
+    token,
+    message: 'Registration successful with 20% discount applied!'
+  }))
+})
+
+// Register with coupon - POST /api/auth/register-with-coupon
+router.post('/auth/register-with-coupon', async ({ request, db }) => {
+  const { email, password, name, role = 'user', coupon_code } = await request.json()
+
+  if (!email || !password || !name) {
+    return handleCORS(NextResponse.json({ error: 'Email, password, and name are required' }, { status: 400 }))
+  }
 
-            await logWebhookEvent(db, event, 'processed')
-            console.log(`Payment failed for user ${failedUserId}`)
-            break
+  if (!coupon_code) {
+    return handleCORS(NextResponse.json({ error: 'Coupon code is required' }, { status: 400 }))
+  }
 
-          default:
-            await logWebhookEvent(db, event, 'unhandled')
-            console.log(`Unhandled event type: ${event.type}`)
-        }
+  // Check if user already exists
+  const existingUser = await db.collection('users').findOne({ 
+    email: email.toLowerCase() 
+  })
 
-        return handleCORS(NextResponse.json({ 
-          received: true,
-          event_type: event.type,
-          timestamp: new Date().toISOString()
-        }))
-      } catch (error) {
-        console.error('Webhook processing error:', error)
-        await logWebhookEvent(db, event, 'error', error.message)
-        return handleCORS(NextResponse.json({ 
-          error: 'Webhook processing failed',
-          event_type: event.type 
-        }, { status: 500 }))
-      }
-    }
+  if (existingUser) {
+    return handleCORS(NextResponse.json({ error: 'User already exists' }, { status: 400 }))
+  }
 
-    // Get webhook logs (admin only) - GET /api/webhooks/logs
-    if (route === '/webhooks/logs' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  // Validate coupon code (Remote Employee username)
+  const contractor = await db.collection('contractors').findOne({ username: coupon_code })
+  if (!contractor) {
+    return handleCORS(NextResponse.json({ error: 'Invalid referral code' }, { status: 400 }))
+  }
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'admin') {
-        return handleCORS(NextResponse.json({ error: 'Admin access required' }, { status: 403 }))
-      }
+  // Create user with 20% discount
+  const hashedPassword = await timeSpan('auth.hash', () => passwordHasher.hash(password, 10))
+  const user = {
+    id: uuidv4(),
+    email: email.toLowerCase(),
+    password: hashedPassword,
+    name,
+    role,
+    subscription: { 
+      status: 'free',
+      discount_percent: 20,
+      referred_by: contractor.user_id
+    },
+    isActive: true,
+    created_at: new Date(),
+    updated_at: new Date()
+  }
 
-      const logs = await db.collection('webhook_logs')
-        .find({})
-        .sort({ created_at: -1 })
-        .limit(100)
-        .toArray()
+  if (!await insertNewUser(db, user)) {
+    return handleCORS(NextResponse.json({ error: 'User already exists' }, { status: 400 }))
+  }
 
-      const cleanedLogs = logs.map(({ _id, ...rest }) => rest)
-      
-      return handleCORS(NextResponse.json({ logs: cleanedLogs }))
+  // Update contractor stats
+  await db.collection('contractors').updateOne(
+    { id: contractor.id },
+    { 
+      $inc: { 
+        points: 1,
+        total_signups: 1
+      },
+      $set: { updated_at: new Date() }
     }
+  )
+
+  const token = jwt.sign({ 
+    userId: user.id, 
+    email: user.email, 
+    role: user.role 
+  }, process.env.JWT_SECRET, { expiresIn: '7d' })
+
+  return handleCORS(NextResponse.json({ 
+    user: { 
+      id: user.id, 
+      email: user.email, 
+      name: user.name, 
+      role: user.role, 
+      subscription: user.subscription 
+    },
+    token,
+    message: 'Registration successful with 20% discount applied!'
+  }))
+})
+
+// Validate coupon - POST /api/coupons/validate
+router.post('/coupons/validate', async ({ request, db }) => {
+  const { coupon_code } = await request.json()
+
+  if (!coupon_code) {
+    return handleCORS(NextResponse.json({ error: 'Referral code is required' }, { status: 400 }))
+  }
 
-    // DOCUMENT GENERATION ROUTES
-    // Get document types - GET /api/documents/types
-    if (route === '/documents/types' && method === 'GET') {
-      const documentTypes = {
-        categories: [
-          {
-            id: 'business_letters',
-            name: 'Business Letters',
-            description: 'Professional business correspondence and conflict resolution',
-            icon: '💼',
-            types: [
-              { id: 'demand_letter', name: 'Demand Letter', description: 'Formal demands for payment or action' },
-              { id: 'cease_desist', name: 'Cease & Desist', description: 'Stop unwanted behavior or infringement' },
-              { id: 'complaint_letter', name: 'Complaint Letter', description: 'Formal complaints about services or products' },
-              { id: 'collection_notice', name: 'Collection Notice', description: 'Debt collection and payment demands' },
-              { id: 'breach_notice', name: 'Breach Notice', description: 'Contract breach notifications' },
-              { id: 'settlement_discussion', name: 'Settlement Discussion', description: 'Professional letters to initiate settlement negotiations and resolution' }
-            ]
-          },
-          {
-            id: 'contracts',
-            name: 'Contracts & Agreements',
-            description: 'Legal agreements and contract documents',
-            icon: '📄',
-            types: [
-              { id: 'service_agreement', name: 'Service Agreement', description: 'Service provider contracts' },
-              { id: 'nda', name: 'Non-Disclosure Agreement', description: 'Confidentiality agreements' },
-              { id: 'partnership_agreement', name: 'Partnership Agreement', description: 'Business partnership contracts' },
-              { id: 'consulting_agreement', name: 'Consulting Agreement', description: 'Consultant service contracts' },
-              { id: 'freelance_contract', name: 'Freelance Contract', description: 'Independent contractor agreements' }
-            ]
-          },
-          {
-            id: 'employment',
-            name: 'Employment Documents',
-            description: 'Workplace and employment-related documents',
-            icon: '👥',
-            types: [
-              { id: 'employment_contract', name: 'Employment Contract', description: 'Employee hire agreements' },
-              { id: 'termination_letter', name: 'Termination Letter', description: 'Employee termination notices' },
-              { id: 'resignation_letter', name: 'Resignation Letter', description: 'Employee resignation notices' },
-              { id: 'disciplinary_notice', name: 'Disciplinary Notice', description: 'Employee discipline documentation' },
-              { id: 'reference_letter', name: 'Reference Letter', description: 'Employee reference letters' }
-            ]
-          },
-          {
-            id: 'real_estate',
-            name: 'Real Estate Documents',
-            description: 'Property and real estate legal documents',
-            icon: '🏠',
-            types: [
-              { id: 'lease_agreement', name: 'Lease Agreement', description: 'Rental property contracts' },
-              { id: 'eviction_notice', name: 'Eviction Notice', description: 'Tenant eviction notifications' },
-              { id: 'purchase_agreement', name: 'Purchase Agreement', description: 'Property purchase contracts' },
-              { id: 'property_disclosure', name: 'Property Disclosure', description: 'Property condition disclosures' },
-              { id: 'rent_increase_notice', name: 'Rent Increase Notice', description: 'Rent adjustment notifications' }
-            ]
-          },
-          {
-            id: 'business_formation',
-            name: 'Business Formation',
-            description: 'Business setup and corporate documents',
-            icon: '🏢',
-            types: [
-              { id: 'llc_operating_agreement', name: 'LLC Operating Agreement', description: 'LLC governance documents' },
-              { id: 'articles_incorporation', name: 'Articles of Incorporation', description: 'Corporate formation documents' },
-              { id: 'bylaws', name: 'Corporate Bylaws', description: 'Corporate governance rules' },
-              { id: 'business_plan', name: 'Business Plan', description: 'Formal business planning documents' },
-              { id: 'partnership_dissolution', name: 'Partnership Dissolution', description: 'Partnership termination documents' }
-            ]
-          },
-          {
-            id: 'legal_notices',
-            name: 'Legal Notices',
-            description: 'Official legal notifications and notices',
-            icon: '⚖️',
-            types: [
-              { id: 'copyright_notice', name: 'Copyright Notice', description: 'Copyright protection notifications' },
-              { id: 'trademark_notice', name: 'Trademark Notice', description: 'Trademark protection notices' },
-              { id: 'privacy_policy', name: 'Privacy Policy', description: 'Data privacy compliance documents' },
-              { id: 'terms_of_service', name: 'Terms of Service', description: 'Service usage agreements' },
-              { id: 'liability_waiver', name: 'Liability Waiver', description: 'Risk assumption documents' }
-            ]
-          },
-          {
-            id: 'personal_legal',
-            name: 'Personal Legal Documents',
-            description: 'Individual legal documents and personal matters',
-            icon: '👤',
-            types: [
-              { id: 'will', name: 'Last Will & Testament', description: 'Estate planning documents' },
-              { id: 'power_of_attorney', name: 'Power of Attorney', description: 'Legal authority delegation' },
-              { id: 'living_will', name: 'Living Will', description: 'Medical care directives' },
-              { id: 'name_change_petition', name: 'Name Change Petition', description: 'Legal name change documents' },
-              { id: 'divorce_agreement', name: 'Divorce Agreement', description: 'Divorce settlement documents' }
-            ]
-          }
-        ]
-      }
+  const contractor = await db.collection('contractors').findOne({ username: coupon_code })
+  if (!contractor) {
+    return handleCORS(NextResponse.json({ 
+      valid: false, 
+      error: 'Invalid referral code' 
+    }, { status: 400 }))
+  }
 
-      return handleCORS(NextResponse.json(documentTypes))
-    }
+  return handleCORS(NextResponse.json({ 
+    valid: true,
+    discount_percent: 20,
+    message: 'Valid referral code - 20% discount will be applied'
+  }))
+})
 
-    // Generate document - POST /api/documents/generate
-    if (route === '/documents/generate' && method === 'POST') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+// Login - POST /api/auth/login
+router.post('/auth/login', async ({ request, db }) => {
+  const { email, password } = await request.json()
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid authorization token' }, { status: 401 }))
-      }
+  if (!email || !password) {
+    return handleCORS(NextResponse.json({ error: 'Email and password are required' }, { status: 400 }))
+  }
 
-      const { title, documentType, category, formData = {}, urgencyLevel = 'standard' } = await request.json()
+  const user = await db.collection('users').findOne({ 
+    email: email.toLowerCase(),
+    isActive: true
+  })
 
-      // Check if user has letters remaining
-      const user = await db.collection('users').findOne({ id: decoded.userId })
-      if (!user) {
-        return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
-      }
+  if (!user || !await timeSpan('auth.compare', () => passwordHasher.compare(password, user.password))) {
+    return handleCORS(NextResponse.json({ error: 'Invalid email or password' }, { status: 401 }))
+  }
 
-      if (user.subscription?.status !== 'paid' || user.subscription?.lettersRemaining <= 0) {
-        return handleCORS(NextResponse.json({ 
-          error: 'No documents remaining. Please subscribe to continue.',
-          subscription_required: true
-        }, { status: 403 }))
-      }
+  // Update last login
+  const loginAt = new Date()
+  await db.collection('users').updateOne(
+    { id: user.id },
+    { $set: { lastLogin: loginAt, updated_at: loginAt } }
+  )
+  userCache.prime({ ...user, lastLogin: loginAt, updated_at: loginAt })
+
+  const token = jwt.sign({ 
+    userId: user.id, 
+    email: user.email, 
+    role: user.role 
+  }, process.env.JWT_SECRET, { expiresIn: '7d' })
+
+  return handleCORS(NextResponse.json({ 
+    user: { 
+      id: user.id, 
+      email: user.email, 
+      name: user.name, 
+      role: user.role, 
+      subscription: user.subscription || { status: 'free' }
+    },
+    token,
+    message: 'Login successful!'
+  }))
+})
+
+// Get current user - GET /api/auth/me
+router.get('/auth/me', async ({ db, decoded }) => {
+  const user = await userCache.load(db, decoded.userId)
+
+  if (!user || !user.isActive) {
+    return handleCORS(NextResponse.json({ error: 'User not found or deactivated' }, { status: 404 }))
+  }
 
-      // Get document-specific system prompt
-      const systemPrompt = getDocumentSystemPrompt(documentType, category)
+  return handleCORS(NextResponse.json({ 
+    user: { 
+      id: user.id, 
+      email: user.email, 
+      name: user.name, 
+      role: user.role, 
+      subscription: user.subscription || { status: 'free' }
+    }
+  }))
+}, { auth: { missing: 'No authorization token provided', invalid: 'Invalid or expired token' } })
 
-      // Enhanced user prompt with structured information
-      const enhancedPrompt = buildDocumentPrompt(documentType, category, formData, urgencyLevel)
+// STRIPE SUBSCRIPTION ROUTES
+// Create subscription checkout session - POST /api/subscription/create-checkout
+router.post('/subscription/create-checkout', async ({ request, db, decoded }) => {
+  const { packageType } = await request.json()
 
-      try {
-        // Generate document with OpenAI
-        const completion = await openai.chat.completions.create({
-          model: "gpt-4o-mini",
-          messages: [
-            {
-              role: "system",
-              content: systemPrompt
-            },
-            {
-              role: "user",
-              content: enhancedPrompt
-            }
-          ],
-          max_tokens: 2000,
-          temperature: 0.7
-        });
-
-        const generatedContent = completion.choices[0].message.content;
-
-        // Save document to database
-        const document = {
-          id: uuidv4(),
-          user_id: decoded.userId,
-          title,
-          content: generatedContent,
-          document_type: documentType,
-          category: category,
-          form_data: formData,
-          urgency_level: urgencyLevel,
-          status: 'ready',
-          stage: 4, // Ready to send
-          professional_generated: true,
-          created_at: new Date(),
-          updated_at: new Date()
-        }
+  if (!packageType || !['4letters', '6letters', '8letters'].includes(packageType)) {
+    return handleCORS(NextResponse.json({ error: 'Invalid package type' }, { status: 400 }))
+  }
 
-        await db.collection('documents').insertOne(document)
+  const user = await userCache.load(db, decoded.userId)
+  if (!user) {
+    return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
+  }
 
-        // Decrease letters remaining
-        await db.collection('users').updateOne(
-          { id: decoded.userId },
-          { 
-            $inc: { 'subscription.lettersRemaining': -1 },
-            $set: { updated_at: new Date() }
-          }
-        )
+  try {
+    // Create or get Stripe customer
+    let stripeCustomerId = user.stripeCustomerId
+    if (!stripeCustomerId) {
+      const customer = await timeDependency('stripe', 'customers.create', () => stripe.customers.create({
+        email: user.email,
+        name: user.name,
+        metadata: {
+          userId: user.id
+        }
+      }))
+      stripeCustomerId = customer.id
+      await db.collection('users').updateOne(
+        { id: decoded.userId },
+        { $set: { stripeCustomerId, updated_at: new Date() } }
+      )
+      userCache.invalidate(decoded.userId)
+    }
 
-        return handleCORS(NextResponse.json({ 
-          document: { ...document, _id: undefined },
-          letters_remaining: user.subscription.lettersRemaining - 1
-        }))
-      } catch (error) {
-        console.error('OpenAI API Error:', error)
-        return handleCORS(NextResponse.json({ 
-          error: 'Failed to generate document. Please try again.',
-          ai_service_error: true
-        }, { status: 500 }))
-      }
+    const packageDetails = {
+      '4letters': { amount: 19999, name: '4 Letters Package' },
+      '6letters': { amount: 49999, name: '6 Letters Package' },
+      '8letters': { amount: 99999, name: '8 Letters Package' }
     }
 
-    // LEGACY LETTER ROUTES (for backward compatibility)
-    // Generate letter - POST /api/letters/generate
-    if (route === '/letters/generate' && method === 'POST') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
+    // Create checkout session
+    const session = await timeDependency('stripe', 'checkout.sessions.create', () => stripe.checkout.sessions.create({
+      mode: 'payment',
+      payment_method_types: ['card'],
+      line_items: [{
+        price_data: {
+          currency: 'usd',
+          product_data: {
+            name: packageDetails[packageType].name,
+            description: `Professional legal letters - ${packageType.replace('letters', ' letters')}`,
+            metadata: {
+              packageType: packageType
+            }
+          },
+          unit_amount: packageDetails[packageType].amount
+        },
+        quantity: 1
+      }],
+      customer: stripeCustomerId,
+      success_url: `${process.env.NEXT_PUBLIC_BASE_URL}?session_id={CHECKOUT_SESSION_ID}&success=true`,
+      cancel_url: `${process.env.NEXT_PUBLIC_BASE_URL}?canceled=true`,
+      metadata: {
+        userId: decoded.userId,
+        packageType: packageType
+      },
+      payment_intent_data: {
+        metadata: {
+          userId: decoded.userId,
+          packageType: packageType
+        }
       }
+    }))
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid authorization token' }, { status: 401 }))
-      }
+    // Log the checkout session creation
+    await db.collection('payment_sessions').insertOne({
+      id: uuidv4(),
+      user_id: decoded.userId,
+      stripe_session_id: session.id,
+      package_type: packageType,
+      amount: packageDetails[packageType].amount,
+      status: 'created',
+      created_at: new Date()
+    })
 
-      const { title, prompt, letterType = 'general', formData = {}, urgencyLevel = 'standard' } = await request.json()
+    return handleCORS(NextResponse.json({ 
+      sessionId: session.id,
+      url: session.url
+    }))
+  } catch (error) {
+    console.error('Stripe Checkout Error:', error)
+    return handleCORS(NextResponse.json({ 
+      error: 'Failed to create checkout session. Please try again.' 
+    }, { status: 500 }))
+  }
+}, { auth: true })
 
-      // Check if user has letters remaining
-      const user = await db.collection('users').findOne({ id: decoded.userId })
-      if (!user) {
-        return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
-      }
+// Stripe webhook - POST /api/webhooks/stripe
+router.post('/webhooks/stripe', async ({ request, db }) => {
+  const body = await request.text()
+  const sig = request.headers.get('stripe-signature')
 
-      if (user.subscription?.status !== 'paid' || user.subscription?.lettersRemaining <= 0) {
-        return handleCORS(NextResponse.json({ 
-          error: 'No letters remaining. Please subscribe to continue.',
-          subscription_required: true
-        }, { status: 403 }))
-      }
+  if (!sig) {
+    console.error('Missing stripe-signature header')
+    return handleCORS(NextResponse.json({ error: 'Missing signature' }, { status: 400 }))
+  }
 
-      // Enhanced system prompt for professional letter generation
-      const systemPrompt = `You are a professional legal letter writer and paralegal assistant working for Talk To My Lawyer. Generate formal, professional, and legally appropriate letters based on the provided information. 
-      
-      Guidelines:
-      - Use formal business letter format with proper headers and structure
-      - Include sender and recipient information when provided
-      - Be direct, professional, and clear in communication
-      - Use appropriate legal language where applicable
-      - Include relevant dates and specific details
-      - Ensure the letter achieves the stated objective
-      - Maintain a professional but firm tone when appropriate
-      - Sign letters as coming from Talk To My Lawyer legal team`
-
-      // Enhanced user prompt with structured information
-      const enhancedPrompt = `
-      Generate a professional ${letterType} letter with the following details:
-
-      ${prompt}
-
-      ${formData.fullName ? `Sender: ${formData.fullName}` : ''}
-      ${formData.yourAddress ? `Sender Address: ${formData.yourAddress}` : ''}
-      ${formData.recipientName ? `Recipient: ${formData.recipientName}` : ''}
-      ${formData.recipientAddress ? `Recipient Address: ${formData.recipientAddress}` : ''}
-      ${formData.briefDescription ? `Situation: ${formData.briefDescription}` : ''}
-      ${formData.detailedInformation ? `Details: ${formData.detailedInformation}` : ''}
-      ${formData.whatToAchieve ? `Desired Outcome: ${formData.whatToAchieve}` : ''}
-      ${urgencyLevel !== 'standard' ? `Urgency: ${urgencyLevel}` : ''}
-
-      Please format this as a complete, professional letter ready to send.
-      `
+  let event
+  try {
+    // Verify webhook signature if webhook secret is available
+    if (process.env.STRIPE_WEBHOOK_SECRET && process.env.STRIPE_WEBHOOK_SECRET !== 'whsec_placeholder') {
+      event = stripe.webhooks.constructEvent(body, sig, process.env.STRIPE_WEBHOOK_SECRET)
+    } else {
+      // For development, parse the event without verification
+      event = JSON.parse(body)
+      console.warn('Webhook signature verification skipped - using development mode')
+    }
+  } catch (err) {
+    console.error('Webhook signature verification failed:', err.message)
+    logWebhookEvent({ id: 'unknown', type: 'signature_verification_failed' }, 'failed', err.message)
+    return handleCORS(NextResponse.json({ error: 'Webhook signature verification failed' }, { status: 400 }))
+  }
 
-      try {
-        // Generate letter with OpenAI
-        const completion = await openai.chat.completions.create({
-          model: "gpt-4o-mini",
-          messages: [
-            {
-              role: "system",
-              content: systemPrompt
-            },
-            {
-              role: "user",
-              content: enhancedPrompt
-            }
-          ],
-          max_tokens: 1500,
-          temperature: 0.7
-        });
-
-        const generatedContent = completion.choices[0].message.content;
-
-        // Save letter to database
-        const letter = {
-          id: uuidv4(),
-          user_id: decoded.userId,
-          title,
-          content: generatedContent,
-          letter_type: letterType,
-          form_data: formData,
-          urgency_level: urgencyLevel,
-          status: 'ready',
-          stage: 4, // Ready to send
-          professional_generated: true,
-          created_at: new Date(),
-          updated_at: new Date()
-        }
+  // Store the event and ack at once; a redelivery is rejected by the inbox's _id index
+  const { duplicate } = await webhookProcessor.receive(db, event)
+  console.log(`Received webhook event: ${event.type}${duplicate ? ' (duplicate)' : ''}`)
+
+  return handleCORS(NextResponse.json({ 
+    received: true,
+    duplicate,
+    event_type: event.type,
+    timestamp: new Date().toISOString()
+  }))
+})
+
+// Get webhook logs (admin only) - GET /api/webhooks/logs
+router.get('/webhooks/logs', async ({ db }) => {
+  const logs = await db.collection('webhook_logs')
+    .find({})
+    .sort({ created_at: -1 })
+    .limit(100)
+    .toArray()
+
+  const cleanedLogs = logs.map(({ _id, ...rest }) => rest)
+
+  return handleCORS(NextResponse.json({ logs: cleanedLogs }))
+}, { auth: { role: 'admin', forbidden: 'Admin access required' } })
+
+// DOCUMENT GENERATION ROUTES
+// Get document types - GET /api/documents/types
+// Prebuilt at module load and served without touching MongoDB. The URL is not versioned,
+// so caches keep it for a day and then revalidate against the content-hash ETag.
+const DOCUMENT_TYPES_HEADERS = {
+  'ETag': DOCUMENT_TYPES_ETAG,
+  'Cache-Control': 'public, max-age=86400, stale-while-revalidate=604800'
+}
 
-        await db.collection('letters').insertOne(letter)
+router.get('/documents/types', async ({ request }) => {
+  if (etagMatches(request, DOCUMENT_TYPES_ETAG)) {
+    return handleCORS(new NextResponse(null, { status: 304, headers: DOCUMENT_TYPES_HEADERS }))
+  }
 
-        // Decrease letters remaining
-        await db.collection('users').updateOne(
-          { id: decoded.userId },
-          { 
-            $inc: { 'subscription.lettersRemaining': -1 },
-            $set: { updated_at: new Date() }
-          }
-        )
+  return handleCORS(new NextResponse(DOCUMENT_TYPES_JSON, {
+    headers: { 'Content-Type': 'application/json', ...DOCUMENT_TYPES_HEADERS }
+  }))
+}, { db: false })
+
+// Generate document - POST /api/documents/generate
+router.post('/documents/generate', async ({ request, db, decoded }) => {
+  const { title, documentType, category, formData = {}, urgencyLevel = 'standard' } = await request.json()
+
+  // Get document-specific system prompt
+  const systemPrompt = getDocumentSystemPrompt(documentType, category)
+
+  // Enhanced user prompt with structured information
+  const enhancedPrompt = buildDocumentPrompt(documentType, category, formData, urgencyLevel)
+
+  const completionParams = {
+    model: "gpt-4o-mini",
+    messages: [
+      {
+        role: "system",
+        content: systemPrompt
+      },
+      {
+        role: "user",
+        content: enhancedPrompt
+      }
+    ],
+    max_tokens: 2000,
+    temperature: 0.7
+  }
 
-        return handleCORS(NextResponse.json({ 
-          letter: { ...letter, _id: undefined },
-          letters_remaining: user.subscription.lettersRemaining - 1
-        }))
-      } catch (error) {
-        console.error('OpenAI API Error:', error)
-        return handleCORS(NextResponse.json({ 
-          error: 'Failed to generate letter. Please try again.',
-          ai_service_error: true
-        }, { status: 500 }))
-      }
+  // Identical resubmits (same user and prompt) share the first request's document and credit
+  let flight = prefersAsync(request) ? null : generationDedupe.begin(generationDedupe.key(decoded.userId, completionParams, title))
+  if (flight && !flight.leader) {
+    const previous = await flight.result.catch(() => null)
+    if (previous) {
+      return duplicateGenerationResponse(request, 'document', previous)
     }
+    // The first request failed; generate independently
+    flight = null
+  }
 
-    // Submit letter request - POST /api/letters/submit
-    if (route === '/letters/submit' && method === 'POST') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
-
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid authorization token' }, { status: 401 }))
-      }
+  // Reserve one credit atomically before generating; it is refunded if generation fails
+  let reservation
+  try {
+    reservation = await reserveCredit(db, decoded.userId)
+  } catch (error) {
+    flight?.reject(error)
+    throw error
+  }
+  if (!reservation) {
+    flight?.reject(new Error('No credits remaining'))
+    const user = await userCache.load(db, decoded.userId)
+    if (!user) {
+      return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
+    }
+    return handleCORS(NextResponse.json({ 
+      error: 'No documents remaining. Please subscribe to continue.',
+      subscription_required: true
+    }, { status: 403 }))
+  }
+  const refund = (error) => {
+    flight?.reject(error)
+    return refundCredit(db, decoded.userId)
+  }
 
-      const { title, letterType = 'general', formData = {}, urgencyLevel = 'standard' } = await request.json()
+  // Save document to database; the credit was already taken by the reservation
+  const saveDocument = async (generatedContent) => {
+    const document = {
+      id: uuidv4(),
+      user_id: decoded.userId,
+      title,
+      content: generatedContent,
+      document_type: documentType,
+      category: category,
+      form_data: formData,
+      urgency_level: urgencyLevel,
+      status: 'ready',
+      stage: 4, // Ready to send
+      professional_generated: true,
+      created_at: new Date(),
+      updated_at: new Date()
+    }
 
-      // Check if user has subscription
-      const user = await db.collection('users').findOne({ id: decoded.userId })
-      if (!user) {
-        return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
-      }
+    await db.collection('documents').insertOne(document)
 
-      if (user.subscription?.status !== 'paid' || user.subscription?.lettersRemaining <= 0) {
-        return handleCORS(NextResponse.json({ 
-          error: 'No letters remaining. Please subscribe to continue.',
-          subscription_required: true
-        }, { status: 403 }))
-      }
+    const result = {
+      document: { ...document, _id: undefined },
+      letters_remaining: reservation.subscription.lettersRemaining
+    }
+    flight?.resolve(result)
+    return result
+  }
 
-      // Create letter request
-      const letter = {
+  // Queue the generation and answer 202 when the client sends Prefer: respond-async
+  if (prefersAsync(request)) {
+    return queueGeneration(db, {
+      kind: 'document',
+      collection: 'documents',
+      completionParams,
+      placeholder: {
         id: uuidv4(),
         user_id: decoded.userId,
         title,
         content: '',
-        letter_type: letterType,
+        document_type: documentType,
+        category: category,
         form_data: formData,
         urgency_level: urgencyLevel,
-        status: 'submitted',
-        stage: 1, // Letter Submitted
+        status: 'queued',
+        stage: 1,
         professional_generated: false,
         created_at: new Date(),
         updated_at: new Date()
       }
+    })
+  }
 
-      await db.collection('letters').insertOne(letter)
-
-      return handleCORS(NextResponse.json({ 
-        letter: { ...letter, _id: undefined }
-      }))
-    }
+  // Stream tokens as Server-Sent Events when the client asks for text/event-stream
+  if (wantsEventStream(request)) {
+    return streamCompletion(completionParams, {
+      onComplete: saveDocument,
+      onError: refund,
+      errorMessage: 'Failed to generate document. Please try again.'
+    })
+  }
 
-    // Update letter stage - PUT /api/letters/{id}/stage
-    if (route.startsWith('/letters/') && route.endsWith('/stage') && method === 'PUT') {
-      const letterId = route.split('/')[2]
-      const { stage } = await request.json()
-      
-      if (!stage || stage < 1 || stage > 4) {
-        return handleCORS(NextResponse.json({ error: 'Invalid stage number' }, { status: 400 }))
-      }
-      
-      const result = await db.collection('letters').updateOne(
-        { id: letterId },
-        { 
-          $set: { 
-            stage: stage,
-            updated_at: new Date()
-          }
-        }
-      )
+  try {
+    // Generate document with OpenAI
+    const completion = await openaiGate.run(() => timeDependency('openai', 'chat.completions.create', () => (
+      openai.chat.completions.create(completionParams)
+    )))
 
-      if (result.matchedCount === 0) {
-        return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
-      }
+    const generatedContent = completion.choices[0].message.content
 
-      return handleCORS(NextResponse.json({ success: true, stage }))
+    return handleCORS(NextResponse.json(await saveDocument(generatedContent)))
+  } catch (error) {
+    await refund(error)
+    if (error instanceof OverloadedError) {
+      throw error
     }
+    console.error('OpenAI API Error:', error)
+    return handleCORS(NextResponse.json({ 
+      error: 'Failed to generate document. Please try again.',
+      ai_service_error: true
+    }, { status: 500 }))
+  }
+}, { auth: true })
+
+// LEGACY LETTER ROUTES (for backward compatibility)
+// Generate letter - POST /api/letters/generate
+router.post('/letters/generate', async ({ request, db, decoded }) => {
+  const { title, prompt, letterType = 'general', formData = {}, urgencyLevel = 'standard' } = await request.json()
+
+  // Enhanced system prompt for professional letter generation
+  const systemPrompt = `You are a professional legal letter writer and paralegal assistant working for Talk To My Lawyer. Generate formal, professional, and legally appropriate letters based on the provided information. 
+
+  Guidelines:
+  - Use formal business letter format with proper headers and structure
+  - Include sender and recipient information when provided
+  - Be direct, professional, and clear in communication
+  - Use appropriate legal language where applicable
+  - Include relevant dates and specific details
+  - Ensure the letter achieves the stated objective
+  - Maintain a professional but firm tone when appropriate
+  - Sign letters as coming from Talk To My Lawyer legal team`
+
+  // Enhanced user prompt with structured information
+  const enhancedPrompt = `
+  Generate a professional ${letterType} letter with the following details:
+
+  ${prompt}
+
+  ${formData.fullName ? `Sender: ${formData.fullName}` : ''}
+  ${formData.yourAddress ? `Sender Address: ${formData.yourAddress}` : ''}
+  ${formData.recipientName ? `Recipient: ${formData.recipientName}` : ''}
+  ${formData.recipientAddress ? `Recipient Address: ${formData.recipientAddress}` : ''}
+  ${formData.briefDescription ? `Situation: ${formData.briefDescription}` : ''}
+  ${formData.detailedInformation ? `Details: ${formData.detailedInformation}` : ''}
+  ${formData.whatToAchieve ? `Desired Outcome: ${formData.whatToAchieve}` : ''}
+  ${urgencyLevel !== 'standard' ? `Urgency: ${urgencyLevel}` : ''}
+
+  Please format this as a complete, professional letter ready to send.
+  `
+
+  const completionParams = {
+    model: "gpt-4o-mini",
+    messages: [
+      {
+        role: "system",
+        content: systemPrompt
+      },
+      {
+        role: "user",
+        content: enhancedPrompt
+      }
+    ],
+    max_tokens: 1500,
+    temperature: 0.7
+  }
 
-    // Get letter by ID - GET /api/letters/{id}
-    if (route.startsWith('/letters/') && !route.includes('/stage') && !route.includes('/send') && method === 'GET') {
-      const letterId = route.split('/')[2]
-      
-      const letter = await db.collection('letters').findOne({ id: letterId })
-      if (!letter) {
-        return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
-      }
-
-      return handleCORS(NextResponse.json({ letter: { ...letter, _id: undefined } }))
+  // Identical resubmits (same user and prompt) share the first request's letter and credit
+  let flight = prefersAsync(request) ? null : generationDedupe.begin(generationDedupe.key(decoded.userId, completionParams, title))
+  if (flight && !flight.leader) {
+    const previous = await flight.result.catch(() => null)
+    if (previous) {
+      return duplicateGenerationResponse(request, 'letter', previous)
     }
+    // The first request failed; generate independently
+    flight = null
+  }
 
-    // Get user letters - GET /api/letters
-    if (route === '/letters' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  // Reserve one credit atomically before generating; it is refunded if generation fails
+  let reservation
+  try {
+    reservation = await reserveCredit(db, decoded.userId)
+  } catch (error) {
+    flight?.reject(error)
+    throw error
+  }
+  if (!reservation) {
+    flight?.reject(new Error('No credits remaining'))
+    const user = await userCache.load(db, decoded.userId)
+    if (!user) {
+      return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
+    }
+    return handleCORS(NextResponse.json({ 
+      error: 'No letters remaining. Please subscribe to continue.',
+      subscription_required: true
+    }, { status: 403 }))
+  }
+  const refund = (error) => {
+    flight?.reject(error)
+    return refundCredit(db, decoded.userId)
+  }
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded) {
-        return handleCORS(NextResponse.json({ error: 'Invalid authorization token' }, { status: 401 }))
-      }
+  // Save letter to database; the credit was already taken by the reservation
+  const saveLetter = async (generatedContent) => {
+    const letter = {
+      id: uuidv4(),
+      user_id: decoded.userId,
+      title,
+      content: generatedContent,
+      letter_type: letterType,
+      form_data: formData,
+      urgency_level: urgencyLevel,
+      status: 'ready',
+      stage: 4, // Ready to send
+      professional_generated: true,
+      created_at: new Date(),
+      updated_at: new Date()
+    }
 
-      const letters = await db.collection('letters')
-        .find({ user_id: decoded.userId })
-        .sort({ created_at: -1 })
-        .toArray()
+    await db.collection('letters').insertOne(letter)
 
-      const cleanedLetters = letters.map(({ _id, ...rest }) => rest)
-      
-      return handleCORS(NextResponse.json({ letters: cleanedLetters }))
+    const result = {
+      letter: { ...letter, _id: undefined },
+      letters_remaining: reservation.subscription.lettersRemaining
     }
+    flight?.resolve(result)
+    return result
+  }
 
-    // Send letter via email - POST /api/letters/{id}/send
-    if (route.startsWith('/letters/') && route.endsWith('/send') && method === 'POST') {
-      const letterId = route.split('/')[2]
-      const { recipientEmail } = await request.json()
-      
-      if (!recipientEmail || !/\S+@\S+\.\S+/.test(recipientEmail)) {
-        return handleCORS(NextResponse.json({ error: 'Valid recipient email is required' }, { status: 400 }))
-      }
-      
-      const letter = await db.collection('letters').findOne({ id: letterId })
-      if (!letter) {
-        return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
+  // Queue the generation and answer 202 when the client sends Prefer: respond-async
+  if (prefersAsync(request)) {
+    return queueGeneration(db, {
+      kind: 'letter',
+      collection: 'letters',
+      completionParams,
+      placeholder: {
+        id: uuidv4(),
+        user_id: decoded.userId,
+        title,
+        content: '',
+        letter_type: letterType,
+        form_data: formData,
+        urgency_level: urgencyLevel,
+        status: 'queued',
+        stage: 1,
+        professional_generated: false,
+        created_at: new Date(),
+        updated_at: new Date()
       }
+    })
+  }
 
-      try {
-        await resend.emails.send({
-          from: 'Talk To My Lawyer <noreply@talktomylawyer.com>',
-          to: recipientEmail,
-          subject: `Legal Letter: ${letter.title}`,
-          html: `
-            <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
-              <h2 style="color: #f97316; border-bottom: 2px solid #f97316; padding-bottom: 10px;">Professional Legal Letter</h2>
-              <p style="color: #666; margin: 20px 0;">Please find the attached legal letter below:</p>
-              <div style="border: 1px solid #ccc; padding: 30px; margin: 20px 0; background: #f9f9f9; border-radius: 8px;">
-                <pre style="white-space: pre-wrap; font-family: 'Times New Roman', serif; line-height: 1.6; margin: 0;">${letter.content}</pre>
-              </div>
-              <div style="border-top: 1px solid #ddd; padding-top: 20px; margin-top: 30px; color: #666; font-size: 12px;">
-                <p><strong>This letter was professionally generated by Talk To My Lawyer.</strong></p>
-                <p>For questions or additional legal services, please visit our website or contact our support team.</p>
-              </div>
-            </div>
-          `
-        })
+  // Stream tokens as Server-Sent Events when the client asks for text/event-stream
+  if (wantsEventStream(request)) {
+    return streamCompletion(completionParams, {
+      onComplete: saveLetter,
+      onError: refund,
+      errorMessage: 'Failed to generate letter. Please try again.'
+    })
+  }
 
-        // Log the email send
-        await db.collection('email_logs').insertOne({
-          id: uuidv4(),
-          letter_id: letterId,
-          recipient_email: recipientEmail,
-          sent_at: new Date(),
-          status: 'sent'
-        })
+  try {
+    // Generate letter with OpenAI
+    const completion = await openaiGate.run(() => timeDependency('openai', 'chat.completions.create', () => (
+      openai.chat.completions.create(completionParams)
+    )))
 
-        return handleCORS(NextResponse.json({ 
-          success: true,
-          message: 'Letter sent successfully'
-        }))
-      } catch (error) {
-        console.error('Email sending error:', error)
-        
-        // Log the email error
-        await db.collection('email_logs').insertOne({
-          id: uuidv4(),
-          letter_id: letterId,
-          recipient_email: recipientEmail,
-          sent_at: new Date(),
-          status: 'failed',
-          error: error.message
-        })
+    const generatedContent = completion.choices[0].message.content
 
-        return handleCORS(NextResponse.json({ 
-          error: 'Failed to send email. Please try again.',
-          email_service_error: true
-        }, { status: 500 }))
-      }
+    return handleCORS(NextResponse.json(await saveLetter(generatedContent)))
+  } catch (error) {
+    await refund(error)
+    if (error instanceof OverloadedError) {
+      throw error
     }
+    console.error('OpenAI API Error:', error)
+    return handleCORS(NextResponse.json({ 
+      error: 'Failed to generate letter. Please try again.',
+      ai_service_error: true
+    }, { status: 500 }))
+  }
+}, { auth: true })
+
+// Get generation job status - GET /api/jobs/{id}
+router.get('/jobs/:id', async ({ db, decoded, params }) => {
+  const jobId = params.id
+  const job = await db.collection(JOBS_COLLECTION).findOne(
+    { id: jobId, user_id: decoded.userId },
+    { projection: { _id: 0, payload: 0 } }
+  )
+  if (!job) {
+    return handleCORS(NextResponse.json({ error: 'Job not found' }, { status: 404 }))
+  }
 
-    // COUPON ROUTES
-    // Create coupon - POST /api/coupons/create
-    if (route === '/coupons/create' && method === 'POST') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  const collection = job.kind === 'document' ? 'documents' : 'letters'
+  const target = await db.collection(collection).findOne({ id: job.target_id }, { projection: { _id: 0 } })
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'contractor') {
-        return handleCORS(NextResponse.json({ error: 'Contractor access required' }, { status: 403 }))
-      }
+  return handleCORS(NextResponse.json({ job, [job.kind]: target }))
+}, { auth: true })
 
-      const { discount_percent, max_uses = 100, expires_in_days = 30 } = await request.json()
+// Submit letter request - POST /api/letters/submit
+router.post('/letters/submit', async ({ request, db, decoded }) => {
+  const { title, letterType = 'general', formData = {}, urgencyLevel = 'standard' } = await request.json()
 
-      if (!discount_percent || discount_percent < 1 || discount_percent > 100) {
-        return handleCORS(NextResponse.json({ error: 'Discount percent must be between 1 and 100' }, { status: 400 }))
-      }
+  // Check if user has subscription
+  const user = await userCache.load(db, decoded.userId)
+  if (!user) {
+    return handleCORS(NextResponse.json({ error: 'User not found' }, { status: 404 }))
+  }
 
-      const coupon = {
-        id: uuidv4(),
-        contractor_id: decoded.userId,
-        code: generateCouponCode(),
-        discount_percent,
-        max_uses,
-        current_uses: 0,
-        created_at: new Date(),
-        expires_at: new Date(Date.now() + expires_in_days * 24 * 60 * 60 * 1000)
-      }
+  if (user.subscription?.status !== 'paid' || user.subscription?.lettersRemaining <= 0) {
+    return handleCORS(NextResponse.json({ 
+      error: 'No letters remaining. Please subscribe to continue.',
+      subscription_required: true
+    }, { status: 403 }))
+  }
 
-      await db.collection('coupons').insertOne(coupon)
+  // Create letter request
+  const letter = {
+    id: uuidv4(),
+    user_id: decoded.userId,
+    title,
+    content: '',
+    letter_type: letterType,
+    form_data: formData,
+    urgency_level: urgencyLevel,
+    status: 'submitted',
+    stage: 1, // Letter Submitted
+    professional_generated: false,
+    created_at: new Date(),
+    updated_at: new Date()
+  }
 
-      return handleCORS(NextResponse.json({ 
-        coupon: { ...coupon, _id: undefined },
-        message: 'Coupon created successfully'
-      }))
-    }
+  await db.collection('letters').insertOne(letter)
 
-    // Get contractor coupons - GET /api/coupons
-    if (route === '/coupons' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  return handleCORS(NextResponse.json({ 
+    letter: { ...letter, _id: undefined }
+  }))
+}, { auth: true })
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'contractor') {
-        return handleCORS(NextResponse.json({ error: 'Contractor access required' }, { status: 403 }))
+// Update letter stage - PUT /api/letters/{id}/stage
+router.put('/letters/:id/stage', async ({ request, db, params }) => {
+  const letterId = params.id
+  const { stage } = await request.json()
+
+  if (!stage || stage < 1 || stage > 4) {
+    return handleCORS(NextResponse.json({ error: 'Invalid stage number' }, { status: 400 }))
+  }
+
+  const result = await db.collection('letters').updateOne(
+    { id: letterId },
+    { 
+      $set: { 
+        stage: stage,
+        updated_at: new Date()
       }
+    }
+  )
 
-      const coupons = await db.collection('coupons')
-        .find({ contractor_id: decoded.userId })
-        .sort({ created_at: -1 })
-        .toArray()
+  if (result.matchedCount === 0) {
+    return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
+  }
 
-      const cleanedCoupons = coupons.map(({ _id, ...rest }) => rest)
-      
-      return handleCORS(NextResponse.json({ coupons: cleanedCoupons }))
+  return handleCORS(NextResponse.json({ success: true, stage }))
+})
+
+// Get letter by ID - GET /api/letters/{id}
+router.get('/letters/:id', async ({ request, db, params }) => {
+  const letterId = params.id
+  const letterEtag = (letter) => weakEtag('letter', letter.id, letter.updated_at ?? letter.created_at)
+
+  // Revalidation reads only id and timestamps (covered by an index), not the letter body
+  if (request.headers.has('if-none-match')) {
+    const version = await db.collection('letters').findOne(
+      { id: letterId },
+      { projection: { _id: 0, id: 1, updated_at: 1, created_at: 1 } }
+    )
+    if (version && etagMatches(request, letterEtag(version))) {
+      return notModified(letterEtag(version))
     }
+  }
 
-    // REMOTE EMPLOYEE ROUTES (formerly contractor routes)
-    // Get Remote Employee stats - GET /api/remote-employee/stats
-    if (route === '/remote-employee/stats' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  const letter = await db.collection('letters').findOne({ id: letterId })
+  if (!letter) {
+    return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
+  }
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'contractor') {
-        return handleCORS(NextResponse.json({ error: 'Remote Employee access required' }, { status: 403 }))
-      }
+  return handleCORS(withEtag(NextResponse.json({ letter: { ...letter, _id: undefined } }), letterEtag(letter)))
+})
+
+// Get user letters - GET /api/letters
+router.get('/letters', async ({ request, db, decoded }) => {
+  // Paginated, with content and form_data only when requested via ?include=
+  const { searchParams } = new URL(request.url)
+  const page = parsePageParams(searchParams)
+
+  // Versioned before the page is read, so a letter written in between changes the next ETag
+  // rather than hiding behind this one
+  const version = await collectionVersion(db.collection('letters'), { user_id: decoded.userId })
+  const etag = weakEtag('letters', decoded.userId, searchParams.toString(), ...version)
+  if (etagMatches(request, etag)) {
+    return notModified(etag)
+  }
 
-      const contractor = await db.collection('contractors').findOne({ user_id: decoded.userId })
-      if (!contractor) {
-        return handleCORS(NextResponse.json({ error: 'Remote Employee profile not found' }, { status: 404 }))
-      }
+  const { items, has_more, next_cursor } = await findPage(
+    db.collection('letters'),
+    { user_id: decoded.userId },
+    { ...page, projection: summaryProjection(['content', 'form_data'], page.include) }
+  )
 
-      return handleCORS(NextResponse.json({
-        points: contractor.points,
-        total_signups: contractor.total_signups,
-        username: contractor.username,
-        discount_percent: 20
-      }))
-    }
+  return handleCORS(withEtag(NextResponse.json({ letters: items, has_more, next_cursor }), etag))
+}, { auth: true })
 
-    // CONTRACTOR ROUTES (kept for backward compatibility)
-    // Get contractor stats - GET /api/contractor/stats
-    if (route === '/contractor/stats' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+// Send letter via email - POST /api/letters/{id}/send
+router.post('/letters/:id/send', async ({ request, db, params }) => {
+  const letterId = params.id
+  const { recipientEmail } = await request.json()
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'contractor') {
-        return handleCORS(NextResponse.json({ error: 'Contractor access required' }, { status: 403 }))
-      }
+  if (!recipientEmail || !/\S+@\S+\.\S+/.test(recipientEmail)) {
+    return handleCORS(NextResponse.json({ error: 'Valid recipient email is required' }, { status: 400 }))
+  }
 
-      const contractor = await db.collection('contractors').findOne({ user_id: decoded.userId })
-      if (!contractor) {
-        return handleCORS(NextResponse.json({ error: 'Contractor profile not found' }, { status: 404 }))
-      }
+  const letter = await db.collection('letters').findOne({ id: letterId })
+  if (!letter) {
+    return handleCORS(NextResponse.json({ error: 'Letter not found' }, { status: 404 }))
+  }
 
-      const coupons = await db.collection('coupons')
-        .find({ contractor_id: decoded.userId })
-        .toArray()
+  // Queue the email; the outbox worker sends it and records the delivery status
+  const email = await enqueueEmail(db, {
+    letterId,
+    to: recipientEmail,
+    ...renderLetterEmail(letter)
+  })
+  emailWorker.kick()
+
+  return handleCORS(NextResponse.json({ 
+    success: true,
+    message: 'Letter queued for sending',
+    outbox_id: email.id,
+    status: email.status
+  }, { status: 202 }))
+})
+
+// Email delivery status - GET /api/emails/{outboxId}
+router.get('/emails/:id', async ({ db, params }) => {
+  const email = await db.collection(OUTBOX_COLLECTION).findOne(
+    { id: params.id },
+    { projection: { _id: 0, id: 1, letter_id: 1, status: 1, attempts: 1, error: 1, provider_id: 1, created_at: 1, sent_at: 1 } }
+  )
+  if (!email) {
+    return handleCORS(NextResponse.json({ error: 'Email not found' }, { status: 404 }))
+  }
 
-      const totalCoupons = coupons.length
-      const activeCoupons = coupons.filter(c => c.expires_at > new Date() && c.current_uses < c.max_uses).length
+  return handleCORS(NextResponse.json({ email }))
+})
 
-      return handleCORS(NextResponse.json({
-        points: contractor.points,
-        total_signups: contractor.total_signups,
-        total_coupons: totalCoupons,
-        active_coupons: activeCoupons
-      }))
-    }
+// COUPON ROUTES
+// Create coupon - POST /api/coupons/create
+router.post('/coupons/create', async ({ request, db, decoded }) => {
+  const { discount_percent, max_uses = 100, expires_in_days = 30 } = await request.json()
 
-    // ADMIN ROUTES
-    // Get all users - GET /api/admin/users
-    if (route === '/admin/users' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  if (!discount_percent || discount_percent < 1 || discount_percent > 100) {
+    return handleCORS(NextResponse.json({ error: 'Discount percent must be between 1 and 100' }, { status: 400 }))
+  }
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'admin') {
-        return handleCORS(NextResponse.json({ error: 'Admin access required' }, { status: 403 }))
-      }
+  const coupon = {
+    id: uuidv4(),
+    contractor_id: decoded.userId,
+    code: generateCouponCode(),
+    discount_percent,
+    max_uses,
+    current_uses: 0,
+    created_at: new Date(),
+    expires_at: new Date(Date.now() + expires_in_days * 24 * 60 * 60 * 1000)
+  }
 
-      const users = await db.collection('users')
-        .find({})
-        .sort({ created_at: -1 })
-        .toArray()
+  await db.collection('coupons').insertOne(coupon)
+
+  return handleCORS(NextResponse.json({ 
+    coupon: { ...coupon, _id: undefined },
+    message: 'Coupon created successfully'
+  }))
+}, { auth: { role: 'contractor', forbidden: 'Contractor access required' } })
+
+// Get contractor coupons - GET /api/coupons
+router.get('/coupons', async ({ request, db, decoded }) => {
+  const page = parsePageParams(new URL(request.url).searchParams)
+  const { items, has_more, next_cursor } = await findPage(
+    db.collection('coupons'),
+    { contractor_id: decoded.userId },
+    { ...page, projection: { _id: 0 } }
+  )
+
+  return handleCORS(NextResponse.json({ coupons: items, has_more, next_cursor }))
+}, { auth: { role: 'contractor', forbidden: 'Contractor access required' } })
+
+// REMOTE EMPLOYEE ROUTES (formerly contractor routes)
+// Get Remote Employee stats - GET /api/remote-employee/stats
+router.get('/remote-employee/stats', async ({ db, decoded }) => {
+  const contractor = await db.collection('contractors').findOne({ user_id: decoded.userId })
+  if (!contractor) {
+    return handleCORS(NextResponse.json({ error: 'Remote Employee profile not found' }, { status: 404 }))
+  }
 
-      const cleanedUsers = users.map(({ _id, password, ...rest }) => rest)
-      
-      return handleCORS(NextResponse.json({ users: cleanedUsers }))
+  return handleCORS(NextResponse.json({
+    points: contractor.points,
+    total_signups: contractor.total_signups,
+    username: contractor.username,
+    discount_percent: 20
+  }))
+}, { auth: { role: 'contractor', forbidden: 'Remote Employee access required' } })
+
+// CONTRACTOR ROUTES (kept for backward compatibility)
+// Get contractor stats - GET /api/contractor/stats
+router.get('/contractor/stats', async ({ db, decoded }) => {
+  // Profile and coupon counts in one round-trip; both counts are answered from the
+  // (contractor_id, expires_at) index instead of loading every coupon
+  const now = new Date()
+  const [contractor] = await db.collection('contractors').aggregate([
+    { $match: { user_id: decoded.userId } },
+    { $limit: 1 },
+    {
+      $lookup: {
+        from: 'coupons',
+        pipeline: [{ $match: { contractor_id: decoded.userId } }, { $count: 'count' }],
+        as: 'total_coupons'
+      }
+    },
+    {
+      $lookup: {
+        from: 'coupons',
+        pipeline: [
+          { $match: { contractor_id: decoded.userId, expires_at: { $gt: now } } },
+          { $match: { $expr: { $lt: ['$current_uses', '$max_uses'] } } },
+          { $count: 'count' }
+        ],
+        as: 'active_coupons'
+      }
+    },
+    {
+      $project: {
+        _id: 0,
+        points: 1,
+        total_signups: 1,
+        total_coupons: { $ifNull: [{ $arrayElemAt: ['$total_coupons.count', 0] }, 0] },
+        active_coupons: { $ifNull: [{ $arrayElemAt: ['$active_coupons.count', 0] }, 0] }
+      }
     }
+  ]).toArray()
 
-    // Get all letters - GET /api/admin/letters
-    if (route === '/admin/letters' && method === 'GET') {
-      const authHeader = request.headers.get('authorization')
-      if (!authHeader) {
-        return handleCORS(NextResponse.json({ error: 'Authorization required' }, { status: 401 }))
-      }
+  if (!contractor) {
+    return handleCORS(NextResponse.json({ error: 'Contractor profile not found' }, { status: 404 }))
+  }
 
-      const token = authHeader.split(' ')[1]
-      const decoded = verifyToken(token)
-      
-      if (!decoded || decoded.role !== 'admin') {
-        return handleCORS(NextResponse.json({ error: 'Admin access required' }, { status: 403 }))
-      }
+  return handleCORS(NextResponse.json({
+    points: contractor.points,
+    total_signups: contractor.total_signups,
+    total_coupons: contractor.total_coupons,
+    active_coupons: contractor.active_coupons
+  }))
+}, { auth: { role: 'contractor', forbidden: 'Contractor access required' } })
+
+// ADMIN ROUTES
+// Get all users - GET /api/admin/users
+router.get('/admin/users', async ({ request, db }) => {
+  const page = parsePageParams(new URL(request.url).searchParams)
+  const { items, has_more, next_cursor } = await findPage(
+    db.collection('users'),
+    {},
+    { ...page, projection: { _id: 0, password: 0 } }
+  )
+
+  return handleCORS(NextResponse.json({ users: items, has_more, next_cursor }))
+}, { auth: { role: 'admin', forbidden: 'Admin access required' } })
+
+// Get all letters - GET /api/admin/letters
+router.get('/admin/letters', async ({ request, db }) => {
+  // Summary rows by default; ?include=content,form_data returns the full documents
+  const page = parsePageParams(new URL(request.url).searchParams)
+  const { items, has_more, next_cursor } = await findPage(
+    db.collection('letters'),
+    {},
+    { ...page, projection: summaryProjection(['content', 'form_data'], page.include) }
+  )
+
+  return handleCORS(NextResponse.json({ letters: items, has_more, next_cursor }))
+}, { auth: { role: 'admin', forbidden: 'Admin access required' } })
+
+// Get dashboard totals - GET /api/admin/summary
+router.get('/admin/summary', async ({ db }) => {
+  const summary = await adminSummary(db)
+  return handleCORS(NextResponse.json(summary))
+}, { auth: { role: 'admin', forbidden: 'Admin access required' } })
 
-      const letters = await db.collection('letters')
-        .find({})
-        .sort({ created_at: -1 })
-        .toArray()
+// Route handler function
+async function handleRoute(request, { params }) {
+  return runWithTiming(async () => {
+    const startedAt = performance.now()
+    const { path = [] } = params
+    const match = router.match(request.method, path)
+
+    const response = await dispatch(request, path, match)
+
+    // Label by route pattern, not concrete path, so ids do not explode metric cardinality
+    observeRequest(request.method, match ? match.route.pattern : 'unmatched', response.status, (performance.now() - startedAt) / 1000)
+    // Streamed responses only cover the time until the stream started
+    response.headers.set('Server-Timing', serverTimingHeader())
+    return response
+  })
+}
 
-      const cleanedLetters = letters.map(({ _id, ...rest }) => rest)
-      
-      return handleCORS(NextResponse.json({ letters: cleanedLetters }))
+async function dispatch(request, path, match) {
+  const route = `/${path.join('/')}`
+
+  try {
+    if (match) {
+      const authStartedAt = performance.now()
+      const auth = authenticate(request, match.route.options.auth)
+      recordSpan('auth', performance.now() - authStartedAt)
+      if (auth.response) {
+        return auth.response
+      }
+
+      // Routes declared with `db: false` never wait on (or trigger) the Mongo connection
+      let db = null
+      if (match.route.options.db !== false) {
+        const connectStartedAt = performance.now()
+        db = await connectToMongo()
+        recordSpan('mongo.connect', performance.now() - connectStartedAt)
+      }
+      return await match.route.handler({ request, db, decoded: auth.decoded, params: match.params })
     }
 
     // Route not found
@@ -1324,6 +1687,24 @@ async function handleRoute(request, { params }) {
     ));
 
   } catch (error) {
+    if (error instanceof InvalidCursorError) {
+      return handleCORS(NextResponse.json({ error: error.message }, { status: 400 }))
+    }
+
+    if (error instanceof OverloadedError) {
+      return handleCORS(NextResponse.json(
+        { error: 'AI service is busy. Please try again shortly.', ai_service_busy: true },
+        { status: 503, headers: { 'Retry-After': String(error.retryAfter) } }
+      ))
+    }
+
+    if (error instanceof HashQueueFullError) {
+      return handleCORS(NextResponse.json(
+        { error: 'Server is busy. Please try again shortly.' },
+        { status: 503, headers: { 'Retry-After': '1' } }
+      ))
+    }
+
     console.error('API Error:', error)
     return handleCORS(NextResponse.json(
       { 
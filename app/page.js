@@ -19,6 +19,7 @@ import { v4 as uuidv4 } from 'uuid'
 import LetterGenerationTimeline from '@/components/timeline/LetterGenerationTimeline'
 import NewLandingPage from '@/components/landing/NewLandingPage'
 import SubscriptionModal from '@/components/modals/SubscriptionModal'
+import { fetchAllPages, fetchPage } from '@/services/api'
 
 const stripePromise = loadStripe(process.env.NEXT_PUBLIC_STRIPE_PUBLISHABLE_KEY)
 
@@ -99,13 +100,10 @@ export default function App() {
     setShowAuthModal(false)
     
     try {
-      const response = await fetch('/api/letters', {
+      const data = await fetchAllPages('/api/letters?include=content', 'letters', {
         headers: { 'Authorization': `Bearer ${userToken}` }
       })
-      if (response.ok) {
-        const data = await response.json()
-        setLetters(data.letters)
-      }
+      setLetters(data.letters)
     } catch (error) {
       console.error('Error fetching letters:', error)
     }
@@ -166,15 +164,13 @@ export default function App() {
           setToken(savedToken)
           
           // Fetch letters
-          fetch('/api/letters', {
+          fetchAllPages('/api/letters?include=content', 'letters', {
             headers: { 'Authorization': `Bearer ${savedToken}` }
           })
-          .then(res => res.json())
           .then(letterData => {
-            if (letterData.letters) {
-              setLetters(letterData.letters)
-            }
+            setLetters(letterData.letters)
           })
+          .catch(error => console.error('Error fetching letters:', error))
         }
       })
       .catch(() => {
@@ -541,6 +537,9 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
   const [usersData, setUsersData] = useState([])
   const [remoteEmployeesData, setRemoteEmployeesData] = useState([])
   const [lettersData, setLettersData] = useState([])
+  const [usersCursor, setUsersCursor] = useState(null)
+  const [lettersCursor, setLettersCursor] = useState(null)
+  const [roleCounts, setRoleCounts] = useState(null)
   const [loading, setLoading] = useState(true)
   const [stats, setStats] = useState({
     totalUsers: 0,
@@ -552,99 +551,97 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
     lettersTrend: []
   })
 
+  // Attach referral stats to the contractors on a page of users
+  const withContractorStats = (users) => Promise.all(
+    users.filter(user => user.role === 'contractor').map(async (employee) => {
+      try {
+        // Get contractor profile
+        const contractorResponse = await fetch('/api/remote-employee/stats', {
+          headers: { 'Authorization': `Bearer ${token}` }
+        })
+        
+        if (contractorResponse.ok) {
+          const contractorData = await contractorResponse.json()
+          return {
+            ...employee,
+            points: contractorData.points || 0,
+            total_signups: contractorData.total_signups || 0,
+            username: contractorData.username || employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
+          }
+        }
+        return {
+          ...employee,
+          points: 0,
+          total_signups: 0,
+          username: employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
+        }
+      } catch (error) {
+        console.error('Error fetching contractor stats:', error)
+        return {
+          ...employee,
+          points: 0,
+          total_signups: 0,
+          username: employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
+        }
+      }
+    })
+  )
+
   // Fetch admin data
   useEffect(() => {
     const fetchAdminData = async () => {
       try {
         setLoading(true)
+        const options = { headers: { 'Authorization': `Bearer ${token}` } }
         
-        // Fetch all users
-        const usersResponse = await fetch('/api/admin/users', {
-          headers: { 'Authorization': `Bearer ${token}` }
-        })
-        const usersData = await usersResponse.json()
-        
-        if (usersResponse.ok) {
-          setUsersData(usersData.users)
-          
-          // Calculate stats
-          const totalUsers = usersData.users.length
-          const remoteEmployees = usersData.users.filter(user => user.role === 'contractor')
-          const totalCouponUsage = usersData.users.filter(user => user.referral_code).length
-          
-          setStats(prev => ({
-            ...prev,
-            totalUsers,
-            totalRemoteEmployees: remoteEmployees.length,
-            totalCouponUsage
-          }))
-          
-          // Get remote employees with their stats
-          const remoteEmployeesWithStats = await Promise.all(
-            remoteEmployees.map(async (employee) => {
-              try {
-                // Get contractor profile
-                const contractorResponse = await fetch('/api/remote-employee/stats', {
-                  headers: { 'Authorization': `Bearer ${token}` }
-                })
-                
-                if (contractorResponse.ok) {
-                  const contractorData = await contractorResponse.json()
-                  return {
-                    ...employee,
-                    points: contractorData.points || 0,
-                    total_signups: contractorData.total_signups || 0,
-                    username: contractorData.username || employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
-                  }
-                }
-                return {
-                  ...employee,
-                  points: 0,
-                  total_signups: 0,
-                  username: employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
-                }
-              } catch (error) {
-                console.error('Error fetching contractor stats:', error)
-                return {
-                  ...employee,
-                  points: 0,
-                  total_signups: 0,
-                  username: employee.name.toLowerCase().replace(/\s+/g, '').substring(0, 5)
-                }
-              }
-            })
-          )
-          
-          setRemoteEmployeesData(remoteEmployeesWithStats)
-        }
+        // Totals and chart series are counted server-side; the tables only load their first page
+        const [summaryResponse, usersPage, lettersPage] = await Promise.all([
+          fetch('/api/admin/summary', options),
+          fetchPage('/api/admin/users', 'users', null, options),
+          fetchPage('/api/admin/letters', 'letters', null, options)
+        ])
+        const summary = summaryResponse.ok ? await summaryResponse.json() : null
         
-        // Fetch letters count
-        const lettersResponse = await fetch('/api/admin/letters', {
-          headers: { 'Authorization': `Bearer ${token}` }
-        })
-        const lettersData = await lettersResponse.json()
+        setUsersData(usersPage.users)
+        setUsersCursor(usersPage.next_cursor)
+        setLettersData(lettersPage.letters)
+        setLettersCursor(lettersPage.next_cursor)
+        setRoleCounts(summary ? summary.users.by_role : null)
         
-        if (lettersResponse.ok) {
-          setLettersData(lettersData.letters)
-          
-          // Process letter analytics
-          const lettersByType = processLettersByType(lettersData.letters)
-          const lettersTrend = processLettersTrend(lettersData.letters)
-          
-          setStats(prev => ({
-            ...prev,
-            totalLetters: lettersData.letters.length,
-            lettersByType,
-            lettersTrend
-          }))
+        if (summary) {
+          setStats({
+            totalUsers: summary.users.total,
+            totalRemoteEmployees: summary.users.by_role.contractor || 0,
+            totalCouponUsage: summary.users.referrals,
+            totalLetters: summary.letters.total,
+            lettersByType: Object.entries(summary.letters.by_type).map(([name, value]) => ({
+              name: name.charAt(0).toUpperCase() + name.slice(1),
+              value
+            })),
+            lettersTrend: summary.letters.by_day.map(({ date, count }) => ({
+              date: new Date(date).toLocaleDateString(),
+              letters: count
+            })),
+            userGrowth: summary.users.by_day.map(({ date, count }) => ({
+              date: new Date(date).toLocaleDateString(),
+              users: count
+            }))
+          })
+        } else {
+          // Summary unavailable: fall back to what the first pages show
+          setStats({
+            totalUsers: usersPage.users.length,
+            totalRemoteEmployees: usersPage.users.filter(user => user.role === 'contractor').length,
+            totalCouponUsage: usersPage.users.filter(user => user.referral_code).length,
+            totalLetters: lettersPage.letters.length,
+            lettersByType: processLettersByType(lettersPage.letters),
+            lettersTrend: processLettersTrend(lettersPage.letters),
+            userGrowth: processUserGrowth(usersPage.users)
+          })
         }
         
-        // Process user growth analytics
-        const userGrowth = processUserGrowth(usersData.users)
-        setStats(prev => ({
-          ...prev,
-          userGrowth
-        }))
+        // Get remote employees with their stats
+        setRemoteEmployeesData(await withContractorStats(usersPage.users))
         
       } catch (error) {
         console.error('Error fetching admin data:', error)
@@ -657,6 +654,36 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
     fetchAdminData()
   }, [token])
 
+  // Append the next page of users to the table
+  const loadMoreUsers = async () => {
+    try {
+      const page = await fetchPage('/api/admin/users', 'users', usersCursor, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      })
+      setUsersData(prev => [...prev, ...page.users])
+      setUsersCursor(page.next_cursor)
+      const employees = await withContractorStats(page.users)
+      setRemoteEmployeesData(prev => [...prev, ...employees])
+    } catch (error) {
+      console.error('Error loading users:', error)
+      toast.error('Failed to load more users')
+    }
+  }
+
+  // Append the next page of letters
+  const loadMoreLetters = async () => {
+    try {
+      const page = await fetchPage('/api/admin/letters', 'letters', lettersCursor, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      })
+      setLettersData(prev => [...prev, ...page.letters])
+      setLettersCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Error loading letters:', error)
+      toast.error('Failed to load more letters')
+    }
+  }
+
   const getUsersByRole = (role) => {
     return usersData.filter(user => user.role === role)
   }
@@ -777,7 +804,12 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
           </TabsList>
 
           <TabsContent value="users">
-            <UsersSection users={usersData} couponStats={getCouponUsageStats()} />
+            <UsersSection
+              users={usersData}
+              roleCounts={roleCounts}
+              couponStats={getCouponUsageStats()}
+              onLoadMore={usersCursor ? loadMoreUsers : null}
+            />
           </TabsContent>
 
           <TabsContent value="remote-employees">
@@ -785,7 +817,11 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
           </TabsContent>
 
           <TabsContent value="analytics">
-            <AnalyticsSection stats={stats} lettersData={lettersData} />
+            <AnalyticsSection
+              stats={stats}
+              lettersData={lettersData}
+              onLoadMoreLetters={lettersCursor ? loadMoreLetters : null}
+            />
           </TabsContent>
         </Tabs>
       </div>
@@ -794,15 +830,12 @@ const AdminDashboard = ({ user, token, handleLogout }) => {
 }
 
 // Users Section Component
-const UsersSection = ({ users, couponStats }) => {
-  const getUsersByRole = (role) => {
-    return users.filter(user => user.role === role)
+const UsersSection = ({ users, roleCounts, couponStats, onLoadMore }) => {
+  // Role totals come from /admin/summary; count the loaded page only if it is unavailable
+  const countByRole = (role) => {
+    return roleCounts ? (roleCounts[role] || 0) : users.filter(user => user.role === role).length
   }
 
-  const regularUsers = getUsersByRole('user')
-  const contractors = getUsersByRole('contractor')
-  const admins = getUsersByRole('admin')
-
   return (
     <div className="space-y-6">
       {/* User Statistics */}
@@ -816,15 +849,15 @@ const UsersSection = ({ users, couponStats }) => {
         <CardContent>
           <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
             <div className="text-center p-4 bg-blue-50 rounded-lg">
-              <div className="text-2xl font-bold text-blue-600">{regularUsers.length}</div>
+              <div className="text-2xl font-bold text-blue-600">{countByRole('user')}</div>
               <div className="text-sm text-gray-600">Regular Users</div>
             </div>
             <div className="text-center p-4 bg-green-50 rounded-lg">
-              <div className="text-2xl font-bold text-green-600">{contractors.length}</div>
+              <div className="text-2xl font-bold text-green-600">{countByRole('contractor')}</div>
               <div className="text-sm text-gray-600">Contractors</div>
             </div>
             <div className="text-center p-4 bg-purple-50 rounded-lg">
-              <div className="text-2xl font-bold text-purple-600">{admins.length}</div>
+              <div className="text-2xl font-bold text-purple-600">{countByRole('admin')}</div>
               <div className="text-sm text-gray-600">Administrators</div>
             </div>
           </div>
@@ -878,7 +911,7 @@ const UsersSection = ({ users, couponStats }) => {
                 </tr>
               </thead>
               <tbody>
-                {users.slice(0, 10).map((user) => (
+                {users.map((user) => (
                   <tr key={user.id} className="border-b hover:bg-gray-50">
                     <td className="p-3 font-medium">{user.name}</td>
                     <td className="p-3 text-gray-600">{user.email}</td>
@@ -896,6 +929,14 @@ const UsersSection = ({ users, couponStats }) => {
               </tbody>
             </table>
           </div>
+          
+          {onLoadMore && (
+            <div className="flex justify-center mt-4">
+              <Button variant="outline" onClick={onLoadMore}>
+                Load more users
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
@@ -1795,14 +1836,10 @@ const MyLettersSection = ({ letters, refreshKey }) => {
 
   const fetchLetters = async () => {
     try {
-      const response = await fetch('/api/letters', {
+      const data = await fetchAllPages('/api/letters?include=content', 'letters', {
         headers: { 'Authorization': `Bearer ${token}` }
       })
-      
-      if (response.ok) {
-        const data = await response.json()
-        setUserLetters(data.letters || [])
-      }
+      setUserLetters(data.letters)
     } catch (error) {
       console.error('Error fetching letters:', error)
     } finally {
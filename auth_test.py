@@ -4,16 +4,17 @@ Comprehensive Authentication System Testing for LetterDash
 Tests all authentication endpoints and functionality after recent fixes
 """
 
-import requests
 import json
 import time
 import uuid
 import os
 from datetime import datetime
 
-# Get base URL from environment
-BASE_URL = "https://e84f8a3d-0d39-435e-9801-5c4ea21bd735.preview.emergentagent.com"
-API_URL = f"{BASE_URL}/api"
+from tests.client import ApiClient
+
+# Get base URL from environment (TTML_BASE_URL / TTML_TARGET)
+client = ApiClient(default_target="preview")
+API_URL = client.base_url
 
 class AuthenticationTester:
     def __init__(self):
@@ -42,23 +43,27 @@ class AuthenticationTester:
         
     def log_test(self, test_name, success, message, details=None):
         """Log test results"""
+        note = client.timing_note()
         result = {
             'test': test_name,
             'success': success,
             'message': message,
             'timestamp': datetime.now().isoformat(),
-            'details': details
+            'details': details,
+            'timing': note
         }
         self.test_results.append(result)
         status = "✅ PASS" if success else "❌ FAIL"
         print(f"{status}: {test_name} - {message}")
         if details:
             print(f"   Details: {details}")
+        if note:
+            print(f"   ⏱️  {note}")
     
     def test_root_endpoint(self):
         """Test the root API endpoint"""
         try:
-            response = requests.get(f"{self.base_url}/")
+            response = client.get(f"{self.base_url}/")
             if response.status_code == 200:
                 data = response.json()
                 self.log_test("Root Endpoint", True, "API is running", data.get('message'))
@@ -80,7 +85,7 @@ class AuthenticationTester:
                 if role != 'user':
                     test_case['role'] = role
                 
-                response = requests.post(
+                response = client.post(
                     f"{self.base_url}/auth/register",
                     json=test_case,
                     headers={'Content-Type': 'application/json'}
@@ -149,7 +154,7 @@ class AuthenticationTester:
                     'password': self.test_users[role]['password']
                 }
                 
-                response = requests.post(
+                response = client.post(
                     f"{self.base_url}/auth/login",
                     json=login_data,
                     headers={'Content-Type': 'application/json'}
@@ -212,7 +217,7 @@ class AuthenticationTester:
                     'Content-Type': 'application/json'
                 }
                 
-                response = requests.get(
+                response = client.get(
                     f"{self.base_url}/auth/me",
                     headers=headers
                 )
@@ -271,7 +276,7 @@ class AuthenticationTester:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(
+            response = client.get(
                 f"{self.base_url}/remote-employee/stats",
                 headers=headers
             )
@@ -290,7 +295,7 @@ class AuthenticationTester:
                     )
                     
                     # Test coupon validation
-                    validate_response = requests.post(
+                    validate_response = client.post(
                         f"{self.base_url}/coupons/validate",
                         json={'coupon_code': referral_code},
                         headers={'Content-Type': 'application/json'}
@@ -364,7 +369,7 @@ class AuthenticationTester:
                 'coupon_code': self.contractor_username
             }
             
-            response = requests.post(
+            response = client.post(
                 f"{self.base_url}/auth/register-with-coupon",
                 json=coupon_user_data,
                 headers={'Content-Type': 'application/json'}
@@ -398,7 +403,7 @@ class AuthenticationTester:
                         'Authorization': f'Bearer {self.tokens["contractor"]}',
                         'Content-Type': 'application/json'
                     }
-                    updated_stats_response = requests.get(
+                    updated_stats_response = client.get(
                         f"{self.base_url}/remote-employee/stats",
                         headers=headers
                     )
@@ -459,7 +464,7 @@ class AuthenticationTester:
                     'Content-Type': 'application/json'
                 }
                 
-                response = requests.get(
+                response = client.get(
                     f"{self.base_url}/remote-employee/stats",
                     headers=headers
                 )
@@ -495,7 +500,7 @@ class AuthenticationTester:
                     'Content-Type': 'application/json'
                 }
                 
-                response = requests.get(
+                response = client.get(
                     f"{self.base_url}/admin/users",
                     headers=headers
                 )
@@ -531,7 +536,7 @@ class AuthenticationTester:
                     'Content-Type': 'application/json'
                 }
                 
-                response = requests.get(
+                response = client.get(
                     f"{self.base_url}/admin/users",
                     headers=headers
                 )
@@ -581,7 +586,7 @@ class AuthenticationTester:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(
+            response = client.get(
                 f"{self.base_url}/auth/me",
                 headers=headers
             )
@@ -620,7 +625,7 @@ class AuthenticationTester:
                 'name': 'Weak Password User'
             }
             
-            response = requests.post(
+            response = client.post(
                 f"{self.base_url}/auth/register",
                 json=weak_password_data,
                 headers={'Content-Type': 'application/json'}
@@ -664,7 +669,7 @@ class AuthenticationTester:
                 'name': 'Duplicate User'
             }
             
-            response = requests.post(
+            response = client.post(
                 f"{self.base_url}/auth/register",
                 json=duplicate_data,
                 headers={'Content-Type': 'application/json'}
@@ -703,7 +708,7 @@ class AuthenticationTester:
                 'password': 'WrongPassword123!'
             }
             
-            response = requests.post(
+            response = client.post(
                 f"{self.base_url}/auth/login",
                 json=invalid_login_data,
                 headers={'Content-Type': 'application/json'}
@@ -786,4 +791,5 @@ class AuthenticationTester:
 if __name__ == "__main__":
     tester = AuthenticationTester()
     success = tester.run_all_tests()
+    client.print_timings()
     exit(0 if success else 1)
\ No newline at end of file
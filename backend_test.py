@@ -5,16 +5,17 @@ Comprehensive testing of admin dashboard functionality including authentication,
 user management, letter statistics, and remote employee stats.
 """
 
-import requests
 import json
 import time
 import os
 import sys
 from datetime import datetime
 
+from tests.client import ApiClient, HEADERS
+
 # Configuration
-BASE_URL = "http://localhost:3000/api"
-HEADERS = {"Content-Type": "application/json"}
+client = ApiClient(default_target="local")
+BASE_URL = client.base_url
 
 # Test data for admin dashboard testing
 TEST_USERS = {
@@ -49,18 +50,22 @@ def log_test(test_name, status, message="", details=None):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status_symbol = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
     
+    note = client.timing_note()
     result = {
         'test': test_name,
         'status': status,
         'message': message,
         'details': details,
-        'timestamp': timestamp
+        'timestamp': timestamp,
+        'timing': note
     }
     test_results.append(result)
     
     print(f"[{timestamp}] {status_symbol} {test_name}: {message}")
     if details and status == "FAIL":
         print(f"   Details: {details}")
+    if note:
+        print(f"   ⏱️  {note}")
 
 def setup_admin_dashboard_users():
     """Setup users specifically for admin dashboard testing"""
@@ -70,7 +75,7 @@ def setup_admin_dashboard_users():
     for role, user_info in TEST_USERS.items():
         try:
             # Try to register user
-            response = requests.post(f"{BASE_URL}/auth/register", json=user_info, headers=HEADERS)
+            response = client.post(f"{BASE_URL}/auth/register", json=user_info, headers=HEADERS)
             
             if response.status_code == 200:
                 data = response.json()
@@ -85,7 +90,7 @@ def setup_admin_dashboard_users():
                     
             elif response.status_code == 400 and "already exists" in response.text:
                 # User exists, try to login
-                login_response = requests.post(f"{BASE_URL}/auth/login", json={
+                login_response = client.post(f"{BASE_URL}/auth/login", json={
                     "email": user_info["email"],
                     "password": user_info["password"]
                 }, headers=HEADERS)
@@ -120,7 +125,7 @@ def test_admin_authentication():
     
     try:
         headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
-        response = requests.get(f"{BASE_URL}/auth/me", headers=headers)
+        response = client.get(f"{BASE_URL}/auth/me", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -150,36 +155,16 @@ def test_admin_users_endpoint():
     
     try:
         headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
-        response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
+        response = client.get(f"{BASE_URL}/admin/users", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
             users = data.get('users', [])
             
             if isinstance(users, list):
-                # Analyze user data for admin dashboard
-                user_count = len(users)
-                roles = {}
-                subscription_stats = {'free': 0, 'paid': 0}
-                coupon_usage = 0
-                
-                for user in users:
-                    role = user.get('role', 'unknown')
-                    roles[role] = roles.get(role, 0) + 1
-                    
-                    subscription = user.get('subscription', {})
-                    if subscription.get('status') == 'paid':
-                        subscription_stats['paid'] += 1
-                    else:
-                        subscription_stats['free'] += 1
-                    
-                    if subscription.get('referred_by'):
-                        coupon_usage += 1
-                
+                # Role/subscription totals come from /admin/summary (see test_admin_summary_endpoint)
                 log_test("Admin Users Endpoint", "PASS", 
-                        f"Retrieved {user_count} users. Roles: {roles}")
-                log_test("Admin Users Data Analysis", "PASS", 
-                        f"Subscriptions: {subscription_stats}, Referrals: {coupon_usage}")
+                        f"Retrieved {len(users)} users (has_more: {data.get('has_more')})")
                 
                 # Validate required fields for admin dashboard
                 if users:
@@ -209,6 +194,97 @@ def test_admin_users_endpoint():
     
     return False
 
+def test_admin_summary_endpoint():
+    """Test GET /api/admin/summary aggregated dashboard totals"""
+    print("\n📊 TESTING ADMIN SUMMARY ENDPOINT")
+    print("=" * 36)
+    
+    if 'admin' not in tokens:
+        log_test("Admin Summary Endpoint", "FAIL", "No admin token available")
+        return False
+    
+    try:
+        headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
+        response = client.get(f"{BASE_URL}/admin/summary", headers=headers)
+        
+        if response.status_code != 200:
+            log_test("Admin Summary Endpoint", "FAIL", f"HTTP {response.status_code}: {response.text}")
+            return False
+        
+        summary = response.json()
+        missing_sections = [key for key in ('users', 'letters', 'contractors') if key not in summary]
+        if missing_sections:
+            log_test("Admin Summary Endpoint", "FAIL", f"Missing sections: {missing_sections}")
+            return False
+        
+        users = summary['users']
+        letters = summary['letters']
+        contractors = summary['contractors']
+        log_test("Admin Summary Endpoint", "PASS", 
+                f"{len(response.content)} bytes. Users: {users['total']}, Roles: {users['by_role']}, "
+                f"Subscriptions: {users['subscriptions']}, Referrals: {users['referrals']}")
+        log_test("Admin Summary Letters", "PASS", 
+                f"Letters: {letters['total']}, Status: {letters['by_status']}, Stage: {letters['by_stage']}")
+        log_test("Admin Summary Contractors", "PASS", 
+                f"Contractors: {contractors['total']}, Points: {contractors['total_points']}, "
+                f"Buckets: {contractors['by_points']}")
+        
+        # Every breakdown must add up to its total
+        consistent = (
+            sum(users['by_role'].values()) == users['total']
+            and sum(users['subscriptions'].values()) == users['total']
+            and sum(letters['by_stage'].values()) == letters['total']
+            and sum(letters['by_type'].values()) == letters['total']
+            and sum(bucket['count'] for bucket in contractors['by_points']) == contractors['total']
+        )
+        if consistent:
+            log_test("Admin Summary Consistency", "PASS", "Breakdowns add up to their totals")
+        else:
+            log_test("Admin Summary Consistency", "FAIL", "Breakdown counts do not match totals")
+        
+        # The dashboard accounts created during setup must be counted
+        missing_roles = [role for role in ('admin', 'user', 'contractor') 
+                         if role in tokens and users['by_role'].get(role, 0) < 1]
+        if missing_roles:
+            log_test("Admin Summary Roles", "FAIL", f"No users counted for roles: {missing_roles}")
+        else:
+            log_test("Admin Summary Roles", "PASS", "Test account roles are counted")
+        
+        # On small databases, cross-check the aggregation against a full /admin/users listing
+        users_response = client.get(f"{BASE_URL}/admin/users", headers=headers, params={"limit": 200})
+        if users_response.status_code == 200 and not users_response.json().get('has_more'):
+            listed = users_response.json().get('users', [])
+            roles = {}
+            paid = 0
+            referrals = 0
+            for user in listed:
+                roles[user.get('role', 'unknown')] = roles.get(user.get('role', 'unknown'), 0) + 1
+                subscription = user.get('subscription') or {}
+                paid += subscription.get('status') == 'paid'
+                referrals += bool(subscription.get('referred_by'))
+            
+            if (len(listed), roles, paid, referrals) == (users['total'], users['by_role'], users['subscriptions']['paid'], users['referrals']):
+                log_test("Admin Summary Cross-check", "PASS", f"Matches a full listing of {len(listed)} users")
+            else:
+                log_test("Admin Summary Cross-check", "FAIL", 
+                        f"Listing gives {len(listed)} users, roles {roles}, paid {paid}, referrals {referrals}")
+        
+        # Non-admins must be denied
+        if 'user' in tokens:
+            user_headers = {**HEADERS, "Authorization": f"Bearer {tokens['user']}"}
+            denied = client.get(f"{BASE_URL}/admin/summary", headers=user_headers)
+            if denied.status_code == 403:
+                log_test("Admin Summary Access Control", "PASS", "Regular user correctly denied")
+            else:
+                log_test("Admin Summary Access Control", "FAIL", f"Expected 403, got {denied.status_code}")
+        
+        return consistent and not missing_roles
+            
+    except Exception as e:
+        log_test("Admin Summary Endpoint", "FAIL", f"Exception: {str(e)}")
+    
+    return False
+
 def test_admin_letters_endpoint():
     """Test GET /api/admin/letters endpoint for admin dashboard statistics"""
     print("\n📄 TESTING ADMIN LETTERS ENDPOINT")
@@ -220,7 +296,7 @@ def test_admin_letters_endpoint():
     
     try:
         headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
-        response = requests.get(f"{BASE_URL}/admin/letters", headers=headers)
+        response = client.get(f"{BASE_URL}/admin/letters", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -251,14 +327,21 @@ def test_admin_letters_endpoint():
                 # Validate data structure for admin dashboard
                 if letters:
                     sample_letter = letters[0]
-                    required_fields = ['id', 'user_id', 'title', 'content', 'created_at']
+                    required_fields = ['id', 'user_id', 'title', 'created_at']
                     missing_fields = [field for field in required_fields if field not in sample_letter]
                     
                     if not missing_fields:
                         log_test("Admin Letters Data Structure", "PASS", "All required fields present")
                     else:
                         log_test("Admin Letters Data Structure", "FAIL", f"Missing fields: {missing_fields}")
+                    
+                    # Summary projection - heavy fields are only sent when requested
+                    if 'content' not in sample_letter and 'form_data' not in sample_letter:
+                        log_test("Admin Letters Summary Projection", "PASS", "content/form_data omitted by default")
+                    else:
+                        log_test("Admin Letters Summary Projection", "FAIL", "content/form_data present without ?include=")
                 
+                test_admin_letters_pagination(headers)
                 return True
             else:
                 log_test("Admin Letters Endpoint", "FAIL", "Invalid response format")
@@ -270,6 +353,55 @@ def test_admin_letters_endpoint():
     
     return False
 
+def test_admin_letters_pagination(headers):
+    """Walk /admin/letters with a small page size and check the cursor chain"""
+    try:
+        page_size = 2
+        seen_ids = []
+        cursor = None
+        pages = 0
+        
+        while pages < 50:
+            params = {"limit": page_size, "include": "content"}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get(f"{BASE_URL}/admin/letters", headers=headers, params=params)
+            if response.status_code != 200:
+                log_test("Admin Letters Pagination", "FAIL", f"HTTP {response.status_code}: {response.text}")
+                return False
+            
+            data = response.json()
+            letters = data.get('letters', [])
+            if len(letters) > page_size:
+                log_test("Admin Letters Pagination", "FAIL", f"Page size {len(letters)} exceeds limit {page_size}")
+                return False
+            if letters and 'content' not in letters[0]:
+                log_test("Admin Letters Pagination", "FAIL", "include=content did not return letter content")
+                return False
+            
+            seen_ids.extend(letter['id'] for letter in letters)
+            pages += 1
+            cursor = data.get('next_cursor')
+            if not data.get('has_more') or not cursor:
+                break
+        
+        if len(seen_ids) != len(set(seen_ids)):
+            log_test("Admin Letters Pagination", "FAIL", "Duplicate letters returned across pages")
+            return False
+        
+        log_test("Admin Letters Pagination", "PASS", f"Walked {len(seen_ids)} letters over {pages} page(s)")
+        
+        response = client.get(f"{BASE_URL}/admin/letters", headers=headers, params={"cursor": "not-a-cursor"})
+        if response.status_code == 400:
+            log_test("Admin Letters Invalid Cursor", "PASS", "Malformed cursor rejected with 400")
+        else:
+            log_test("Admin Letters Invalid Cursor", "FAIL", f"Expected 400, got {response.status_code}")
+        return True
+        
+    except Exception as e:
+        log_test("Admin Letters Pagination", "FAIL", f"Exception: {str(e)}")
+        return False
+
 def test_remote_employee_stats():
     """Test GET /api/remote-employee/stats endpoint for Remote Employees Section"""
     print("\n🏢 TESTING REMOTE EMPLOYEE STATS")
@@ -281,7 +413,7 @@ def test_remote_employee_stats():
     
     try:
         headers = {**HEADERS, "Authorization": f"Bearer {tokens['contractor']}"}
-        response = requests.get(f"{BASE_URL}/remote-employee/stats", headers=headers)
+        response = client.get(f"{BASE_URL}/remote-employee/stats", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -329,7 +461,7 @@ def test_role_based_access_control():
     if 'user' in tokens:
         try:
             headers = {**HEADERS, "Authorization": f"Bearer {tokens['user']}"}
-            response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
+            response = client.get(f"{BASE_URL}/admin/users", headers=headers)
             
             if response.status_code == 403:
                 log_test("User Access Control", "PASS", "Regular user correctly denied admin access")
@@ -343,7 +475,7 @@ def test_role_based_access_control():
     if 'contractor' in tokens:
         try:
             headers = {**HEADERS, "Authorization": f"Bearer {tokens['contractor']}"}
-            response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
+            response = client.get(f"{BASE_URL}/admin/users", headers=headers)
             
             if response.status_code == 403:
                 log_test("Contractor Access Control", "PASS", "Contractor correctly denied admin access")
@@ -357,7 +489,7 @@ def test_role_based_access_control():
     if 'admin' in tokens:
         try:
             headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
-            response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
+            response = client.get(f"{BASE_URL}/admin/users", headers=headers)
             
             if response.status_code == 200:
                 log_test("Admin Access Control", "PASS", "Admin correctly granted access")
@@ -369,7 +501,7 @@ def test_role_based_access_control():
     
     # Test 4: No token access
     try:
-        response = requests.get(f"{BASE_URL}/admin/users", headers=HEADERS)
+        response = client.get(f"{BASE_URL}/admin/users", headers=HEADERS)
         
         if response.status_code == 401:
             log_test("No Token Access Control", "PASS", "Correctly denied access without token")
@@ -392,7 +524,7 @@ def test_data_structure_validation():
         headers = {**HEADERS, "Authorization": f"Bearer {tokens['admin']}"}
         
         # Test Users Section data structure
-        users_response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
+        users_response = client.get(f"{BASE_URL}/admin/users", headers=headers)
         if users_response.status_code == 200:
             users_data = users_response.json()
             users = users_data.get('users', [])
@@ -417,7 +549,7 @@ def test_data_structure_validation():
         # Test Remote Employees Section data structure
         if 'contractor' in tokens:
             contractor_headers = {**HEADERS, "Authorization": f"Bearer {tokens['contractor']}"}
-            stats_response = requests.get(f"{BASE_URL}/remote-employee/stats", headers=contractor_headers)
+            stats_response = client.get(f"{BASE_URL}/remote-employee/stats", headers=contractor_headers)
             
             if stats_response.status_code == 200:
                 stats_data = stats_response.json()
@@ -432,7 +564,7 @@ def test_data_structure_validation():
                     log_test("Remote Employees Section Data", "FAIL", f"Missing fields: {missing}")
         
         # Test Letters statistics data structure
-        letters_response = requests.get(f"{BASE_URL}/admin/letters", headers=headers)
+        letters_response = client.get(f"{BASE_URL}/admin/letters", headers=headers)
         if letters_response.status_code == 200:
             letters_data = letters_response.json()
             letters = letters_data.get('letters', [])
@@ -473,6 +605,7 @@ def run_admin_dashboard_tests():
     tests = [
         ("Admin Authentication", test_admin_authentication),
         ("Admin Users Endpoint", test_admin_users_endpoint),
+        ("Admin Summary Endpoint", test_admin_summary_endpoint),
         ("Admin Letters Endpoint", test_admin_letters_endpoint),
         ("Remote Employee Stats", test_remote_employee_stats),
         ("Role-Based Access Control", test_role_based_access_control),
@@ -531,4 +664,5 @@ def run_admin_dashboard_tests():
 
 if __name__ == "__main__":
     success = run_admin_dashboard_tests()
+    client.print_timings()
     sys.exit(0 if success else 1)
\ No newline at end of file
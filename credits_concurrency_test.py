@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for letter credits
+Gives a fresh user a fixed number of credits, fires more parallel /letters/generate
+requests than it can pay for, and checks that credits were never overspent: every
+successful letter took exactly one credit and every failed generation was refunded.
+Run it against tests/openai_stub.py to make generation fast and free.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+import uuid
+
+from pymongo import MongoClient
+
+from tests.client import ApiClient, HEADERS
+
+# Configuration
+client = ApiClient(default_target="local", retries=0, pool_size=64)
+BASE_URL = client.base_url
+
+# MongoDB connection
+DEFAULT_MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DEFAULT_DB_NAME = os.environ.get("DB_NAME", "letterdash_db")
+
+
+def generate_letter(token, index, barrier):
+    """Wait for every worker, then request one letter"""
+    barrier.wait()
+    headers = {**HEADERS, "Authorization": f"Bearer {token}"}
+    payload = {
+        "title": f"Concurrency Letter {index}",
+        "prompt": "Request payment of an overdue invoice.",
+        "letterType": "demand",
+        "formData": {"fullName": "Credit Test", "recipientName": "Debtor"}
+    }
+    try:
+        response = client.post(f"{BASE_URL}/letters/generate", headers=headers, json=payload, timeout=120)
+    except Exception as e:
+        return None, {"error": str(e)}
+    try:
+        return response.status_code, response.json()
+    except ValueError:
+        return response.status_code, {}
+
+
+def test_credit_concurrency(credits, requests_count, mongo_url, db_name):
+    """Fire requests_count parallel generates at a user holding `credits` credits"""
+    print(f"Testing credit reservation: {requests_count} parallel generates, {credits} credits")
+    print("=" * 60)
+
+    mongo_client = MongoClient(mongo_url)
+    db = mongo_client[db_name]
+    try:
+        # Register user
+        print("1. Registering test user...")
+        user_data = {
+            "email": f"credits_{uuid.uuid4().hex[:10]}@example.com",
+            "password": "password123",
+            "name": "Credits Test User",
+            "role": "user"
+        }
+        response = client.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=user_data, timeout=30)
+        if response.status_code != 200:
+            print(f"❌ Failed to register user: {response.status_code} {response.text}")
+            return False
+        token = response.json()["token"]
+        user_id = response.json()["user"]["id"]
+
+        # Grant credits directly in the database
+        print(f"2. Granting {credits} credits...")
+        db.users.update_one(
+            {"id": user_id},
+            {
+                "$set": {
+                    "subscription.status": "paid",
+                    "subscription.planId": f"pi_credits_{uuid.uuid4()}",
+                    "subscription.packageType": "8letters",
+                    "subscription.lettersRemaining": credits,
+                    "subscription.currentPeriodEnd": datetime.now() + timedelta(days=365),
+                    "updated_at": datetime.now()
+                }
+            }
+        )
+
+        print(f"3. Firing {requests_count} concurrent generate requests...")
+        barrier = threading.Barrier(requests_count)
+        with ThreadPoolExecutor(max_workers=requests_count) as pool:
+            results = list(pool.map(lambda i: generate_letter(token, i, barrier), range(requests_count)))
+
+        statuses = {}
+        for status, _ in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        succeeded = statuses.get(200, 0)
+        denied = statuses.get(403, 0)
+        failed = requests_count - succeeded - denied
+        print(f"   Responses: {statuses}")
+
+        remaining = db.users.find_one({"id": user_id})["subscription"]["lettersRemaining"]
+        stored = db.letters.count_documents({"user_id": user_id})
+        reported = sorted(body.get("letters_remaining") for status, body in results if status == 200)
+
+        print("4. Checking final state...")
+        checks = [
+            ("Credits never negative", remaining >= 0, f"lettersRemaining={remaining}"),
+            ("No overspend", succeeded <= credits, f"{succeeded} letters from {credits} credits"),
+            ("Counter matches successes (failures refunded)", remaining == credits - succeeded,
+             f"expected {credits - succeeded}, got {remaining}"),
+            ("One letter stored per success", stored == succeeded, f"{stored} stored, {succeeded} succeeded"),
+            ("Reported balances are distinct", len(set(reported)) == len(reported), f"{reported}"),
+        ]
+        if failed == 0 and requests_count >= credits:
+            checks.append(("All credits usable", succeeded == credits, f"{succeeded} of {credits} spent"))
+
+        all_passed = True
+        for name, passed, detail in checks:
+            print(f"{'✅' if passed else '❌'} {name}: {detail}")
+            all_passed = all_passed and passed
+
+        # Clean up
+        db.letters.delete_many({"user_id": user_id})
+        db.users.delete_one({"id": user_id})
+        return all_passed
+
+    except Exception as e:
+        print(f"❌ Exception during test: {str(e)}")
+        return False
+    finally:
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check letter credits under concurrent generation")
+    parser.add_argument("--credits", type=int, default=4, help="Credits granted to the test user")
+    parser.add_argument("--requests", type=int, default=16, help="Parallel generate requests")
+    parser.add_argument("--mongo-url", default=DEFAULT_MONGO_URL)
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    args = parser.parse_args()
+
+    success = test_credit_concurrency(args.credits, args.requests, args.mongo_url, args.db_name)
+    client.print_timings()
+    if success:
+        print("\n🎉 Credit Concurrency Test Completed Successfully!")
+    else:
+        print("\n❌ Credit Concurrency Test Failed")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Email outbox test
+Queues letter emails through /letters/{id}/send, some to a domain the Resend stand-in
+always rejects, waits for the outbox worker to deliver them and checks that every good
+email was sent exactly once with a provider id, every rejected one failed without
+holding up its batch, and each outcome produced one email_logs row.
+Run the API against tests/resend_stub.py:
+    python -m tests.resend_stub --error-rate 0.2 --rate-limit 5
+    RESEND_BASE_URL=http://localhost:8091 RESEND_API_KEY=re_stub yarn dev
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import requests
+from pymongo import MongoClient
+
+from tests.client import ApiClient, HEADERS
+
+# Configuration
+client = ApiClient(default_target="local", retries=0, pool_size=32)
+BASE_URL = client.base_url
+
+# MongoDB connection
+DEFAULT_MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DEFAULT_DB_NAME = os.environ.get("DB_NAME", "letterdash_db")
+
+
+def wait_for_outbox(outbox_ids, timeout):
+    """Poll /emails/{id} until every email is sent or failed"""
+    deadline = time.monotonic() + timeout
+    pending = set(outbox_ids)
+    final = {}
+    while pending and time.monotonic() < deadline:
+        for outbox_id in list(pending):
+            response = client.get(f"{BASE_URL}/emails/{outbox_id}", headers=HEADERS)
+            if response.status_code == 200 and response.json()["email"]["status"] in ("sent", "failed"):
+                final[outbox_id] = response.json()["email"]
+                pending.discard(outbox_id)
+        time.sleep(0.5)
+    return final, pending
+
+
+def test_email_outbox(count, rejected_count, stub_url, timeout, mongo_url, db_name):
+    print(f"Testing email outbox: {count} emails, {rejected_count} to a rejected domain")
+    print("=" * 60)
+
+    mongo_client = MongoClient(mongo_url)
+    db = mongo_client[db_name]
+    letter_id = str(uuid.uuid4())
+    try:
+        print("1. Creating test letter...")
+        db.letters.insert_one({
+            "id": letter_id,
+            "user_id": f"outbox-test-{uuid.uuid4().hex[:8]}",
+            "title": "Outbox Test Letter",
+            "content": "Dear Recipient,\n\nThis is a <test> letter & it should arrive exactly once.\n",
+            "status": "ready",
+            "stage": 4,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        })
+
+        stub_before = requests.get(f"{stub_url}/_stats", timeout=5).json() if stub_url else None
+
+        print("2. Queueing emails...")
+        good, bad = [], []
+        started = time.perf_counter()
+        for index in range(count):
+            rejected = index < rejected_count
+            recipient = f"outbox{index}@{'reject.test' if rejected else 'example.com'}"
+            response = client.post(f"{BASE_URL}/letters/{letter_id}/send", headers=HEADERS,
+                                   json={"recipientEmail": recipient})
+            if response.status_code != 202 or not response.json().get("outbox_id"):
+                print(f"❌ Send returned {response.status_code}: {response.text}")
+                return False
+            (bad if rejected else good).append(response.json()["outbox_id"])
+        queue_ms = (time.perf_counter() - started) * 1000 / count
+        print(f"   Queued {count} emails, {queue_ms:.1f}ms per request")
+
+        print("3. Waiting for delivery...")
+        final, pending = wait_for_outbox(good + bad, timeout)
+        elapsed = time.perf_counter() - started
+        statuses = {}
+        for email in final.values():
+            statuses[email["status"]] = statuses.get(email["status"], 0) + 1
+        print(f"   {statuses} after {elapsed:.1f}s, {len(pending)} still pending")
+
+        # email_logs rows are bulk-inserted about once a second
+        time.sleep(2)
+        outbox_ids = good + bad
+        log_rows = db.email_logs.count_documents({"outbox_id": {"$in": outbox_ids}})
+
+        print("4. Checking results...")
+        checks = [
+            ("All emails finished", not pending, f"{len(pending)} pending"),
+            ("Good emails sent with provider id",
+             all(final.get(i, {}).get("status") == "sent" and final[i].get("provider_id") for i in good),
+             f"{sum(1 for i in good if final.get(i, {}).get('status') == 'sent')} of {len(good)} sent"),
+            ("Rejected emails failed", all(final.get(i, {}).get("status") == "failed" for i in bad),
+             f"{sum(1 for i in bad if final.get(i, {}).get('status') == 'failed')} of {len(bad)} failed"),
+            ("One email_logs row per email", log_rows == len(outbox_ids), f"{log_rows} rows for {len(outbox_ids)} emails"),
+        ]
+        if stub_url:
+            stub_after = requests.get(f"{stub_url}/_stats", timeout=5).json()
+            accepted = stub_after["emails_accepted"] - stub_before["emails_accepted"]
+            duplicates = stub_after["duplicate_deliveries"] - stub_before["duplicate_deliveries"]
+            batches = stub_after["batches"] - stub_before["batches"]
+            print(f"   Stand-in: {accepted} accepted in {batches} batch calls, "
+                  f"{stub_after['rate_limited'] - stub_before['rate_limited']} rate limited, "
+                  f"{stub_after['errors'] - stub_before['errors']} errors")
+            checks.append(("Provider received each good email once", accepted == len(good) and duplicates == 0,
+                           f"{accepted} accepted, {duplicates} duplicates"))
+
+        all_passed = True
+        for name, passed, detail in checks:
+            print(f"{'✅' if passed else '❌'} {name}: {detail}")
+            all_passed = all_passed and passed
+        return all_passed
+
+    except Exception as e:
+        print(f"❌ Exception during test: {str(e)}")
+        return False
+    finally:
+        db.letters.delete_one({"id": letter_id})
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the email outbox against the Resend stand-in")
+    parser.add_argument("--count", type=int, default=40, help="Emails to queue")
+    parser.add_argument("--rejected", type=int, default=3, help="How many go to the stand-in's rejected domain")
+    parser.add_argument("--stub-url", default="http://localhost:8091", help="Resend stand-in URL ('' to skip its stats)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for delivery")
+    parser.add_argument("--mongo-url", default=DEFAULT_MONGO_URL)
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    args = parser.parse_args()
+
+    success = test_email_outbox(args.count, args.rejected, args.stub_url, args.timeout, args.mongo_url, args.db_name)
+    client.print_timings()
+    if success:
+        print("\n🎉 Email Outbox Test Completed Successfully!")
+    else:
+        print("\n❌ Email Outbox Test Failed")
+    sys.exit(0 if success else 1)
@@ -4,20 +4,24 @@ Final Comprehensive Backend API Testing for Talk To My Lawyer
 Testing all requested functionality from the review after landing page enhancements.
 """
 
-import requests
 import json
 import time
 from datetime import datetime
 
+from tests.client import ApiClient, HEADERS
+
 # Configuration
-BASE_URL = "https://e84f8a3d-0d39-435e-9801-5c4ea21bd735.preview.emergentagent.com/api"
-HEADERS = {"Content-Type": "application/json"}
+client = ApiClient(default_target="preview")
+BASE_URL = client.base_url
 
 def log_test(test_name, status, message=""):
     """Log test results with timestamp"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status_symbol = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
     print(f"[{timestamp}] {status_symbol} {test_name}: {message}")
+    note = client.timing_note()
+    if note:
+        print(f"   ⏱️  {note}")
 
 def test_comprehensive_backend():
     """Test all requested backend functionality"""
@@ -31,7 +35,7 @@ def test_comprehensive_backend():
     
     # 1. ROOT ENDPOINT TEST
     try:
-        response = requests.get(f"{BASE_URL}/", headers=HEADERS, timeout=15)
+        response = client.get(f"{BASE_URL}/", headers=HEADERS, timeout=15)
         if response.status_code == 200 and "Talk To My Lawyer API is running!" in response.json().get("message", ""):
             log_test("Root Endpoint", "PASS", "API is running correctly")
             results.append(("Root Endpoint", True))
@@ -47,7 +51,7 @@ def test_comprehensive_backend():
     # User Registration
     try:
         test_email = f"testuser_{int(time.time())}@example.com"
-        response = requests.post(
+        response = client.post(
             f"{BASE_URL}/auth/register",
             headers=HEADERS,
             json={
@@ -73,7 +77,7 @@ def test_comprehensive_backend():
     
     # User Login
     try:
-        response = requests.post(
+        response = client.post(
             f"{BASE_URL}/auth/login",
             headers=HEADERS,
             json={
@@ -104,7 +108,7 @@ def test_comprehensive_backend():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {tokens['user']}"
             
-            response = requests.get(f"{BASE_URL}/auth/me", headers=headers, timeout=15)
+            response = client.get(f"{BASE_URL}/auth/me", headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -145,7 +149,7 @@ def test_comprehensive_backend():
                 "consequences": "Legal action may be pursued"
             }
             
-            response = requests.post(
+            response = client.post(
                 f"{BASE_URL}/letters/generate",
                 headers=headers,
                 json={
@@ -190,7 +194,7 @@ def test_comprehensive_backend():
             all_packages_passed = True
             
             for package in packages:
-                response = requests.post(
+                response = client.post(
                     f"{BASE_URL}/subscription/create-checkout",
                     headers=headers,
                     json={"packageType": package},
@@ -222,7 +226,7 @@ def test_comprehensive_backend():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {tokens['user']}"
             
-            response = requests.get(f"{BASE_URL}/letters", headers=headers, timeout=15)
+            response = client.get(f"{BASE_URL}/letters", headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -245,7 +249,7 @@ def test_comprehensive_backend():
     # 6. CONTRACTOR FUNCTIONALITY TEST
     try:
         contractor_email = f"contractor_{int(time.time())}@example.com"
-        response = requests.post(
+        response = client.post(
             f"{BASE_URL}/auth/register",
             headers=HEADERS,
             json={
@@ -265,7 +269,7 @@ def test_comprehensive_backend():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {contractor_token}"
             
-            response = requests.get(f"{BASE_URL}/remote-employee/stats", headers=headers, timeout=15)
+            response = client.get(f"{BASE_URL}/remote-employee/stats", headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -309,4 +313,5 @@ def test_comprehensive_backend():
 
 if __name__ == "__main__":
     success = test_comprehensive_backend()
+    client.print_timings()
     exit(0 if success else 1)
\ No newline at end of file
@@ -4,20 +4,24 @@ Focused Backend API Testing for Talk To My Lawyer
 Testing critical endpoints after landing page enhancements to ensure backend is still working.
 """
 
-import requests
 import json
 import time
 from datetime import datetime
 
+from tests.client import ApiClient, HEADERS
+
 # Configuration
-BASE_URL = "https://e84f8a3d-0d39-435e-9801-5c4ea21bd735.preview.emergentagent.com/api"
-HEADERS = {"Content-Type": "application/json"}
+client = ApiClient(default_target="preview")
+BASE_URL = client.base_url
 
 def log_test(test_name, status, message=""):
     """Log test results with timestamp"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status_symbol = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
     print(f"[{timestamp}] {status_symbol} {test_name}: {message}")
+    note = client.timing_note()
+    if note:
+        print(f"   ⏱️  {note}")
 
 def test_critical_endpoints():
     """Test critical backend endpoints"""
@@ -25,7 +29,7 @@ def test_critical_endpoints():
     
     # 1. Root Endpoint Test
     try:
-        response = requests.get(f"{BASE_URL}/", headers=HEADERS, timeout=15)
+        response = client.get(f"{BASE_URL}/", headers=HEADERS, timeout=15)
         if response.status_code == 200 and "Talk To My Lawyer API is running!" in response.json().get("message", ""):
             log_test("Root Endpoint", "PASS", "API is running correctly")
             results.append(("Root Endpoint", True))
@@ -38,7 +42,7 @@ def test_critical_endpoints():
     
     # 2. Health Check
     try:
-        response = requests.get(f"{BASE_URL}/health", headers=HEADERS, timeout=15)
+        response = client.get(f"{BASE_URL}/health", headers=HEADERS, timeout=15)
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "healthy" and data.get("database") == "connected":
@@ -58,7 +62,7 @@ def test_critical_endpoints():
     user_token = None
     try:
         test_email = f"testuser_{int(time.time())}@example.com"
-        response = requests.post(
+        response = client.post(
             f"{BASE_URL}/auth/register",
             headers=HEADERS,
             json={
@@ -88,7 +92,7 @@ def test_critical_endpoints():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {user_token}"
             
-            response = requests.get(f"{BASE_URL}/auth/me", headers=headers, timeout=15)
+            response = client.get(f"{BASE_URL}/auth/me", headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -114,7 +118,7 @@ def test_critical_endpoints():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {user_token}"
             
-            response = requests.post(
+            response = client.post(
                 f"{BASE_URL}/letters/generate",
                 headers=headers,
                 json={
@@ -156,7 +160,7 @@ def test_critical_endpoints():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {user_token}"
             
-            response = requests.post(
+            response = client.post(
                 f"{BASE_URL}/subscription/create-checkout",
                 headers=headers,
                 json={"packageType": "4letters"},
@@ -187,7 +191,7 @@ def test_critical_endpoints():
             headers = HEADERS.copy()
             headers["Authorization"] = f"Bearer {user_token}"
             
-            response = requests.get(f"{BASE_URL}/letters", headers=headers, timeout=15)
+            response = client.get(f"{BASE_URL}/letters", headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -206,7 +210,27 @@ def test_critical_endpoints():
     else:
         log_test("User Dashboard Access", "FAIL", "No user token available")
         results.append(("User Dashboard Access", False))
-    
+
+    # 8. Document Types Catalog (served without MongoDB, revalidated by ETag)
+    try:
+        response = client.get(f"{BASE_URL}/documents/types", headers=HEADERS, timeout=15)
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and response.json().get("categories") and etag:
+            revalidated = client.get(f"{BASE_URL}/documents/types", headers={**HEADERS, "If-None-Match": etag}, timeout=15)
+            spans = revalidated.timing.spans
+            if revalidated.status_code == 304 and not revalidated.content and "mongo.connect" not in spans:
+                log_test("Document Types Catalog", "PASS", f"{len(response.content)} bytes, revalidated with 304")
+                results.append(("Document Types Catalog", True))
+            else:
+                log_test("Document Types Catalog", "FAIL", f"Revalidation status {revalidated.status_code}, spans {spans}")
+                results.append(("Document Types Catalog", False))
+        else:
+            log_test("Document Types Catalog", "FAIL", f"Status: {response.status_code}, ETag: {etag}")
+            results.append(("Document Types Catalog", False))
+    except Exception as e:
+        log_test("Document Types Catalog", "FAIL", f"Exception: {str(e)}")
+        results.append(("Document Types Catalog", False))
+
     return results
 
 def run_focused_test():
@@ -232,7 +256,7 @@ def run_focused_test():
     
     print(f"\nOverall Result: {passed}/{total} critical tests passed")
     
-    if passed >= 6:  # Allow for 1 minor failure
+    if passed >= 7:  # Allow for 1 minor failure
         print("🎉 CRITICAL BACKEND FUNCTIONALITY VERIFIED! Backend is working correctly after landing page enhancements.")
         return True
     else:
@@ -241,4 +265,5 @@ def run_focused_test():
 
 if __name__ == "__main__":
     success = run_focused_test()
+    client.print_timings()
     exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,125 @@
+// Admin dashboard totals computed in MongoDB.
+// One aggregation starts on users, pulls in letters and contractors with $unionWith,
+// and splits the combined stream with $facet, so the dashboard gets a few hundred bytes
+// of counts instead of downloading every user and letter to count them client-side.
+
+// Contractor points histogram boundaries (the last bucket is open-ended)
+export const POINTS_BUCKETS = [0, 1, 5, 10, 25, 50, 100]
+
+// Days with activity returned for the growth and letter trend charts
+export const TREND_DAYS = 30
+
+const countBy = (field) => [{ $group: { _id: field, count: { $sum: 1 } } }]
+
+// Legacy rows may hold created_at as a string or not at all; those are left out of the trends
+const createdDay = {
+  $dateToString: {
+    format: '%Y-%m-%d',
+    date: { $convert: { input: '$created_at', to: 'date', onError: null, onNull: null } }
+  }
+}
+
+const countByDay = [
+  { $match: { day: { $ne: null } } },
+  ...countBy('$day'),
+  { $sort: { _id: -1 } },
+  { $limit: TREND_DAYS }
+]
+
+export function adminSummaryPipeline() {
+  return [
+    {
+      $project: {
+        _id: 0,
+        kind: 'user',
+        role: 1,
+        subscription_status: { $ifNull: ['$subscription.status', 'free'] },
+        referred: { $cond: [{ $ifNull: ['$subscription.referred_by', false] }, 1, 0] },
+        day: createdDay
+      }
+    },
+    {
+      $unionWith: {
+        coll: 'letters',
+        pipeline: [{ $project: { _id: 0, kind: 'letter', status: 1, stage: 1, letter_type: 1, day: createdDay } }]
+      }
+    },
+    {
+      $unionWith: {
+        coll: 'contractors',
+        pipeline: [{ $project: { _id: 0, kind: 'contractor', points: { $ifNull: ['$points', 0] } } }]
+      }
+    },
+    {
+      $facet: {
+        users: [
+          { $match: { kind: 'user' } },
+          { $group: { _id: null, total: { $sum: 1 }, referrals: { $sum: '$referred' } } }
+        ],
+        users_by_role: [{ $match: { kind: 'user' } }, ...countBy('$role')],
+        users_by_subscription: [{ $match: { kind: 'user' } }, ...countBy('$subscription_status')],
+        users_by_day: [{ $match: { kind: 'user' } }, ...countByDay],
+        letters_by_status: [{ $match: { kind: 'letter' } }, ...countBy('$status')],
+        letters_by_stage: [{ $match: { kind: 'letter' } }, ...countBy('$stage')],
+        letters_by_type: [{ $match: { kind: 'letter' } }, ...countBy('$letter_type')],
+        letters_by_day: [{ $match: { kind: 'letter' } }, ...countByDay],
+        contractors: [
+          { $match: { kind: 'contractor' } },
+          {
+            $group: {
+              _id: null,
+              total: { $sum: 1 },
+              total_points: { $sum: '$points' },
+              max_points: { $max: '$points' }
+            }
+          }
+        ],
+        contractors_by_points: [
+          { $match: { kind: 'contractor' } },
+          { $bucket: { groupBy: '$points', boundaries: [...POINTS_BUCKETS, Infinity], default: 'other', output: { count: { $sum: 1 } } } }
+        ]
+      }
+    }
+  ]
+}
+
+const toCounts = (rows) => Object.fromEntries(rows.map(row => [String(row._id ?? 'unknown'), row.count]))
+
+// Oldest day first, as the trend charts draw them
+const toTrend = (rows) => rows.map(row => ({ date: row._id, count: row.count })).reverse()
+
+export async function adminSummary(db) {
+  const [facets] = await db.collection('users').aggregate(adminSummaryPipeline()).toArray()
+  const users = facets.users[0] || { total: 0, referrals: 0 }
+  const contractors = facets.contractors[0] || { total: 0, total_points: 0, max_points: 0 }
+  const lettersByStatus = toCounts(facets.letters_by_status)
+
+  return {
+    users: {
+      total: users.total,
+      by_role: toCounts(facets.users_by_role),
+      subscriptions: { free: 0, paid: 0, ...toCounts(facets.users_by_subscription) },
+      referrals: users.referrals,
+      by_day: toTrend(facets.users_by_day)
+    },
+    letters: {
+      total: Object.values(lettersByStatus).reduce((sum, count) => sum + count, 0),
+      by_status: lettersByStatus,
+      by_stage: toCounts(facets.letters_by_stage),
+      by_type: toCounts(facets.letters_by_type),
+      by_day: toTrend(facets.letters_by_day)
+    },
+    contractors: {
+      total: contractors.total,
+      total_points: contractors.total_points,
+      max_points: contractors.max_points || 0,
+      by_points: facets.contractors_by_points.map(row => {
+        const index = POINTS_BUCKETS.indexOf(row._id)
+        // Non-numeric or negative points land in the default bucket
+        if (index === -1) return { min: null, max: null, count: row.count }
+        return { min: row._id, max: POINTS_BUCKETS[index + 1] ?? null, count: row.count }
+      })
+    },
+    generated_at: new Date().toISOString()
+  }
+}
@@ -0,0 +1,85 @@
+// Memoized JWT verification.
+// The dashboard sends the same bearer token on every call, so verified claims are cached
+// by token until the token's own `exp` (or the cache TTL, whichever comes first). The
+// cache is dropped whenever JWT_SECRET changes, so a rotated secret takes effect at once.
+
+import jwt from 'jsonwebtoken'
+
+export class TokenCache {
+  constructor({ maxEntries = 10000, ttlMs = 300000, getSecret = () => process.env.JWT_SECRET } = {}) {
+    this.maxEntries = maxEntries
+    this.ttlMs = ttlMs
+    this.getSecret = getSecret
+    this.secret = null
+    this.entries = new Map()
+    this.counters = { hits: 0, misses: 0, rejected: 0, evictions: 0 }
+  }
+
+  // Returns the decoded claims, or null for a missing, invalid or expired token
+  verify(token) {
+    if (!token) return null
+
+    const secret = this.getSecret()
+    if (secret !== this.secret) {
+      this.clear()
+      this.secret = secret
+    }
+
+    const now = Date.now()
+    const entry = this.entries.get(token)
+    if (entry) {
+      if (entry.expiresAt > now) {
+        this.counters.hits++
+        return entry.decoded
+      }
+      this.entries.delete(token)
+    }
+
+    this.counters.misses++
+    let decoded
+    try {
+      decoded = jwt.verify(token, secret)
+    } catch (error) {
+      this.counters.rejected++
+      return null
+    }
+
+    if (this.maxEntries > 0) {
+      const expiresAt = decoded.exp ? Math.min(decoded.exp * 1000, now + this.ttlMs) : now + this.ttlMs
+      this.entries.set(token, { decoded, expiresAt })
+      if (this.entries.size > this.maxEntries) {
+        this.entries.delete(this.entries.keys().next().value)
+        this.counters.evictions++
+      }
+    }
+    return decoded
+  }
+
+  clear() {
+    this.entries.clear()
+  }
+
+  stats() {
+    return {
+      size: this.entries.size,
+      max_entries: this.maxEntries,
+      hits: this.counters.hits,
+      misses: this.counters.misses,
+      rejected: this.counters.rejected,
+      evictions: this.counters.evictions
+    }
+  }
+}
+
+export function createTokenCache() {
+  return new TokenCache({
+    maxEntries: parseInt(process.env.TOKEN_CACHE_MAX_ENTRIES || '10000', 10)
+  })
+}
+
+// Extract the token from an `Authorization: Bearer <token>` header
+export function bearerToken(request) {
+  const authHeader = request.headers.get('authorization')
+  if (!authHeader) return null
+  return authHeader.split(' ')[1] || ''
+}
@@ -0,0 +1,187 @@
+// Worker-thread pool for bcrypt hashing and comparison.
+// bcryptjs is pure JavaScript, so a cost-12 hash on the main thread blocks the event
+// loop for hundreds of milliseconds. The pool runs it on a fixed number of worker
+// threads and queues the rest; BCRYPT_WORKERS=0 falls back to the inline async API.
+
+import os from 'os'
+import { Worker } from 'worker_threads'
+import bcrypt from 'bcryptjs'
+
+// Evaluated as a CommonJS worker so bundlers never need to emit a separate file
+const WORKER_SOURCE = `
+const { parentPort } = require('worker_threads')
+const bcrypt = require('bcryptjs')
+
+parentPort.on('message', ({ id, op, args }) => {
+  try {
+    const result = op === 'hash' ? bcrypt.hashSync(args[0], args[1]) : bcrypt.compareSync(args[0], args[1])
+    parentPort.postMessage({ id, result })
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message })
+  }
+})
+`
+
+export class HashQueueFullError extends Error {
+  constructor() {
+    super('Password hashing queue is full')
+    this.name = 'HashQueueFullError'
+  }
+}
+
+export class BcryptPool {
+  constructor({ size, maxQueue = 1000 } = {}) {
+    this.size = size
+    this.maxQueue = maxQueue
+    this.workers = []
+    this.idle = []
+    this.queue = []
+    this.pending = new Map()
+    this.nextId = 1
+    this.counters = { completed: 0, failed: 0, rejected: 0, maxQueueDepth: 0, totalWaitMs: 0, totalRunMs: 0 }
+  }
+
+  spawn() {
+    const worker = new Worker(WORKER_SOURCE, { eval: true })
+    worker.task = null
+
+    worker.on('message', ({ id, result, error }) => {
+      const task = this.pending.get(id)
+      this.pending.delete(id)
+      worker.task = null
+      if (task) {
+        this.counters.totalRunMs += Date.now() - task.startedAt
+        if (error) {
+          this.counters.failed++
+          task.reject(new Error(error))
+        } else {
+          this.counters.completed++
+          task.resolve(result)
+        }
+      }
+      this.release(worker)
+    })
+
+    const replace = (error) => {
+      // Fail the task the worker was running and put a fresh worker in its place
+      if (worker.task) {
+        this.pending.delete(worker.task.id)
+        this.counters.failed++
+        worker.task.reject(error || new Error('bcrypt worker exited'))
+        worker.task = null
+      }
+      this.workers = this.workers.filter(w => w !== worker)
+      this.idle = this.idle.filter(w => w !== worker)
+      if (!worker.replaced) {
+        worker.replaced = true
+        this.release(this.spawn())
+      }
+    }
+    worker.on('error', replace)
+    worker.on('exit', (code) => {
+      if (code !== 0) replace(new Error(`bcrypt worker exited with code ${code}`))
+    })
+
+    this.workers.push(worker)
+    return worker
+  }
+
+  release(worker) {
+    const task = this.queue.shift()
+    if (task) {
+      this.dispatch(worker, task)
+    } else {
+      // Idle workers must not keep the process alive
+      worker.unref()
+      this.idle.push(worker)
+    }
+  }
+
+  dispatch(worker, task) {
+    const now = Date.now()
+    this.counters.totalWaitMs += now - task.queuedAt
+    task.startedAt = now
+    worker.task = task
+    worker.ref()
+    this.pending.set(task.id, task)
+    worker.postMessage({ id: task.id, op: task.op, args: task.args })
+  }
+
+  run(op, args) {
+    return new Promise((resolve, reject) => {
+      const task = { id: this.nextId++, op, args, resolve, reject, queuedAt: Date.now() }
+
+      if (!this.idle.length && this.workers.length < this.size) {
+        this.spawn()
+        this.dispatch(this.workers[this.workers.length - 1], task)
+        return
+      }
+
+      const worker = this.idle.pop()
+      if (worker) {
+        this.dispatch(worker, task)
+        return
+      }
+
+      if (this.queue.length >= this.maxQueue) {
+        this.counters.rejected++
+        reject(new HashQueueFullError())
+        return
+      }
+      this.queue.push(task)
+      this.counters.maxQueueDepth = Math.max(this.counters.maxQueueDepth, this.queue.length)
+    })
+  }
+
+  hash(password, rounds) {
+    return this.run('hash', [password, rounds])
+  }
+
+  compare(password, hash) {
+    return this.run('compare', [password, hash])
+  }
+
+  stats() {
+    const finished = this.counters.completed + this.counters.failed
+    return {
+      size: this.size,
+      workers: this.workers.length,
+      busy: this.workers.length - this.idle.length,
+      queue_depth: this.queue.length,
+      max_queue_depth: this.counters.maxQueueDepth,
+      completed: this.counters.completed,
+      failed: this.counters.failed,
+      rejected: this.counters.rejected,
+      avg_wait_ms: finished ? Math.round(this.counters.totalWaitMs / finished) : 0,
+      avg_run_ms: finished ? Math.round(this.counters.totalRunMs / finished) : 0
+    }
+  }
+}
+
+// Inline fallback with the same interface, used when BCRYPT_WORKERS=0
+class InlineBcrypt {
+  constructor() {
+    this.size = 0
+  }
+
+  hash(password, rounds) {
+    return bcrypt.hash(password, rounds)
+  }
+
+  compare(password, hash) {
+    return bcrypt.compare(password, hash)
+  }
+
+  stats() {
+    return { size: 0, workers: 0, busy: 0, queue_depth: 0, inline: true }
+  }
+}
+
+export function createBcryptPool() {
+  const defaultSize = Math.max(1, Math.min(4, (os.availableParallelism?.() || os.cpus().length) - 1))
+  const size = parseInt(process.env.BCRYPT_WORKERS ?? String(defaultSize), 10)
+  if (!size) {
+    return new InlineBcrypt()
+  }
+  return new BcryptPool({ size, maxQueue: parseInt(process.env.BCRYPT_MAX_QUEUE || '1000', 10) })
+}
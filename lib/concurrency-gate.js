@@ -0,0 +1,127 @@
+// Per-process concurrency limiter with a bounded, deadline-aware wait queue.
+// Used in front of OpenAI so a burst of generations queues briefly instead of fanning
+// out into provider 429s; once the queue is full (or a caller has waited too long) the
+// request is shed immediately with an OverloadedError carrying a Retry-After estimate.
+
+export class OverloadedError extends Error {
+  constructor(reason, retryAfter) {
+    super(reason === 'queue_full' ? 'Wait queue is full' : 'Timed out waiting for a free slot')
+    this.name = 'OverloadedError'
+    this.reason = reason
+    this.retryAfter = retryAfter
+  }
+}
+
+export class ConcurrencyGate {
+  constructor({ limit = 8, maxQueue = 50, queueTimeoutMs = 15000 } = {}) {
+    this.limit = limit
+    this.maxQueue = maxQueue
+    this.queueTimeoutMs = queueTimeoutMs
+    this.active = 0
+    this.queue = []
+    this.counters = {
+      admitted: 0,
+      queued: 0,
+      rejected: 0,
+      timedOut: 0,
+      maxQueueDepth: 0,
+      totalWaitMs: 0,
+      maxWaitMs: 0,
+      completed: 0,
+      totalRunMs: 0
+    }
+  }
+
+  // Resolves with a release() function once a slot is free
+  acquire() {
+    if (this.active < this.limit) {
+      return Promise.resolve(this.grant(Date.now()))
+    }
+
+    if (this.queue.length >= this.maxQueue) {
+      this.counters.rejected++
+      return Promise.reject(new OverloadedError('queue_full', this.retryAfter()))
+    }
+
+    return new Promise((resolve, reject) => {
+      const waiter = { resolve, queuedAt: Date.now() }
+      waiter.timer = setTimeout(() => {
+        const index = this.queue.indexOf(waiter)
+        if (index !== -1) this.queue.splice(index, 1)
+        this.counters.timedOut++
+        reject(new OverloadedError('queue_timeout', this.retryAfter()))
+      }, this.queueTimeoutMs)
+
+      this.queue.push(waiter)
+      this.counters.queued++
+      this.counters.maxQueueDepth = Math.max(this.counters.maxQueueDepth, this.queue.length)
+    })
+  }
+
+  grant(queuedAt) {
+    const now = Date.now()
+    const waited = now - queuedAt
+    this.active++
+    this.counters.admitted++
+    this.counters.totalWaitMs += waited
+    this.counters.maxWaitMs = Math.max(this.counters.maxWaitMs, waited)
+
+    let released = false
+    return () => {
+      if (released) return
+      released = true
+      this.counters.completed++
+      this.counters.totalRunMs += Date.now() - now
+      this.active--
+      this.next()
+    }
+  }
+
+  next() {
+    while (this.active < this.limit && this.queue.length) {
+      const waiter = this.queue.shift()
+      clearTimeout(waiter.timer)
+      waiter.resolve(this.grant(waiter.queuedAt))
+    }
+  }
+
+  async run(fn) {
+    const release = await this.acquire()
+    try {
+      return await fn()
+    } finally {
+      release()
+    }
+  }
+
+  // Seconds until the current queue is likely to drain, from the average slot hold time
+  retryAfter() {
+    const avgRunMs = this.counters.completed ? this.counters.totalRunMs / this.counters.completed : 1000
+    return Math.max(1, Math.ceil((avgRunMs * (this.queue.length + 1)) / this.limit / 1000))
+  }
+
+  stats() {
+    return {
+      limit: this.limit,
+      active: this.active,
+      queue_depth: this.queue.length,
+      max_queue: this.maxQueue,
+      max_queue_depth: this.counters.maxQueueDepth,
+      admitted: this.counters.admitted,
+      queued: this.counters.queued,
+      rejected: this.counters.rejected,
+      timed_out: this.counters.timedOut,
+      avg_wait_ms: this.counters.admitted ? Math.round(this.counters.totalWaitMs / this.counters.admitted) : 0,
+      max_wait_ms: this.counters.maxWaitMs,
+      avg_run_ms: this.counters.completed ? Math.round(this.counters.totalRunMs / this.counters.completed) : 0
+    }
+  }
+}
+
+export function createOpenAIGate() {
+  return new ConcurrencyGate({
+    limit: parseInt(process.env.OPENAI_MAX_CONCURRENCY || '8', 10),
+    maxQueue: parseInt(process.env.OPENAI_MAX_QUEUE || '50', 10),
+    queueTimeoutMs: parseInt(process.env.OPENAI_QUEUE_TIMEOUT_MS || '15000', 10)
+  })
+}
@@ -0,0 +1,123 @@
+// Content-addressed single-flight cache for generation requests.
+// Requests are keyed by a hash of the user id and the normalized completion parameters
+// (which already contain the built prompt, whichever builder produced it). The first
+// request leads; identical requests arriving while it runs wait for its result, and
+// resubmits within the TTL get the stored result immediately. Failures are not cached.
+
+import crypto from 'crypto'
+
+// Collapse whitespace so cosmetic differences in the built prompt do not defeat the cache
+const normalize = (text) => String(text ?? '').replace(/\s+/g, ' ').trim()
+
+export class GenerationDedupe {
+  constructor({ ttlMs = 120000, maxEntries = 1000, maxFlightMs = 300000 } = {}) {
+    this.ttlMs = ttlMs
+    this.maxEntries = maxEntries
+    this.maxFlightMs = maxFlightMs
+    this.entries = new Map()
+    this.counters = { leaders: 0, coalesced: 0, hits: 0, failures: 0 }
+  }
+
+  get enabled() {
+    return this.ttlMs > 0 && this.maxEntries > 0
+  }
+
+  // `title` is part of the key because it is stored on the result but not sent to OpenAI
+  key(userId, completionParams, title = '') {
+    const canonical = JSON.stringify([
+      userId,
+      normalize(title),
+      completionParams.model,
+      completionParams.max_tokens,
+      completionParams.temperature,
+      completionParams.messages.map(message => [message.role, normalize(message.content)])
+    ])
+    return crypto.createHash('sha256').update(canonical).digest('hex')
+  }
+
+  // Returns { leader: true, resolve, reject } for the first request with this key, or
+  // { leader: false, result } where result is the leader's promise (or stored result)
+  begin(key) {
+    if (!this.enabled) {
+      return { leader: true, resolve() {}, reject() {} }
+    }
+
+    const now = Date.now()
+    const existing = this.entries.get(key)
+    if (existing && (existing.expiresAt === null || existing.expiresAt > now)) {
+      if (existing.expiresAt === null) {
+        this.counters.coalesced++
+      } else {
+        this.counters.hits++
+      }
+      return { leader: false, result: existing.promise }
+    }
+
+    let settle
+    const entry = { expiresAt: null }
+    entry.promise = new Promise((resolve, reject) => {
+      settle = { resolve, reject }
+    })
+    // Followers handle rejection themselves; nobody may be listening
+    entry.promise.catch(() => {})
+
+    const drop = () => {
+      if (this.entries.get(key) === entry) this.entries.delete(key)
+    }
+    // Safety net so followers never wait forever on a leader that failed to settle
+    const timer = setTimeout(() => {
+      drop()
+      settle.reject(new Error('Generation leader did not finish'))
+    }, this.maxFlightMs)
+    timer.unref?.()
+
+    this.entries.delete(key)
+    this.entries.set(key, entry)
+    this.counters.leaders++
+    this.evict()
+
+    return {
+      leader: true,
+      resolve: (result) => {
+        clearTimeout(timer)
+        entry.expiresAt = Date.now() + this.ttlMs
+        settle.resolve(result)
+      },
+      reject: (error) => {
+        clearTimeout(timer)
+        this.counters.failures++
+        drop()
+        settle.reject(error)
+      }
+    }
+  }
+
+  evict() {
+    for (const [key, entry] of this.entries) {
+      if (this.entries.size <= this.maxEntries) break
+      // Oldest first; never evict a flight that followers may be waiting on
+      if (entry.expiresAt !== null) {
+        this.entries.delete(key)
+      }
+    }
+  }
+
+  stats() {
+    return {
+      enabled: this.enabled,
+      size: this.entries.size,
+      ttl_ms: this.ttlMs,
+      leaders: this.counters.leaders,
+      coalesced: this.counters.coalesced,
+      hits: this.counters.hits,
+      failures: this.counters.failures
+    }
+  }
+}
+
+export function createGenerationDedupe() {
+  return new GenerationDedupe({
+    ttlMs: parseInt(process.env.GENERATION_DEDUPE_TTL_MS || '120000', 10),
+    maxEntries: parseInt(process.env.GENERATION_DEDUPE_MAX_ENTRIES || '1000', 10)
+  })
+}
@@ -0,0 +1,105 @@
+// Document type catalog for GET /api/documents/types.
+// The catalog only changes with a deploy, so it is serialized and hashed once at module
+// load; the route sends the same bytes every time and answers revalidations with a 304.
+
+import { contentEtag } from './etag'
+
+export const DOCUMENT_TYPES = {
+  categories: [
+    {
+      id: 'business_letters',
+      name: 'Business Letters',
+      description: 'Professional business correspondence and conflict resolution',
+      icon: '💼',
+      types: [
+        { id: 'demand_letter', name: 'Demand Letter', description: 'Formal demands for payment or action' },
+        { id: 'cease_desist', name: 'Cease & Desist', description: 'Stop unwanted behavior or infringement' },
+        { id: 'complaint_letter', name: 'Complaint Letter', description: 'Formal complaints about services or products' },
+        { id: 'collection_notice', name: 'Collection Notice', description: 'Debt collection and payment demands' },
+        { id: 'breach_notice', name: 'Breach Notice', description: 'Contract breach notifications' },
+        { id: 'settlement_discussion', name: 'Settlement Discussion', description: 'Professional letters to initiate settlement negotiations and resolution' }
+      ]
+    },
+    {
+      id: 'contracts',
+      name: 'Contracts & Agreements',
+      description: 'Legal agreements and contract documents',
+      icon: '📄',
+      types: [
+        { id: 'service_agreement', name: 'Service Agreement', description: 'Service provider contracts' },
+        { id: 'nda', name: 'Non-Disclosure Agreement', description: 'Confidentiality agreements' },
+        { id: 'partnership_agreement', name: 'Partnership Agreement', description: 'Business partnership contracts' },
+        { id: 'consulting_agreement', name: 'Consulting Agreement', description: 'Consultant service contracts' },
+        { id: 'freelance_contract', name: 'Freelance Contract', description: 'Independent contractor agreements' }
+      ]
+    },
+    {
+      id: 'employment',
+      name: 'Employment Documents',
+      description: 'Workplace and employment-related documents',
+      icon: '👥',
+      types: [
+        { id: 'employment_contract', name: 'Employment Contract', description: 'Employee hire agreements' },
+        { id: 'termination_letter', name: 'Termination Letter', description: 'Employee termination notices' },
+        { id: 'resignation_letter', name: 'Resignation Letter', description: 'Employee resignation notices' },
+        { id: 'disciplinary_notice', name: 'Disciplinary Notice', description: 'Employee discipline documentation' },
+        { id: 'reference_letter', name: 'Reference Letter', description: 'Employee reference letters' }
+      ]
+    },
+    {
+      id: 'real_estate',
+      name: 'Real Estate Documents',
+      description: 'Property and real estate legal documents',
+      icon: '🏠',
+      types: [
+        { id: 'lease_agreement', name: 'Lease Agreement', description: 'Rental property contracts' },
+        { id: 'eviction_notice', name: 'Eviction Notice', description: 'Tenant eviction notifications' },
+        { id: 'purchase_agreement', name: 'Purchase Agreement', description: 'Property purchase contracts' },
+        { id: 'property_disclosure', name: 'Property Disclosure', description: 'Property condition disclosures' },
+        { id: 'rent_increase_notice', name: 'Rent Increase Notice', description: 'Rent adjustment notifications' }
+      ]
+    },
+    {
+      id: 'business_formation',
+      name: 'Business Formation',
+      description: 'Business setup and corporate documents',
+      icon: '🏢',
+      types: [
+        { id: 'llc_operating_agreement', name: 'LLC Operating Agreement', description: 'LLC governance documents' },
+        { id: 'articles_incorporation', name: 'Articles of Incorporation', description: 'Corporate formation documents' },
+        { id: 'bylaws', name: 'Corporate Bylaws', description: 'Corporate governance rules' },
+        { id: 'business_plan', name: 'Business Plan', description: 'Formal business planning documents' },
+        { id: 'partnership_dissolution', name: 'Partnership Dissolution', description: 'Partnership termination documents' }
+      ]
+    },
+    {
+      id: 'legal_notices',
+      name: 'Legal Notices',
+      description: 'Official legal notifications and notices',
+      icon: '⚖️',
+      types: [
+        { id: 'copyright_notice', name: 'Copyright Notice', description: 'Copyright protection notifications' },
+        { id: 'trademark_notice', name: 'Trademark Notice', description: 'Trademark protection notices' },
+        { id: 'privacy_policy', name: 'Privacy Policy', description: 'Data privacy compliance documents' },
+        { id: 'terms_of_service', name: 'Terms of Service', description: 'Service usage agreements' },
+        { id: 'liability_waiver', name: 'Liability Waiver', description: 'Risk assumption documents' }
+      ]
+    },
+    {
+      id: 'personal_legal',
+      name: 'Personal Legal Documents',
+      description: 'Individual legal documents and personal matters',
+      icon: '👤',
+      types: [
+        { id: 'will', name: 'Last Will & Testament', description: 'Estate planning documents' },
+        { id: 'power_of_attorney', name: 'Power of Attorney', description: 'Legal authority delegation' },
+        { id: 'living_will', name: 'Living Will', description: 'Medical care directives' },
+        { id: 'name_change_petition', name: 'Name Change Petition', description: 'Legal name change documents' },
+        { id: 'divorce_agreement', name: 'Divorce Agreement', description: 'Divorce settlement documents' }
+      ]
+    }
+  ]
+}
+
+export const DOCUMENT_TYPES_JSON = JSON.stringify(DOCUMENT_TYPES)
+export const DOCUMENT_TYPES_ETAG = contentEtag(DOCUMENT_TYPES_JSON)
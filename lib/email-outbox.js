@@ -0,0 +1,233 @@
+// MongoDB-backed email outbox.
+// Handlers enqueue a rendered email and return its outbox id at once; EmailOutboxWorker
+// claims due emails in batches (one provider batch call per claim), records the provider
+// message id on success, and retries transient failures with exponential backoff. A batch
+// rejected for a permanent reason (e.g. one invalid address) is re-sent one email at a time
+// so a single bad recipient cannot fail its neighbours. An email whose lease expires on its
+// last attempt is swept to failed instead of being claimed again.
+
+import { v4 as uuidv4 } from 'uuid'
+import { LeaseQueueWorker } from './lease-queue'
+
+export const OUTBOX_COLLECTION = 'email_outbox'
+
+// Provider error names that will fail the same way on every retry
+const PERMANENT_ERRORS = new Set([
+  'validation_error',
+  'missing_required_field',
+  'invalid_parameter',
+  'invalid_from_address',
+  'invalid_to_address',
+  'missing_api_key',
+  'invalid_api_key',
+  'invalid_access',
+  'restricted_api_key'
+])
+
+export class EmailProviderError extends Error {
+  constructor(error) {
+    super(error?.message || 'Email provider error')
+    this.name = 'EmailProviderError'
+    this.code = error?.name || 'unknown'
+    this.retryable = !PERMANENT_ERRORS.has(this.code)
+  }
+}
+
+export async function enqueueEmail(db, { letterId, from, to, subject, html }) {
+  const now = new Date()
+  const email = {
+    id: uuidv4(),
+    letter_id: letterId,
+    from,
+    to,
+    subject,
+    html,
+    status: 'queued',
+    attempts: 0,
+    error: null,
+    provider_id: null,
+    claim_id: null,
+    available_at: now,
+    lease_expires_at: null,
+    sent_at: null,
+    created_at: now,
+    updated_at: now
+  }
+  await db.collection(OUTBOX_COLLECTION).insertOne(email)
+  return email
+}
+
+// provider: { send(message) -> { id }, sendBatch(messages) -> [{ id }] }, throwing EmailProviderError
+// onDelivery(email, status, error) is called once per email that was sent or gave up
+export class EmailOutboxWorker extends LeaseQueueWorker {
+  constructor({ getDb, provider, onDelivery, concurrency = 1, batchSize = 50, pollIntervalMs = 1000, leaseMs = 60000, maxAttempts = 6 }) {
+    super({ name: 'Email outbox', getDb, concurrency, pollIntervalMs, leaseMs, maxAttempts })
+    this.provider = provider
+    this.onDelivery = onDelivery
+    this.batchSize = batchSize
+    this.counters = { batches: 0, sent: 0, retried: 0, failed: 0, split: 0, expired: 0 }
+  }
+
+  async sweep() {
+    const db = await this.getDb()
+    await this.failExhausted(db.collection(OUTBOX_COLLECTION), 'sending', async (email, error) => {
+      this.counters.expired++
+      this.counters.failed++
+      console.error(`Email outbox: ${email.id} failed:`, error.message)
+      this.onDelivery?.(email, 'failed', error)
+    })
+  }
+
+  // Claim up to batchSize due emails (null when none are due); claim_id tells this worker
+  // which ones it won
+  async claim() {
+    const db = await this.getDb()
+    const outbox = db.collection(OUTBOX_COLLECTION)
+    const now = new Date()
+    const due = {
+      $or: [
+        { status: 'queued', available_at: { $lte: now } },
+        this.reclaimable('sending', now)
+      ]
+    }
+
+    const candidates = await outbox
+      .find(due, { projection: { _id: 0, id: 1 } })
+      .sort({ available_at: 1 })
+      .limit(this.batchSize)
+      .toArray()
+    if (!candidates.length) return null
+
+    const claimId = uuidv4()
+    await outbox.updateMany(
+      { id: { $in: candidates.map(candidate => candidate.id) }, ...due },
+      {
+        $set: {
+          status: 'sending',
+          claim_id: claimId,
+          lease_expires_at: new Date(now.getTime() + this.leaseMs),
+          updated_at: now
+        },
+        $inc: { attempts: 1 }
+      }
+    )
+    const batch = await outbox.find({ claim_id: claimId, status: 'sending' }).toArray()
+    return batch.length ? batch : null
+  }
+
+  run(batch) {
+    return this.deliver(batch)
+  }
+
+  async deliver(batch) {
+    const messages = batch.map(({ from, to, subject, html }) => ({ from, to, subject, html }))
+    this.counters.batches++
+    let results
+    try {
+      results = batch.length === 1
+        ? [await this.provider.send(messages[0])]
+        : await this.provider.sendBatch(messages)
+    } catch (error) {
+      if (error instanceof EmailProviderError && !error.retryable && batch.length > 1) {
+        // Find out which email the provider objected to
+        this.counters.split++
+        for (const email of batch) {
+          await this.deliver([email])
+        }
+        return
+      }
+      await this.markFailed(batch, error)
+      return
+    }
+    // Outside the try: a bookkeeping failure here must not mark delivered emails for a resend
+    await this.markSent(batch, results)
+  }
+
+  async markSent(batch, results) {
+    const db = await this.getDb()
+    const now = new Date()
+    await db.collection(OUTBOX_COLLECTION).bulkWrite(batch.map((email, index) => ({
+      updateOne: {
+        filter: { id: email.id, claim_id: email.claim_id },
+        update: {
+          $set: {
+            status: 'sent',
+            provider_id: results[index]?.id || null,
+            error: null,
+            sent_at: now,
+            lease_expires_at: null,
+            updated_at: now
+          }
+        }
+      }
+    })), { ordered: false })
+
+    this.counters.sent += batch.length
+    for (const email of batch) {
+      this.onDelivery?.(email, 'sent', null)
+    }
+  }
+
+  async markFailed(batch, error) {
+    const db = await this.getDb()
+    const now = new Date()
+    const permanent = error instanceof EmailProviderError && !error.retryable
+
+    const outcomes = batch.map(email => {
+      const finalAttempt = permanent || email.attempts >= this.maxAttempts
+      // Exponential backoff between attempts: 2s, 4s, 8s...
+      const retryAt = new Date(now.getTime() + 1000 * 2 ** email.attempts)
+      return { email, finalAttempt, retryAt }
+    })
+
+    await db.collection(OUTBOX_COLLECTION).bulkWrite(outcomes.map(({ email, finalAttempt, retryAt }) => ({
+      updateOne: {
+        filter: { id: email.id, claim_id: email.claim_id },
+        update: {
+          $set: {
+            status: finalAttempt ? 'failed' : 'queued',
+            error: error.message,
+            available_at: retryAt,
+            lease_expires_at: null,
+            updated_at: now
+          }
+        }
+      }
+    })), { ordered: false })
+
+    for (const { email, finalAttempt } of outcomes) {
+      if (finalAttempt) {
+        this.counters.failed++
+        this.onDelivery?.(email, 'failed', error)
+      } else {
+        this.counters.retried++
+      }
+    }
+    console.error(`Email outbox: ${batch.length} email(s) failed (attempt ${batch[0].attempts}):`, error.message)
+  }
+
+  stats() {
+    return {
+      running: this.running,
+      active: this.active,
+      batch_size: this.batchSize,
+      batches: this.counters.batches,
+      sent: this.counters.sent,
+      retried: this.counters.retried,
+      failed: this.counters.failed,
+      split_batches: this.counters.split,
+      expired: this.counters.expired
+    }
+  }
+}
+
+export function createEmailOutboxWorker({ getDb, provider, onDelivery }) {
+  return new EmailOutboxWorker({
+    getDb,
+    provider,
+    onDelivery,
+    concurrency: parseInt(process.env.EMAIL_WORKERS || '1', 10),
+    // The provider batch API accepts at most 100 emails per call
+    batchSize: Math.min(100, parseInt(process.env.EMAIL_BATCH_SIZE || '50', 10))
+  })
+}
@@ -0,0 +1,35 @@
+// Transactional email templates.
+// The markup around a letter never changes, so it is built once at module load and each
+// email only escapes and splices in the letter body.
+
+const escapeHtml = (text) => String(text ?? '')
+  .replace(/&/g, '&amp;')
+  .replace(/</g, '&lt;')
+  .replace(/>/g, '&gt;')
+  .replace(/"/g, '&quot;')
+
+const LETTER_EMAIL_HEAD = `
+        <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
+          <h2 style="color: #f97316; border-bottom: 2px solid #f97316; padding-bottom: 10px;">Professional Legal Letter</h2>
+          <p style="color: #666; margin: 20px 0;">Please find the attached legal letter below:</p>
+          <div style="border: 1px solid #ccc; padding: 30px; margin: 20px 0; background: #f9f9f9; border-radius: 8px;">
+            <pre style="white-space: pre-wrap; font-family: 'Times New Roman', serif; line-height: 1.6; margin: 0;">`
+
+const LETTER_EMAIL_TAIL = `</pre>
+          </div>
+          <div style="border-top: 1px solid #ddd; padding-top: 20px; margin-top: 30px; color: #666; font-size: 12px;">
+            <p><strong>This letter was professionally generated by Talk To My Lawyer.</strong></p>
+            <p>For questions or additional legal services, please visit our website or contact our support team.</p>
+          </div>
+        </div>
+      `
+
+export const LETTER_EMAIL_FROM = 'Talk To My Lawyer <noreply@talktomylawyer.com>'
+
+export function renderLetterEmail(letter) {
+  return {
+    from: LETTER_EMAIL_FROM,
+    subject: `Legal Letter: ${letter.title}`,
+    html: LETTER_EMAIL_HEAD + escapeHtml(letter.content) + LETTER_EMAIL_TAIL
+  }
+}
@@ -0,0 +1,37 @@
+// Conditional GET helpers.
+// A weak ETag is a short hash of whatever identifies the version of a representation
+// (a letter's id and updated_at, or a count plus newest updated_at for a list), so a
+// poller whose copy is still current gets a bodiless 304 after one small indexed query.
+// Fixed bodies such as the document type catalog get a strong ETag hashed from their bytes.
+
+import crypto from 'crypto'
+
+export function weakEtag(...parts) {
+  const digest = crypto.createHash('sha1').update(JSON.stringify(parts)).digest('base64url')
+  return `W/"${digest.slice(0, 22)}"`
+}
+
+// Strong ETag for a fixed body: a hash of its exact bytes
+export function contentEtag(body) {
+  return `"${crypto.createHash('sha256').update(body).digest('base64url').slice(0, 32)}"`
+}
+
+// If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides
+export function etagMatches(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) return false
+  if (header.trim() === '*') return true
+  const opaque = etag.replace(/^W\//, '')
+  return header.split(',').some(candidate => candidate.trim().replace(/^W\//, '') === opaque)
+}
+
+// Version of the documents matching filter: how many there are and the newest updated_at.
+// Inserts and updates (which bump updated_at) both change it; with an index on
+// { ...filter fields, updated_at } the aggregation never touches the documents.
+export async function collectionVersion(collection, filter) {
+  const [version] = await collection.aggregate([
+    { $match: filter },
+    { $group: { _id: null, count: { $sum: 1 }, latest: { $max: '$updated_at' } } }
+  ]).toArray()
+  return version ? [version.count, version.latest] : [0, null]
+}
@@ -0,0 +1,151 @@
+// Declared MongoDB indexes for every hot lookup in the API routes.
+// ensureIndexes() runs once per process (see connectToMongo) and logs a report of
+// declared indexes that are missing, indexes nobody declared, and indexes with no use.
+
+// Audit rows (webhook_logs, email_logs) expire after LOG_RETENTION_DAYS
+const LOG_TTL_SECONDS = parseInt(process.env.LOG_RETENTION_DAYS || '90', 10) * 24 * 60 * 60
+
+export const INDEXES = {
+  users: [
+    { key: { email: 1 }, unique: true },
+    { key: { id: 1 }, unique: true },
+    { key: { created_at: -1, id: -1 } }
+  ],
+  letters: [
+    { key: { id: 1 }, unique: true },
+    { key: { user_id: 1, created_at: -1, id: -1 } },
+    { key: { created_at: -1, id: -1 } },
+    // ETag revalidation for /letters/{id} and /letters reads only these index entries
+    { key: { id: 1, updated_at: 1, created_at: 1 } },
+    { key: { user_id: 1, updated_at: -1 } }
+  ],
+  documents: [
+    { key: { id: 1 }, unique: true },
+    { key: { user_id: 1, created_at: -1 } }
+  ],
+  contractors: [
+    // Referral usernames are the first five letters of a name, so they can collide
+    { key: { username: 1 } },
+    { key: { user_id: 1 }, unique: true }
+  ],
+  admins: [
+    { key: { user_id: 1 }, unique: true }
+  ],
+  coupons: [
+    { key: { contractor_id: 1, created_at: -1, id: -1 } },
+    // Active-coupon counts in /contractor/stats
+    { key: { contractor_id: 1, expires_at: 1 } }
+  ],
+  payment_sessions: [
+    { key: { stripe_session_id: 1 }, unique: true },
+    { key: { user_id: 1 } }
+  ],
+  webhook_logs: [
+    // Serves /webhooks/logs (newest first) and expires old rows
+    { key: { created_at: -1 }, expireAfterSeconds: LOG_TTL_SECONDS }
+  ],
+  email_logs: [
+    { key: { sent_at: -1 }, expireAfterSeconds: LOG_TTL_SECONDS }
+  ],
+  email_outbox: [
+    { key: { id: 1 }, unique: true },
+    { key: { status: 1, available_at: 1 } },
+    { key: { claim_id: 1 } }
+  ],
+  generation_jobs: [
+    { key: { id: 1 }, unique: true },
+    { key: { status: 1, available_at: 1 } }
+  ],
+  // Event ids are the _id; these serve the processor's claim and per-customer order checks
+  webhook_events: [
+    { key: { status: 1, stripe_created: 1, received_at: 1 } },
+    { key: { ordering_key: 1, status: 1, stripe_created: 1 } }
+  ]
+}
+
+const keyOf = (key) => JSON.stringify(key)
+
+const INDEX_OPTIONS_CONFLICT = 85
+
+// Raised by an insert that collides with a unique index
+export const DUPLICATE_KEY = 11000
+
+export async function ensureIndexes(db, declared = INDEXES) {
+  const report = { created: [], failed: [] }
+
+  await Promise.all(Object.entries(declared).map(async ([collection, specs]) => {
+    for (const spec of specs) {
+      const options = { unique: !!spec.unique }
+      if (spec.expireAfterSeconds !== undefined) options.expireAfterSeconds = spec.expireAfterSeconds
+      try {
+        const name = await db.collection(collection).createIndex(spec.key, options)
+        report.created.push(`${collection}.${name}`)
+      } catch (error) {
+        // The index exists from before it had a TTL (or with another TTL): change it in place
+        if (error.code === INDEX_OPTIONS_CONFLICT && spec.expireAfterSeconds !== undefined) {
+          try {
+            await db.command({ collMod: collection, index: { keyPattern: spec.key, expireAfterSeconds: spec.expireAfterSeconds } })
+            report.created.push(`${collection}.${keyOf(spec.key)} (TTL updated)`)
+            continue
+          } catch (collModError) {
+            error = collModError
+          }
+        }
+        // Usually duplicate data under a unique index; keep serving and surface it in the report
+        report.failed.push({ collection, key: spec.key, error: error.message })
+      }
+    }
+  }))
+
+  return report
+}
+
+export async function indexReport(db, declared = INDEXES) {
+  const report = { missing: [], undeclared: [], unused: [] }
+
+  for (const [collection, specs] of Object.entries(declared)) {
+    let existing = []
+    try {
+      existing = await db.collection(collection).aggregate([{ $indexStats: {} }]).toArray()
+    } catch (error) {
+      // $indexStats needs clusterMonitor-style privileges; fall back to a plain listing
+      existing = (await db.collection(collection).indexes()).map(index => ({ name: index.name, key: index.key }))
+    }
+
+    const declaredKeys = new Set(specs.map(spec => keyOf(spec.key)))
+    const existingKeys = new Set(existing.map(index => keyOf(index.key)))
+
+    for (const spec of specs) {
+      if (!existingKeys.has(keyOf(spec.key))) {
+        report.missing.push(`${collection} ${keyOf(spec.key)}`)
+      }
+    }
+
+    for (const index of existing) {
+      if (index.name === '_id_') continue
+      if (!declaredKeys.has(keyOf(index.key))) {
+        report.undeclared.push(`${collection}.${index.name}`)
+      }
+      if (index.accesses && Number(index.accesses.ops) === 0) {
+        report.unused.push(`${collection}.${index.name}`)
+      }
+    }
+  }
+
+  return report
+}
+
+export async function bootstrapIndexes(db) {
+  const ensured = await ensureIndexes(db)
+  const report = await indexReport(db)
+
+  console.log(`MongoDB indexes ensured: ${ensured.created.length} declared, ${ensured.failed.length} failed`)
+  for (const failure of ensured.failed) {
+    console.error(`Failed to create index on ${failure.collection} ${keyOf(failure.key)}: ${failure.error}`)
+  }
+  if (report.missing.length) console.warn('Missing indexes:', report.missing)
+  if (report.undeclared.length) console.warn('Undeclared indexes:', report.undeclared)
+  if (report.unused.length) console.log('Indexes with no recorded use since server start:', report.unused)
+
+  return { ...ensured, ...report }
+}
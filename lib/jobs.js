@@ -0,0 +1,153 @@
+// MongoDB-backed job queue with an in-process worker pool.
+// Jobs are claimed atomically with findOneAndUpdate and hold a lease while running, so a
+// job whose worker died (crashed process, killed serverless instance) is picked up again
+// once its lease expires. Any process that runs a worker drains the same queue.
+// A job whose lease expires on its last attempt is not reclaimed; the sweep marks it
+// failed and runs onFailure, exactly as if the handler had thrown.
+
+import { v4 as uuidv4 } from 'uuid'
+import { LeaseQueueWorker } from './lease-queue'
+
+export const JOBS_COLLECTION = 'generation_jobs'
+
+export async function enqueueJob(db, { kind, userId, targetId, payload }) {
+  const now = new Date()
+  const job = {
+    id: uuidv4(),
+    kind,
+    user_id: userId,
+    target_id: targetId,
+    payload,
+    status: 'queued',
+    attempts: 0,
+    error: null,
+    available_at: now,
+    lease_expires_at: null,
+    created_at: now,
+    updated_at: now
+  }
+  await db.collection(JOBS_COLLECTION).insertOne(job)
+  return job
+}
+
+export class JobWorker extends LeaseQueueWorker {
+  constructor({ getDb, handler, onFailure, concurrency = 2, pollIntervalMs = 1000, leaseMs = 180000, maxAttempts = 3 }) {
+    super({ name: 'Generation jobs', getDb, concurrency, pollIntervalMs, leaseMs, maxAttempts })
+    this.handler = handler
+    this.onFailure = onFailure
+    // Queued jobs across every process, refreshed with the sweep
+    this.queueDepth = 0
+    this.counters = { claimed: 0, completed: 0, retried: 0, failed: 0, expired: 0, lost_leases: 0 }
+  }
+
+  async claim() {
+    const db = await this.getDb()
+    const now = new Date()
+    const job = await db.collection(JOBS_COLLECTION).findOneAndUpdate(
+      {
+        $or: [
+          { status: 'queued', available_at: { $lte: now } },
+          this.reclaimable('running', now)
+        ]
+      },
+      {
+        $set: {
+          status: 'running',
+          lease_expires_at: new Date(now.getTime() + this.leaseMs),
+          started_at: now,
+          updated_at: now
+        },
+        $inc: { attempts: 1 }
+      },
+      { sort: { available_at: 1 }, returnDocument: 'after' }
+    )
+    if (job) this.counters.claimed++
+    return job
+  }
+
+  async sweep() {
+    const db = await this.getDb()
+    const jobs = db.collection(JOBS_COLLECTION)
+    // Fail jobs whose worker died on their last attempt; claim() no longer picks them up
+    await this.failExhausted(jobs, 'running', async (job, error) => {
+      this.counters.expired++
+      this.counters.failed++
+      console.error(`Generation job ${job.id} failed:`, error.message)
+      if (this.onFailure) {
+        await this.onFailure(db, job, error).catch(failureError => {
+          console.error('Job failure handler error:', failureError)
+        })
+      }
+    })
+    this.queueDepth = await jobs.countDocuments({ status: 'queued' })
+  }
+
+  async run(job) {
+    const db = await this.getDb()
+    const jobs = db.collection(JOBS_COLLECTION)
+    // attempts is bumped on every claim, so it identifies this worker's lease: if the lease
+    // expired and another worker reclaimed the job, these updates match nothing
+    const leased = { id: job.id, status: 'running', attempts: job.attempts }
+
+    try {
+      const result = await this.handler(db, job)
+      const completed = await jobs.updateOne(
+        leased,
+        { $set: { status: 'completed', result: result || null, completed_at: new Date(), lease_expires_at: null, updated_at: new Date() } }
+      )
+      if (completed.matchedCount === 0) {
+        this.counters.lost_leases++
+        console.error(`Generation job ${job.id} finished after its lease was taken over (attempt ${job.attempts})`)
+        return
+      }
+      this.counters.completed++
+    } catch (error) {
+      const finalAttempt = job.attempts >= this.maxAttempts
+      // Exponential backoff between attempts: 2s, 4s, 8s...
+      const retryAt = new Date(Date.now() + 1000 * 2 ** job.attempts)
+      const recorded = await jobs.updateOne(
+        leased,
+        {
+          $set: {
+            status: finalAttempt ? 'failed' : 'queued',
+            error: error.message,
+            available_at: retryAt,
+            lease_expires_at: null,
+            updated_at: new Date()
+          }
+        }
+      )
+      if (recorded.matchedCount === 0) {
+        this.counters.lost_leases++
+        console.error(`Generation job ${job.id} attempt ${job.attempts} failed after its lease was taken over:`, error.message)
+        return
+      }
+      if (finalAttempt) {
+        this.counters.failed++
+        if (this.onFailure) {
+          await this.onFailure(db, job, error).catch(failureError => {
+            console.error('Job failure handler error:', failureError)
+          })
+        }
+      } else {
+        this.counters.retried++
+      }
+      console.error(`Generation job ${job.id} attempt ${job.attempts} failed:`, error.message)
+    }
+  }
+
+  stats() {
+    return {
+      running: this.running,
+      active: this.active,
+      concurrency: this.concurrency,
+      queued: this.queueDepth,
+      claimed: this.counters.claimed,
+      completed: this.counters.completed,
+      retried: this.counters.retried,
+      failed: this.counters.failed,
+      expired: this.counters.expired,
+      lost_leases: this.counters.lost_leases
+    }
+  }
+}
@@ -0,0 +1,111 @@
+// Polling loop shared by the MongoDB lease-based workers (generation jobs, webhook inbox,
+// email outbox).
+// A subclass claims work by setting a lease (lease_expires_at) and bumping attempts in one
+// update, and implements claim() (returns the work, or null when nothing is due) and run().
+// A row whose worker died is reclaimed once its lease expires, but only while it has attempts
+// left; sweep() runs at most once per poll interval and settles the rest with failExhausted().
+
+import { withoutTiming } from './server-timing'
+
+export class LeaseQueueWorker {
+  constructor({ name, getDb, concurrency, pollIntervalMs, leaseMs, maxAttempts }) {
+    this.name = name
+    this.getDb = getDb
+    this.concurrency = concurrency
+    this.pollIntervalMs = pollIntervalMs
+    this.leaseMs = leaseMs
+    this.maxAttempts = maxAttempts
+    this.active = 0
+    this.running = false
+    this.timer = null
+    this.lastSweepAt = 0
+  }
+
+  start() {
+    if (this.running) return
+    this.running = true
+    this.kick()
+  }
+
+  stop() {
+    this.running = false
+    clearTimeout(this.timer)
+  }
+
+  // Fill free slots now instead of waiting for the next poll (called after enqueue)
+  kick() {
+    if (!this.running) return
+    clearTimeout(this.timer)
+    // Detached from the calling request, so worker queries stay out of its Server-Timing
+    withoutTiming(() => this.fill()).catch(error => {
+      console.error(`${this.name} poll failed:`, error)
+      this.schedule()
+    })
+  }
+
+  schedule() {
+    if (!this.running) return
+    clearTimeout(this.timer)
+    // A timer keeps the context it was created in; create it outside any request
+    this.timer = withoutTiming(() => setTimeout(() => this.kick(), this.pollIntervalMs))
+  }
+
+  async fill() {
+    // fill() runs after every claim finishes, so sweep at most once per poll interval
+    if (Date.now() - this.lastSweepAt >= this.pollIntervalMs) {
+      this.lastSweepAt = Date.now()
+      await this.sweep()
+    }
+
+    while (this.running && this.active < this.concurrency) {
+      this.active++
+      let work
+      try {
+        work = await this.claim()
+      } catch (error) {
+        this.active--
+        throw error
+      }
+      if (!work) {
+        this.active--
+        break
+      }
+      this.run(work)
+        .catch(error => console.error(`${this.name} bookkeeping failed:`, error))
+        .finally(() => {
+          this.active--
+          this.kick()
+        })
+    }
+
+    this.schedule()
+  }
+
+  async sweep() {}
+
+  // Claim filter branch for rows whose worker died but that may be tried again
+  reclaimable(status, now) {
+    return { status, lease_expires_at: { $lt: now }, attempts: { $lt: this.maxAttempts } }
+  }
+
+  // Mark rows whose lease expired on their last attempt failed; onFailed(row, error) runs
+  // once per row this process failed
+  async failExhausted(collection, status, onFailed) {
+    const now = new Date()
+    const exhausted = await collection
+      .find({ status, lease_expires_at: { $lt: now }, attempts: { $gte: this.maxAttempts } })
+      .limit(100)
+      .toArray()
+
+    for (const row of exhausted) {
+      const error = new Error(`Worker lease expired on attempt ${row.attempts}`)
+      // Conditional on the lease we saw, so two processes sweeping at once fail it only once
+      const result = await collection.updateOne(
+        { _id: row._id, status, attempts: row.attempts, lease_expires_at: row.lease_expires_at },
+        { $set: { status: 'failed', error: error.message, lease_expires_at: null, updated_at: now } }
+      )
+      if (result.modifiedCount === 0) continue
+      await onFailed(row, error)
+    }
+  }
+}
@@ -0,0 +1,145 @@
+// Buffered writer for audit collections (webhook_logs, email_logs).
+// write() only appends to an in-memory buffer; rows are inserted with one unordered
+// bulkWrite per collection when the buffer reaches maxBatch, every flushIntervalMs, and
+// when the event loop drains. Audit rows therefore cost the request path nothing, at the
+// price of showing up in /webhooks/logs up to one interval late (and up to one interval
+// of rows being lost when the process is killed).
+
+import { withoutTiming } from './server-timing'
+
+export class BufferedLogWriter {
+  constructor({ getDb, maxBatch = 100, flushIntervalMs = 1000, maxBuffered = 10000 }) {
+    this.getDb = getDb
+    this.maxBatch = maxBatch
+    this.flushIntervalMs = flushIntervalMs
+    this.maxBuffered = maxBuffered
+    this.buffer = []
+    this.flushing = null
+    this.timer = null
+    this.counters = { written: 0, flushes: 0, failedFlushes: 0, dropped: 0 }
+  }
+
+  write(collection, doc) {
+    if (this.buffer.length >= this.maxBuffered) {
+      // MongoDB has been unreachable for a while; shed the oldest rows rather than grow forever
+      this.buffer.shift()
+      this.counters.dropped++
+    }
+    this.buffer.push({ collection, doc })
+    this.start()
+
+    if (this.buffer.length >= this.maxBatch) {
+      // Detached from the request that filled the buffer, so its Server-Timing stays clean
+      withoutTiming(() => this.flush()).catch(error => console.error('Log flush failed:', error))
+    }
+  }
+
+  // Started by the first write; outside the writing request's context, and never
+  // keeping the process alive on its own
+  start() {
+    if (this.timer) return
+    this.timer = withoutTiming(() => setInterval(() => {
+      if (this.buffer.length) {
+        this.flush().catch(error => console.error('Log flush failed:', error))
+      }
+    }, this.flushIntervalMs))
+    this.timer.unref?.()
+  }
+
+  // One flush at a time; rows written while it runs are picked up by the same drain loop
+  flush() {
+    if (!this.flushing) {
+      this.flushing = this.drain().finally(() => {
+        this.flushing = null
+      })
+    }
+    return this.flushing
+  }
+
+  async drain() {
+    while (this.buffer.length) {
+      const batch = this.buffer.splice(0, this.maxBatch)
+      const byCollection = new Map()
+      for (const entry of batch) {
+        if (!byCollection.has(entry.collection)) byCollection.set(entry.collection, [])
+        byCollection.get(entry.collection).push(entry)
+      }
+
+      const db = await this.getDb().catch(error => {
+        this.buffer.unshift(...batch)
+        this.counters.failedFlushes++
+        throw error
+      })
+      const results = await Promise.allSettled([...byCollection].map(([collection, entries]) => (
+        db.collection(collection).bulkWrite(entries.map(({ doc }) => ({ insertOne: { document: doc } })), { ordered: false })
+      )))
+
+      const retry = []
+      let firstError = null
+      results.forEach((result, index) => {
+        const entries = [...byCollection.values()][index]
+        if (result.status === 'fulfilled') {
+          this.counters.written += entries.length
+          return
+        }
+        firstError = firstError || result.reason
+        if (result.reason.writeErrors) {
+          // The server rejected individual rows (the rest were inserted); retrying cannot help
+          const rejected = result.reason.writeErrors.length
+          this.counters.written += entries.length - rejected
+          this.counters.dropped += rejected
+        } else {
+          retry.push(...entries)
+        }
+      })
+
+      this.counters.flushes++
+      if (firstError) {
+        // Put unwritten rows back for the next interval; write() caps how much can pile up
+        this.counters.failedFlushes++
+        this.buffer.unshift(...retry)
+        throw firstError
+      }
+    }
+  }
+
+  async close() {
+    clearInterval(this.timer)
+    this.timer = null
+    await this.flush()
+  }
+
+  stats() {
+    return {
+      buffered: this.buffer.length,
+      written: this.counters.written,
+      flushes: this.counters.flushes,
+      failed_flushes: this.counters.failedFlushes,
+      dropped: this.counters.dropped
+    }
+  }
+}
+
+// One writer per process: the route module that calls this can be evaluated more than
+// once (dev HMR), and each evaluation must not add another buffer and interval. Process
+// signals are left to the host server; rows still buffered when the event loop drains
+// get a final flush.
+export function createLogWriter({ getDb }) {
+  const existing = globalThis.__ttmlLogWriter
+  if (existing) {
+    existing.getDb = getDb
+    return existing
+  }
+
+  const writer = new BufferedLogWriter({
+    getDb,
+    maxBatch: parseInt(process.env.LOG_BATCH_SIZE || '100', 10),
+    flushIntervalMs: parseInt(process.env.LOG_FLUSH_INTERVAL_MS || '1000', 10)
+  })
+  globalThis.__ttmlLogWriter = writer
+  process.once('beforeExit', () => {
+    writer.close().catch(error => console.error('Final log flush failed:', error))
+  })
+
+  return writer
+}
@@ -0,0 +1,212 @@
+// Minimal Prometheus instrumentation: counters, gauges and histograms rendered in the
+// text exposition format (version 0.0.4) by GET /api/metrics.
+// Route metrics are recorded by handleRoute, dependency timings by timeDependency(),
+// MongoDB command timings and pool gauges from driver events (instrumentMongoClient),
+// and event-loop lag from perf_hooks. Dependency timings also feed the current request's
+// Server-Timing header.
+
+import { monitorEventLoopDelay, performance } from 'perf_hooks'
+import { recordSpan } from './server-timing'
+
+export const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+const escapeLabel = (value) => String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"')
+
+function formatLabels(labels) {
+  const entries = Object.entries(labels)
+  if (!entries.length) return ''
+  return `{${entries.map(([key, value]) => `${key}="${escapeLabel(value)}"`).join(',')}}`
+}
+
+class Metric {
+  constructor(name, help, type) {
+    this.name = name
+    this.help = help
+    this.type = type
+    this.series = new Map()
+  }
+
+  seriesFor(labels, create) {
+    const key = JSON.stringify(labels)
+    let series = this.series.get(key)
+    if (!series) {
+      series = { labels, ...create() }
+      this.series.set(key, series)
+    }
+    return series
+  }
+
+  header() {
+    return [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`]
+  }
+}
+
+export class Counter extends Metric {
+  constructor(name, help) {
+    super(name, help, 'counter')
+  }
+
+  inc(labels = {}, value = 1) {
+    this.seriesFor(labels, () => ({ value: 0 })).value += value
+  }
+
+  render() {
+    const lines = this.header()
+    for (const series of this.series.values()) {
+      lines.push(`${this.name}${formatLabels(series.labels)} ${series.value}`)
+    }
+    return lines
+  }
+}
+
+export class Gauge extends Metric {
+  // collect() is called at scrape time and returns [{ labels, value }]
+  constructor(name, help, collect = null) {
+    super(name, help, 'gauge')
+    this.collect = collect
+  }
+
+  set(labels = {}, value) {
+    this.seriesFor(labels, () => ({ value: 0 })).value = value
+  }
+
+  render() {
+    if (this.collect) {
+      for (const { labels = {}, value } of this.collect()) {
+        this.set(labels, value)
+      }
+    }
+    const lines = this.header()
+    for (const series of this.series.values()) {
+      lines.push(`${this.name}${formatLabels(series.labels)} ${series.value}`)
+    }
+    return lines
+  }
+}
+
+export class Histogram extends Metric {
+  constructor(name, help, buckets = LATENCY_BUCKETS) {
+    super(name, help, 'histogram')
+    this.buckets = buckets
+  }
+
+  observe(labels = {}, seconds) {
+    const series = this.seriesFor(labels, () => ({ counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 }))
+    for (let i = 0; i < this.buckets.length; i++) {
+      if (seconds <= this.buckets[i]) series.counts[i]++
+    }
+    series.sum += seconds
+    series.count++
+  }
+
+  render() {
+    const lines = this.header()
+    for (const series of this.series.values()) {
+      this.buckets.forEach((bound, i) => {
+        lines.push(`${this.name}_bucket${formatLabels({ ...series.labels, le: bound })} ${series.counts[i]}`)
+      })
+      lines.push(`${this.name}_bucket${formatLabels({ ...series.labels, le: '+Inf' })} ${series.count}`)
+      lines.push(`${this.name}_sum${formatLabels(series.labels)} ${series.sum}`)
+      lines.push(`${this.name}_count${formatLabels(series.labels)} ${series.count}`)
+    }
+    return lines
+  }
+}
+
+export class Registry {
+  constructor() {
+    this.metrics = []
+  }
+
+  // A second registration under the same name replaces the first (e.g. the route module
+  // re-evaluated by dev HMR), since Prometheus rejects duplicate metric families
+  register(metric) {
+    this.metrics = this.metrics.filter(existing => existing.name !== metric.name)
+    this.metrics.push(metric)
+    return metric
+  }
+
+  render() {
+    return this.metrics.flatMap(metric => metric.render()).join('\n') + '\n'
+  }
+}
+
+export const registry = new Registry()
+
+export const httpRequests = registry.register(new Counter(
+  'ttml_http_requests_total', 'API requests by route pattern, method and status'
+))
+export const httpDuration = registry.register(new Histogram(
+  'ttml_http_request_duration_seconds', 'Time until the response (or first byte of a stream) was ready'
+))
+export const dependencyDuration = registry.register(new Histogram(
+  'ttml_dependency_duration_seconds', 'Calls to MongoDB, OpenAI, Stripe and Resend by operation and outcome'
+))
+
+export function observeRequest(method, route, status, seconds) {
+  httpRequests.inc({ method, route, status })
+  httpDuration.observe({ method, route }, seconds)
+}
+
+export function observeDependency(dependency, operation, outcome, seconds) {
+  dependencyDuration.observe({ dependency, operation, outcome }, seconds)
+  recordSpan(`${dependency}.${operation}`, seconds * 1000)
+}
+
+// Time an async call to an external dependency
+export async function timeDependency(dependency, operation, fn) {
+  const startedAt = performance.now()
+  let outcome = 'error'
+  try {
+    const result = await fn()
+    outcome = 'ok'
+    return result
+  } finally {
+    observeDependency(dependency, operation, outcome, (performance.now() - startedAt) / 1000)
+  }
+}
+
+// Pool counters of the client most recently passed to instrumentMongoClient()
+let mongoPool = { open: 0, checkedOut: 0, waiting: 0 }
+
+// Registered once; connectToMongo may instrument a new client after a failed connect
+registry.register(new Gauge('ttml_mongo_pool_connections', 'MongoDB driver connection pool state', () => [
+  { labels: { state: 'open' }, value: mongoPool.open },
+  { labels: { state: 'checked_out' }, value: mongoPool.checkedOut },
+  { labels: { state: 'waiting' }, value: Math.max(0, mongoPool.waiting) }
+]))
+
+// Record MongoDB command latency and connection pool state from driver events.
+// The client must be created with { monitorCommands: true } for command events.
+export function instrumentMongoClient(client) {
+  // Fresh counters per client, so events from an abandoned client cannot skew the gauge
+  const pool = { open: 0, checkedOut: 0, waiting: 0 }
+  mongoPool = pool
+
+  client.on('commandSucceeded', event => observeDependency('mongo', event.commandName, 'ok', event.duration / 1000))
+  client.on('commandFailed', event => observeDependency('mongo', event.commandName, 'error', event.duration / 1000))
+  client.on('connectionCreated', () => { pool.open++ })
+  client.on('connectionClosed', () => { pool.open-- })
+  client.on('connectionCheckOutStarted', () => { pool.waiting++ })
+  client.on('connectionCheckOutFailed', () => { pool.waiting-- })
+  client.on('connectionCheckedOut', () => {
+    pool.waiting--
+    pool.checkedOut++
+  })
+  client.on('connectionCheckedIn', () => { pool.checkedOut-- })
+}
+
+// Event-loop delay percentiles since the previous scrape
+const loopDelay = monitorEventLoopDelay({ resolution: 20 })
+loopDelay.enable()
+
+registry.register(new Gauge('nodejs_eventloop_lag_seconds', 'Event-loop delay since the last scrape', () => {
+  const sampled = loopDelay.count > 0
+  const values = [
+    { labels: { stat: 'p50' }, value: sampled ? loopDelay.percentile(50) / 1e9 : 0 },
+    { labels: { stat: 'p99' }, value: sampled ? loopDelay.percentile(99) / 1e9 : 0 },
+    { labels: { stat: 'max' }, value: loopDelay.max / 1e9 }
+  ]
+  loopDelay.reset()
+  return values
+}))
@@ -0,0 +1,101 @@
+// Keyset pagination helpers for list endpoints
+// Pages are ordered by created_at desc, id desc; the cursor is an opaque base64url
+// token holding the sort key of the last item returned. Legacy rows without a created_at
+// date sort after every dated row and are paged by id alone.
+
+export const DEFAULT_PAGE_SIZE = 50
+export const MAX_PAGE_SIZE = 200
+
+export class InvalidCursorError extends Error {
+  constructor() {
+    super('Invalid cursor')
+    this.name = 'InvalidCursorError'
+  }
+}
+
+export function encodeCursor(doc) {
+  const dated = doc.created_at instanceof Date && !isNaN(doc.created_at.getTime())
+  const key = { c: dated ? doc.created_at.toISOString() : null, i: doc.id }
+  return Buffer.from(JSON.stringify(key)).toString('base64url')
+}
+
+export function decodeCursor(cursor) {
+  try {
+    const { c, i } = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'))
+    const createdAt = c === null ? null : new Date(c)
+    if (typeof i !== 'string' || (createdAt && isNaN(createdAt.getTime()))) {
+      throw new InvalidCursorError()
+    }
+    return { createdAt, id: i }
+  } catch (error) {
+    throw new InvalidCursorError()
+  }
+}
+
+// Read ?limit=, ?cursor= and ?include=a,b from the request URL
+export function parsePageParams(searchParams, { defaultLimit = DEFAULT_PAGE_SIZE, maxLimit = MAX_PAGE_SIZE } = {}) {
+  const requested = parseInt(searchParams.get('limit'), 10)
+  const limit = Number.isFinite(requested) && requested > 0 ? Math.min(requested, maxLimit) : defaultLimit
+  const cursor = searchParams.get('cursor')
+  const include = new Set(
+    (searchParams.get('include') || '').split(',').map(field => field.trim()).filter(Boolean)
+  )
+
+  return {
+    limit,
+    cursor: cursor ? decodeCursor(cursor) : null,
+    include
+  }
+}
+
+// Build a projection that drops heavy fields unless the caller asked for them
+export function summaryProjection(heavyFields, include, alwaysExcluded = []) {
+  const projection = { _id: 0 }
+  for (const field of alwaysExcluded) {
+    projection[field] = 0
+  }
+  for (const field of heavyFields) {
+    if (!include.has(field)) {
+      projection[field] = 0
+    }
+  }
+  return projection
+}
+
+// Fetch one page of `filter` from `collection`, newest first
+export async function findPage(collection, filter, { limit, cursor, projection }) {
+  let query = filter
+  if (cursor && cursor.createdAt) {
+    query = {
+      $and: [
+        filter,
+        {
+          $or: [
+            { created_at: { $lt: cursor.createdAt } },
+            { created_at: cursor.createdAt, id: { $lt: cursor.id } },
+            // Undated rows come after every date in the sort
+            { created_at: null }
+          ]
+        }
+      ]
+    }
+  } else if (cursor) {
+    // Already in the undated tail
+    query = { $and: [filter, { created_at: null, id: { $lt: cursor.id } }] }
+  }
+
+  const docs = await collection
+    .find(query, { projection })
+    .sort({ created_at: -1, id: -1 })
+    .limit(limit + 1)
+    .toArray()
+
+  const hasMore = docs.length > limit
+  const items = hasMore ? docs.slice(0, limit) : docs
+
+  return {
+    items,
+    has_more: hasMore,
+    next_cursor: hasMore ? encodeCursor(items[items.length - 1]) : null
+  }
+}
@@ -0,0 +1,91 @@
+// Method + path-segment router for the catch-all API route.
+// Patterns are compiled into a segment trie once at module load, so dispatch cost
+// depends on the depth of the path rather than on how many routes are registered.
+// Static segments win over `:param` segments; registering the same method and
+// pattern twice throws instead of silently shadowing the later handler.
+
+function createNode() {
+  return { children: new Map(), param: null, methods: new Map() }
+}
+
+export class Router {
+  constructor() {
+    this.root = createNode()
+    this.table = []
+  }
+
+  add(method, pattern, handler, options = {}) {
+    let node = this.root
+    for (const segment of pattern.split('/').filter(Boolean)) {
+      if (segment.startsWith(':')) {
+        const name = segment.slice(1)
+        if (!node.param) {
+          node.param = { name, node: createNode() }
+        } else if (node.param.name !== name) {
+          throw new Error(`Conflicting parameter names :${node.param.name} and :${name} in ${pattern}`)
+        }
+        node = node.param.node
+      } else {
+        if (!node.children.has(segment)) {
+          node.children.set(segment, createNode())
+        }
+        node = node.children.get(segment)
+      }
+    }
+
+    if (node.methods.has(method)) {
+      throw new Error(`Duplicate route ${method} ${pattern}`)
+    }
+    const route = { method, pattern, handler, options }
+    node.methods.set(method, route)
+    this.table.push(route)
+    return this
+  }
+
+  get(pattern, handler, options) {
+    return this.add('GET', pattern, handler, options)
+  }
+
+  post(pattern, handler, options) {
+    return this.add('POST', pattern, handler, options)
+  }
+
+  put(pattern, handler, options) {
+    return this.add('PUT', pattern, handler, options)
+  }
+
+  // Resolve a method and path (string or array of segments) to { route, params }, or null
+  match(method, path) {
+    const segments = Array.isArray(path) ? path : path.split('/').filter(Boolean)
+    const params = {}
+    const route = this.walk(this.root, segments, 0, method, params)
+    return route ? { route, params } : null
+  }
+
+  walk(node, segments, index, method, params) {
+    if (index === segments.length) {
+      return node.methods.get(method) || null
+    }
+
+    const segment = segments[index]
+    const child = node.children.get(segment)
+    if (child) {
+      const route = this.walk(child, segments, index + 1, method, params)
+      if (route) return route
+    }
+
+    // Fall back to the parameter branch, e.g. /letters/:id when no static segment matched
+    if (node.param) {
+      const route = this.walk(node.param.node, segments, index + 1, method, params)
+      if (route) {
+        params[node.param.name] = segment
+        return route
+      }
+    }
+    return null
+  }
+
+  routes() {
+    return this.table.map(route => `${route.method} ${route.pattern}`)
+  }
+}
@@ -0,0 +1,50 @@
+// Per-request Server-Timing spans.
+// handleRoute runs each request inside runWithTiming(); anything that records a span while
+// the request is in flight (auth, every MongoDB command, OpenAI, Stripe and Resend calls via
+// lib/metrics.js) is summed by name and reported in the response's Server-Timing header.
+// Work started outside a request records nothing. Background work that a request sets off
+// (index bootstrap, the job, email and webhook workers that a request kicks) must be started
+// through withoutTiming(), or its spans and timers would inherit that request's context.
+
+import { AsyncLocalStorage } from 'async_hooks'
+import { performance } from 'perf_hooks'
+
+const storage = new AsyncLocalStorage()
+
+export function runWithTiming(fn) {
+  return storage.run({ startedAt: performance.now(), spans: new Map() }, fn)
+}
+
+// Run fn detached from the current request, e.g. for process-wide setup that a request triggers
+export function withoutTiming(fn) {
+  return storage.exit(fn)
+}
+
+export function recordSpan(name, ms) {
+  const timing = storage.getStore()
+  if (!timing) return
+  const span = timing.spans.get(name) || { dur: 0, count: 0 }
+  span.dur += ms
+  span.count++
+  timing.spans.set(name, span)
+}
+
+export async function timeSpan(name, fn) {
+  const startedAt = performance.now()
+  try {
+    return await fn()
+  } finally {
+    recordSpan(name, performance.now() - startedAt)
+  }
+}
+
+// e.g. `auth;dur=0.2, mongo.find;dur=3.1;desc="2 calls", openai.chat.completions.create;dur=13890.4, total;dur=13902.7`
+export function serverTimingHeader() {
+  const timing = storage.getStore()
+  if (!timing) return null
+  const entries = [...timing.spans].map(([name, span]) => (
+    `${name};dur=${span.dur.toFixed(1)}${span.count > 1 ? `;desc="${span.count} calls"` : ''}`
+  ))
+  entries.push(`total;dur=${(performance.now() - timing.startedAt).toFixed(1)}`)
+  return entries.join(', ')
+}
@@ -0,0 +1,98 @@
+// Bounded in-process LRU/TTL cache of user documents keyed by user id.
+// Every write to a user document in route.js goes through invalidate() or prime(), so
+// within one process reads never see stale data; the TTL bounds staleness when another
+// process (or a manual database edit) changes a user behind our back.
+
+export class UserCache {
+  constructor({ maxEntries = 5000, ttlMs = 30000 } = {}) {
+    this.maxEntries = maxEntries
+    this.ttlMs = ttlMs
+    this.entries = new Map()
+    // Bumped on every invalidation so a read that raced a write does not re-cache old data
+    this.epoch = 0
+    this.counters = { hits: 0, misses: 0, evictions: 0, invalidations: 0 }
+  }
+
+  get enabled() {
+    return this.maxEntries > 0 && this.ttlMs > 0
+  }
+
+  get(id) {
+    const entry = this.entries.get(id)
+    if (!entry) return null
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(id)
+      return null
+    }
+    // Re-insert to mark as most recently used
+    this.entries.delete(id)
+    this.entries.set(id, entry)
+    return entry.user
+  }
+
+  set(user) {
+    if (!this.enabled || !user) return
+    this.entries.delete(user.id)
+    this.entries.set(user.id, { user, expiresAt: Date.now() + this.ttlMs })
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value)
+      this.counters.evictions++
+    }
+  }
+
+  // Write-through for updates whose result we already know (e.g. the login timestamp)
+  prime(user) {
+    this.epoch++
+    this.set(user)
+  }
+
+  invalidate(id) {
+    this.epoch++
+    this.counters.invalidations++
+    this.entries.delete(id)
+  }
+
+  clear() {
+    this.epoch++
+    this.entries.clear()
+  }
+
+  // Cached replacement for db.collection('users').findOne({ id })
+  async load(db, id) {
+    const cached = this.get(id)
+    if (cached) {
+      this.counters.hits++
+      return cached
+    }
+
+    this.counters.misses++
+    const epoch = this.epoch
+    const user = await db.collection('users').findOne({ id })
+    if (user && epoch === this.epoch) {
+      this.set(user)
+    }
+    return user
+  }
+
+  stats() {
+    const lookups = this.counters.hits + this.counters.misses
+    return {
+      enabled: this.enabled,
+      size: this.entries.size,
+      max_entries: this.maxEntries,
+      ttl_ms: this.ttlMs,
+      hits: this.counters.hits,
+      misses: this.counters.misses,
+      hit_ratio: lookups ? Number((this.counters.hits / lookups).toFixed(3)) : 0,
+      evictions: this.counters.evictions,
+      invalidations: this.counters.invalidations
+    }
+  }
+}
+
+export function createUserCache() {
+  return new UserCache({
+    maxEntries: parseInt(process.env.USER_CACHE_MAX_ENTRIES || '5000', 10),
+    ttlMs: parseInt(process.env.USER_CACHE_TTL_MS || '30000', 10)
+  })
+}
@@ -0,0 +1,208 @@
+// Stripe webhook inbox.
+// /webhooks/stripe only verifies the signature and inserts the raw event here, keyed by
+// Stripe's event id as _id, then acks. A redelivered event fails that insert on the _id
+// index (which exists from the moment the collection does, unlike bootstrapped indexes),
+// so a Stripe retry costs one index lookup and never re-applies its side effects.
+// WebhookProcessor applies stored events in the background, one at a time per customer in
+// Stripe `created` order, with leases and retry backoff like the generation JobWorker: an
+// event whose lease expires on its last attempt is swept to failed rather than reclaimed.
+
+import { LeaseQueueWorker } from './lease-queue'
+
+export const WEBHOOK_EVENTS_COLLECTION = 'webhook_events'
+
+const DUPLICATE_KEY = 11000
+
+// Events for the same customer must not be applied concurrently or out of order
+export function orderingKey(event) {
+  const object = event.data?.object || {}
+  return object.metadata?.userId || object.customer || 'global'
+}
+
+// Returns { duplicate: true } when Stripe already delivered this event
+export async function recordWebhookEvent(db, event) {
+  const now = new Date()
+  try {
+    await db.collection(WEBHOOK_EVENTS_COLLECTION).insertOne({
+      _id: event.id,
+      type: event.type,
+      ordering_key: orderingKey(event),
+      stripe_created: new Date((event.created || now.getTime() / 1000) * 1000),
+      event,
+      status: 'pending',
+      attempts: 0,
+      error: null,
+      available_at: now,
+      lease_expires_at: null,
+      received_at: now,
+      updated_at: now
+    })
+    return { duplicate: false }
+  } catch (error) {
+    if (error.code === DUPLICATE_KEY) {
+      return { duplicate: true }
+    }
+    throw error
+  }
+}
+
+export class WebhookProcessor extends LeaseQueueWorker {
+  constructor({ getDb, handler, concurrency = 4, pollIntervalMs = 1000, leaseMs = 60000, maxAttempts = 5 }) {
+    super({ name: 'Webhook processor', getDb, concurrency, pollIntervalMs, leaseMs, maxAttempts })
+    this.handler = handler
+    this.counters = { received: 0, duplicates: 0, processed: 0, retried: 0, failed: 0, deferred: 0, expired: 0, lost_leases: 0 }
+  }
+
+  // Store a verified event and start applying it; returns { duplicate }
+  async receive(db, event) {
+    const result = await recordWebhookEvent(db, event)
+    if (result.duplicate) {
+      this.counters.duplicates++
+    } else {
+      this.counters.received++
+      this.kick()
+    }
+    return result
+  }
+
+  async sweep() {
+    const db = await this.getDb()
+    await this.failExhausted(db.collection(WEBHOOK_EVENTS_COLLECTION), 'processing', async (record, error) => {
+      this.counters.expired++
+      this.counters.failed++
+      console.error(`Webhook event ${record._id} (${record.type}) failed:`, error.message)
+    })
+  }
+
+  async claim() {
+    const db = await this.getDb()
+    const events = db.collection(WEBHOOK_EVENTS_COLLECTION)
+
+    // Skip a few deferred customers per pass so one blocked customer cannot starve the rest
+    const skipped = []
+    for (let pass = 0; pass < 4; pass++) {
+      const now = new Date()
+      const record = await events.findOneAndUpdate(
+        {
+          $or: [
+            { status: 'pending', available_at: { $lte: now } },
+            this.reclaimable('processing', now)
+          ],
+          ...(skipped.length ? { ordering_key: { $nin: skipped } } : {})
+        },
+        {
+          $set: {
+            status: 'processing',
+            lease_expires_at: new Date(now.getTime() + this.leaseMs),
+            updated_at: now
+          },
+          $inc: { attempts: 1 }
+        },
+        { sort: { stripe_created: 1, received_at: 1 }, returnDocument: 'after' }
+      )
+      if (!record) return null
+
+      // Another event for this customer is older and unfinished (in flight, or waiting to
+      // retry): put this one back so the customer's events apply strictly in order
+      const earlier = await events.findOne(
+        {
+          _id: { $ne: record._id },
+          ordering_key: record.ordering_key,
+          status: { $in: ['pending', 'processing'] },
+          $or: [
+            { stripe_created: { $lt: record.stripe_created } },
+            { stripe_created: record.stripe_created, received_at: { $lt: record.received_at } }
+          ]
+        },
+        { projection: { _id: 1, available_at: 1 } }
+      )
+      if (!earlier) return record
+
+      this.counters.deferred++
+      skipped.push(record.ordering_key)
+      // No point retrying before the blocking event itself is due
+      const retryAt = Math.max(Date.now() + this.pollIntervalMs, earlier.available_at?.getTime() || 0)
+      await events.updateOne(
+        { _id: record._id, status: 'processing', attempts: record.attempts },
+        {
+          $set: { status: 'pending', lease_expires_at: null, available_at: new Date(retryAt) },
+          $inc: { attempts: -1 }
+        }
+      )
+    }
+    return null
+  }
+
+  async run(record) {
+    const db = await this.getDb()
+    const events = db.collection(WEBHOOK_EVENTS_COLLECTION)
+    // attempts is bumped on every claim, so it identifies this worker's lease: if the lease
+    // expired and another worker reclaimed the event, these updates match nothing
+    const leased = { _id: record._id, status: 'processing', attempts: record.attempts }
+
+    try {
+      await this.handler(db, record.event)
+      const processed = await events.updateOne(
+        leased,
+        { $set: { status: 'processed', processed_at: new Date(), lease_expires_at: null, updated_at: new Date() } }
+      )
+      if (processed.matchedCount === 0) {
+        this.counters.lost_leases++
+        console.error(`Webhook event ${record._id} finished after its lease was taken over (attempt ${record.attempts})`)
+        return
+      }
+      this.counters.processed++
+    } catch (error) {
+      const finalAttempt = record.attempts >= this.maxAttempts
+      // Exponential backoff between attempts: 2s, 4s, 8s...
+      const retryAt = new Date(Date.now() + 1000 * 2 ** record.attempts)
+      const recorded = await events.updateOne(
+        leased,
+        {
+          $set: {
+            status: finalAttempt ? 'failed' : 'pending',
+            error: error.message,
+            available_at: retryAt,
+            lease_expires_at: null,
+            updated_at: new Date()
+          }
+        }
+      )
+      if (recorded.matchedCount === 0) {
+        this.counters.lost_leases++
+        console.error(`Webhook event ${record._id} attempt ${record.attempts} failed after its lease was taken over:`, error.message)
+        return
+      }
+      if (finalAttempt) {
+        this.counters.failed++
+      } else {
+        this.counters.retried++
+      }
+      console.error(`Webhook event ${record._id} (${record.type}) attempt ${record.attempts} failed:`, error.message)
+    }
+  }
+
+  stats() {
+    return {
+      running: this.running,
+      active: this.active,
+      concurrency: this.concurrency,
+      received: this.counters.received,
+      duplicates: this.counters.duplicates,
+      processed: this.counters.processed,
+      retried: this.counters.retried,
+      failed: this.counters.failed,
+      deferred: this.counters.deferred,
+      expired: this.counters.expired,
+      lost_leases: this.counters.lost_leases
+    }
+  }
+}
+
+export function createWebhookProcessor({ getDb, handler }) {
+  return new WebhookProcessor({
+    getDb,
+    handler,
+    concurrency: parseInt(process.env.WEBHOOK_WORKERS || '4', 10)
+  })
+}
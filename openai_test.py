@@ -3,15 +3,16 @@
 Quick test to verify OpenAI integration with letter generation
 """
 
-import requests
 import json
 from pymongo import MongoClient
 from datetime import datetime, timedelta
 import uuid
 
+from tests.client import ApiClient, HEADERS
+
 # Configuration
-BASE_URL = "https://e84f8a3d-0d39-435e-9801-5c4ea21bd735.preview.emergentagent.com/api"
-HEADERS = {"Content-Type": "application/json"}
+client = ApiClient(default_target="preview")
+BASE_URL = client.base_url
 
 # MongoDB connection
 MONGO_URL = "mongodb://localhost:27017"
@@ -24,8 +25,8 @@ def test_openai_integration():
     
     try:
         # Connect to MongoDB
-        client = MongoClient(MONGO_URL)
-        db = client[DB_NAME]
+        mongo_client = MongoClient(MONGO_URL)
+        db = mongo_client[DB_NAME]
         
         # Create a test user with subscription
         test_email = f"openai_test_{int(datetime.now().timestamp())}@example.com"
@@ -38,7 +39,7 @@ def test_openai_integration():
         
         # Register user
         print("1. Registering test user...")
-        response = requests.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=user_data, timeout=10)
+        response = client.post(f"{BASE_URL}/auth/register", headers=HEADERS, json=user_data, timeout=10)
         
         if response.status_code != 200:
             print(f"❌ Failed to register user: {response.status_code}")
@@ -100,7 +101,7 @@ def test_openai_integration():
             "urgencyLevel": "urgent"
         }
         
-        response = requests.post(
+        response = client.post(
             f"{BASE_URL}/letters/generate",
             headers=headers,
             json=letter_data,
@@ -151,12 +152,13 @@ def test_openai_integration():
     finally:
         # Clean up
         try:
-            client.close()
+            mongo_client.close()
         except:
             pass
 
 if __name__ == "__main__":
     success = test_openai_integration()
+    client.print_timings()
     if success:
         print("\n🎉 OpenAI Integration Test Completed Successfully!")
     else:
@@ -1,4 +1,36 @@
 // API service layer for centralized API calls
+
+// Largest page the list endpoints serve (MAX_PAGE_SIZE in lib/pagination.js)
+const PAGE_LIMIT = 200
+
+// One keyset page of a list endpoint: { [key]: items, next_cursor } (null on the last page)
+export async function fetchPage(url, key, cursor = null, options = {}) {
+  const separator = url.includes('?') ? '&' : '?'
+  const pageUrl = `${url}${separator}limit=${PAGE_LIMIT}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`
+  const response = await fetch(pageUrl, options)
+  const data = await response.json()
+
+  if (!response.ok) {
+    throw new Error(data.error || `HTTP error! status: ${response.status}`)
+  }
+
+  return { [key]: data[key] || [], next_cursor: data.next_cursor || null }
+}
+
+// List endpoints return keyset pages; follow next_cursor until the list is exhausted
+// and return { [key]: every item }
+export async function fetchAllPages(url, key, options = {}) {
+  const items = []
+  let cursor = null
+  do {
+    const page = await fetchPage(url, key, cursor, options)
+    items.push(...page[key])
+    cursor = page.next_cursor
+  } while (cursor)
+
+  return { [key]: items }
+}
+
 class ApiService {
   constructor() {
     this.baseURL = '/api'
@@ -33,6 +65,15 @@ class ApiService {
     }
   }
 
+  async requestAllPages(endpoint, key, options = {}) {
+    try {
+      return await fetchAllPages(`${this.baseURL}${endpoint}`, key, options)
+    } catch (error) {
+      console.error(`API Error (${endpoint}):`, error)
+      throw error
+    }
+  }
+
   // Auth endpoints
   async register(userData) {
     return this.request('/auth/register', {
@@ -71,7 +112,7 @@ class ApiService {
   }
 
   async getUserLetters(token) {
-    return this.request('/letters', {
+    return this.requestAllPages('/letters?include=content', 'letters', {
       headers: { Authorization: `Bearer ${token}` },
     })
   }
@@ -116,7 +157,7 @@ class ApiService {
   }
 
   async getCoupons(token) {
-    return this.request('/coupons', {
+    return this.requestAllPages('/coupons', 'coupons', {
       headers: { Authorization: `Bearer ${token}` },
     })
   }
@@ -136,13 +177,13 @@ class ApiService {
 
   // Admin endpoints
   async getAdminUsers(token) {
-    return this.request('/admin/users', {
+    return this.requestAllPages('/admin/users', 'users', {
       headers: { Authorization: `Bearer ${token}` },
     })
   }
 
   async getAdminLetters(token) {
-    return this.request('/admin/letters', {
+    return this.requestAllPages('/admin/letters', 'letters', {
       headers: { Authorization: `Bearer ${token}` },
     })
   }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Benchmark for Talk To My Lawyer
+Drives concurrent /auth/register and /auth/login traffic while probing an unrelated cheap
+endpoint (GET /) to show how much bcrypt work stalls the rest of the API.
+
+Run once against a server started with BCRYPT_WORKERS=0 (inline bcryptjs) and once with
+the worker pool, then compare:
+    python -m tests.bcrypt_bench --label inline --json inline.json
+    python -m tests.bcrypt_bench --label pool --json pool.json
+    python -m tests.bcrypt_bench --compare inline.json pool.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+import aiohttp
+
+from tests.client import HEADERS, resolve_base_url
+from tests.load import LoadStats
+
+# Configuration
+DEFAULT_BASE_URL = resolve_base_url("local")
+PROBE_LABEL = "GET / (probe)"
+
+
+async def timed(session, stats, label, method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        async with session.request(method, url, **kwargs) as response:
+            await response.read()
+            stats.record(label, time.perf_counter() - started, response.status)
+            return response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        stats.record(label, time.perf_counter() - started, 'error')
+        return None
+
+
+async def probe(session, base_url, stats, stop, interval):
+    """Hit GET / at a fixed interval until stop is set"""
+    while not stop.is_set():
+        await timed(session, stats, PROBE_LABEL, "GET", f"{base_url}/")
+        await asyncio.sleep(interval)
+
+
+async def auth_worker(session, base_url, stats, stop, login_ratio, accounts):
+    """Alternate between registering new accounts and logging into existing ones"""
+    iteration = 0
+    while not stop.is_set():
+        iteration += 1
+        if accounts and (iteration % 100) < login_ratio * 100:
+            email, password = accounts[iteration % len(accounts)]
+            await timed(session, stats, "POST /auth/login", "POST", f"{base_url}/auth/login",
+                        headers=HEADERS, json={"email": email, "password": password})
+        else:
+            email = f"bcrypt.{uuid.uuid4().hex[:12]}@example.com"
+            password = "BenchPass123!"
+            status = await timed(session, stats, "POST /auth/register", "POST", f"{base_url}/auth/register",
+                                 headers=HEADERS, json={"email": email, "password": password, "name": "Bcrypt Bench"})
+            if status == 200:
+                accounts.append((email, password))
+
+
+async def run_phase(base_url, duration, concurrency, login_ratio, probe_interval, accounts):
+    stats = LoadStats()
+    stop = asyncio.Event()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency + 2)) as session:
+        stats.started_at = time.perf_counter()
+        tasks = [asyncio.create_task(probe(session, base_url, stats, stop, probe_interval))]
+        tasks += [asyncio.create_task(auth_worker(session, base_url, stats, stop, login_ratio, accounts))
+                  for _ in range(concurrency)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        stats.finished_at = time.perf_counter()
+
+        hashing = None
+        try:
+            async with session.get(f"{base_url}/health") as response:
+                hashing = (await response.json()).get("password_hashing")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+    return stats.summary(), hashing
+
+
+async def benchmark(args):
+    accounts = []
+    print(f"⏱️  Idle probe baseline ({args.idle_duration}s)...")
+    idle, _ = await run_phase(args.base_url, args.idle_duration, 0, 0, args.probe_interval, accounts)
+    print(f"🔐 Auth load: {args.concurrency} workers for {args.duration}s ({int(args.login_ratio * 100)}% logins)...")
+    loaded, hashing = await run_phase(args.base_url, args.duration, args.concurrency, args.login_ratio,
+                                      args.probe_interval, accounts)
+    return {
+        "label": args.label,
+        "idle_probe": idle["endpoints"].get(PROBE_LABEL),
+        "under_load": loaded["endpoints"],
+        "elapsed_s": loaded["elapsed_s"],
+        "password_hashing": hashing
+    }
+
+
+def print_result(result):
+    print("\n" + "=" * 90)
+    print(f"📊 PASSWORD HASHING BENCHMARK ({result['label']})")
+    print("=" * 90)
+    idle = result["idle_probe"] or {}
+    print(f"{'Idle probe':<28} p50={idle.get('p50_ms')}ms p95={idle.get('p95_ms')}ms p99={idle.get('p99_ms')}ms")
+    for endpoint, row in result["under_load"].items():
+        print(f"{endpoint:<28} reqs={row['requests']:<6} rps={row['throughput_rps']:<8} p50={row['p50_ms']}ms "
+              f"p95={row['p95_ms']}ms p99={row['p99_ms']}ms")
+    if result["password_hashing"]:
+        print(f"Server hashing stats: {result['password_hashing']}")
+
+
+def compare(paths):
+    results = [json.load(open(path)) for path in paths]
+    rows = [("Idle probe p99 ms", lambda r: (r["idle_probe"] or {}).get("p99_ms"))]
+    for endpoint in ["POST /auth/register", "POST /auth/login", PROBE_LABEL]:
+        rows.append((f"{endpoint} rps", lambda r, e=endpoint: r["under_load"].get(e, {}).get("throughput_rps")))
+        rows.append((f"{endpoint} p99 ms", lambda r, e=endpoint: r["under_load"].get(e, {}).get("p99_ms")))
+
+    print(f"{'Metric':<34}" + "".join(f"{r['label']:>16}" for r in results))
+    for name, getter in rows:
+        print(f"{name:<34}" + "".join(f"{str(getter(r)):>16}" for r in results))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark register/login and their impact on unrelated endpoints")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API base URL including /api")
+    parser.add_argument("--label", default="run", help="Name for this run in reports")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of auth load")
+    parser.add_argument("--idle-duration", type=float, default=5.0, help="Seconds of probe-only baseline")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent register/login workers")
+    parser.add_argument("--login-ratio", type=float, default=0.5, help="Fraction of auth calls that are logins")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="Seconds between probe requests")
+    parser.add_argument("--json", dest="json_path", help="Write the result as JSON to this path")
+    parser.add_argument("--compare", nargs="+", metavar="JSON", help="Print saved results side by side and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(args.compare)
+        return 0
+
+    result = asyncio.run(benchmark(args))
+    print_result(result)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Result written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
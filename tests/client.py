@@ -0,0 +1,197 @@
+"""
+Shared HTTP client for the Talk To My Lawyer test scripts.
+
+One pooled requests.Session per process with keep-alive, retries with backoff and a
+timing record attached to every response, so the numbers the scripts report measure
+the server rather than TCP/TLS connection setup.
+
+Target selection:
+    TTML_BASE_URL=http://host:3000/api   explicit API base URL (wins over everything)
+    TTML_TARGET=local|preview            pick one of the known hosts
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TARGETS = {
+    "local": "http://localhost:3000/api",
+    "preview": "https://e84f8a3d-0d39-435e-9801-5c4ea21bd735.preview.emergentagent.com/api"
+}
+HEADERS = {"Content-Type": "application/json"}
+DEFAULT_TIMEOUT = 30
+
+
+def resolve_base_url(default="local"):
+    """Return the API base URL from the environment, falling back to the named default target"""
+    explicit = os.environ.get("TTML_BASE_URL")
+    if explicit:
+        return explicit.rstrip("/")
+    target = os.environ.get("TTML_TARGET", default)
+    return TARGETS.get(target, target).rstrip("/")
+
+
+def parse_server_timing(header):
+    """Parse a Server-Timing header into {span name: milliseconds}"""
+    spans = {}
+    for entry in (header or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        if not name:
+            continue
+        duration = 0.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                try:
+                    duration = float(value)
+                except ValueError:
+                    pass
+        spans[name] = spans.get(name, 0.0) + duration
+    return spans
+
+
+@dataclass
+class CallTiming:
+    """Wall-clock timing of one request, including reading the response body"""
+    method: str
+    path: str
+    status: int
+    elapsed_ms: float
+    ttfb_ms: float
+    started_at: float
+    spans: dict = field(default_factory=dict)
+
+
+class ApiClient:
+    """Pooled, retrying session that records a CallTiming for every request"""
+
+    def __init__(self, base_url=None, default_target="local", timeout=DEFAULT_TIMEOUT,
+                 retries=3, backoff_factor=0.3, pool_size=10):
+        self.base_url = (base_url or resolve_base_url(default_target)).rstrip("/")
+        self.timeout = timeout
+        self.timings = []
+        self.noted = 0
+
+        # Only idempotent methods are retried on 502/504; connection errors are
+        # retried for every method because nothing reached the server. 503 is left
+        # alone: overload and health 503s are answers the scripts need to see.
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+        started = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        # Touch the body so the timing includes the full transfer, not just the headers
+        response.content
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        timing = CallTiming(
+            method=method.upper(),
+            path=urlsplit(url).path,
+            status=response.status_code,
+            elapsed_ms=round(elapsed_ms, 2),
+            # requests' elapsed is client-side time until the headers arrived
+            ttfb_ms=round(response.elapsed.total_seconds() * 1000, 2),
+            started_at=started,
+            spans=parse_server_timing(response.headers.get("Server-Timing"))
+        )
+        response.timing = timing
+        self.timings.append(timing)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def timing_summary(self):
+        """Group recorded timings by method + path and return count/mean/p95/max in ms"""
+        grouped = {}
+        for timing in self.timings:
+            grouped.setdefault(f"{timing.method} {timing.path}", []).append(timing.elapsed_ms)
+
+        summary = {}
+        for endpoint, values in grouped.items():
+            values.sort()
+            p95_index = max(0, math.ceil(0.95 * len(values)) - 1)
+            summary[endpoint] = {
+                'count': len(values),
+                'mean_ms': round(sum(values) / len(values), 1),
+                'p95_ms': round(values[p95_index], 1),
+                'max_ms': round(values[-1], 1)
+            }
+        return summary
+
+    def span_totals(self, timings=None):
+        """Sum Server-Timing spans (excluding the server's own total) over the given calls"""
+        totals = {}
+        for timing in self.timings if timings is None else timings:
+            for name, duration in timing.spans.items():
+                if name != "total":
+                    totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def timing_note(self, top=3):
+        """Describe where the time went in the calls made since the previous note, e.g.
+        2 calls, 14203ms: openai.chat.completions.create 13890ms, mongo.insert 6ms, auth 0ms
+        """
+        timings = self.timings[self.noted:]
+        self.noted = len(self.timings)
+        if not timings:
+            return ""
+        elapsed = sum(timing.elapsed_ms for timing in timings)
+        spans = sorted(self.span_totals(timings).items(), key=lambda item: -item[1])[:top]
+        note = f"{len(timings)} call{'s' if len(timings) != 1 else ''}, {elapsed:.0f}ms"
+        if spans:
+            note += ": " + ", ".join(f"{name} {duration:.0f}ms" for name, duration in spans)
+        return note
+
+    def print_timings(self):
+        summary = self.timing_summary()
+        if not summary:
+            return
+        print("\n⏱️  REQUEST TIMINGS")
+        print("=" * 80)
+        print(f"{'Endpoint':<44}{'Calls':>7}{'Mean ms':>10}{'p95 ms':>10}{'Max ms':>10}")
+        for endpoint, row in sorted(summary.items()):
+            print(f"{endpoint:<44}{row['count']:>7}{row['mean_ms']:>10}{row['p95_ms']:>10}{row['max_ms']:>10}")
+
+        spans = self.span_totals()
+        if spans:
+            print("\nServer-Timing breakdown (all calls)")
+            print(f"{'Span':<44}{'Total ms':>10}")
+            for name, duration in sorted(spans.items(), key=lambda item: -item[1]):
+                print(f"{name:<44}{duration:>10.1f}")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Conditional GET Polling Benchmark for Talk To My Lawyer
+Polls GET /letters?include=content and GET /letters/{id} the way the dashboard and the
+generation timeline do, once re-downloading everything and once sending If-None-Match
+with the last ETag, and reports bytes transferred and latency for both. A letter's stage
+is bumped every few rounds so the conditional run also proves that changes are never
+hidden behind a stale 304.
+
+Usage:
+    python -m tests.etag_poll --letters 20 --rounds 200 --change-every 25
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from tests.client import ApiClient, HEADERS
+
+# MongoDB connection
+DEFAULT_MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DEFAULT_DB_NAME = os.environ.get("DB_NAME", "letterdash_db")
+
+LIST_LABEL = "GET /letters?include=content"
+DETAIL_LABEL = "GET /letters/{id}"
+
+
+def response_bytes(response):
+    """Approximate bytes on the wire: status line, headers and body"""
+    headers = sum(len(key) + len(value) + 4 for key, value in response.headers.items())
+    return 17 + headers + len(response.content)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[max(0, math.ceil(fraction * len(values)) - 1)], 1)
+
+
+class PollStats:
+    """Per-endpoint status counts, bytes and latencies for one run"""
+
+    def __init__(self):
+        self.endpoints = {}
+
+    def record(self, label, response):
+        row = self.endpoints.setdefault(label, {"statuses": {}, "bytes": 0, "latencies": []})
+        row["statuses"][response.status_code] = row["statuses"].get(response.status_code, 0) + 1
+        row["bytes"] += response_bytes(response)
+        row["latencies"].append(response.timing.elapsed_ms)
+
+    def summary(self):
+        return {
+            label: {
+                "requests": len(row["latencies"]),
+                "ok": row["statuses"].get(200, 0),
+                "not_modified": row["statuses"].get(304, 0),
+                "other": sum(count for status, count in row["statuses"].items() if status not in (200, 304)),
+                "kb": round(row["bytes"] / 1024, 1),
+                "mean_ms": round(sum(row["latencies"]) / len(row["latencies"]), 1),
+                "p50_ms": percentile(row["latencies"], 0.50),
+                "p95_ms": percentile(row["latencies"], 0.95)
+            }
+            for label, row in self.endpoints.items()
+        }
+
+
+def seed_letters(db, user_id, count, content_bytes):
+    now = datetime.now()
+    letters = [{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "title": f"Polling Test Letter {index}",
+        "content": ("Dear Recipient,\n\n" + "This paragraph pads the letter body. " * (content_bytes // 37 + 1))[:content_bytes],
+        "letter_type": "demand_letter",
+        "form_data": {"fullName": "Polling Test User"},
+        "urgency_level": "standard",
+        "status": "ready",
+        "stage": 4,
+        "professional_generated": True,
+        "created_at": now - timedelta(minutes=index),
+        "updated_at": now - timedelta(minutes=index)
+    } for index in range(count)]
+    db.letters.insert_many(letters)
+    return [letter["id"] for letter in letters]
+
+
+def run_polls(client, headers, letter_ids, rounds, change_every, conditional):
+    """Poll the list and one letter per round; returns (stats, stale 304s after a change)"""
+    stats = PollStats()
+    etags = {}
+    stale = 0
+    changed = set()
+
+    for round_index in range(rounds):
+        letter_id = letter_ids[round_index % len(letter_ids)]
+        if change_every and round_index and round_index % change_every == 0:
+            client.put(f"/letters/{letter_id}/stage", headers=headers, json={"stage": 1 + round_index % 4})
+            changed = {"list", letter_id}
+
+        for key, label, path in (("list", LIST_LABEL, "/letters?include=content"),
+                                 (letter_id, DETAIL_LABEL, f"/letters/{letter_id}")):
+            request_headers = dict(headers)
+            if conditional and key in etags:
+                request_headers["If-None-Match"] = etags[key]
+            response = client.get(path, headers=request_headers)
+            stats.record(label, response)
+            if response.status_code == 304 and key in changed:
+                stale += 1
+            changed.discard(key)
+            if response.headers.get("ETag"):
+                etags[key] = response.headers["ETag"]
+
+    return stats.summary(), stale
+
+
+def print_result(result):
+    print("\n" + "=" * 100)
+    print(f"📊 CONDITIONAL GET POLLING ({result['rounds']} rounds, {result['letters']} letters)")
+    print("=" * 100)
+    print(f"{'Run':<13}{'Endpoint':<32}{'Reqs':>6}{'200':>6}{'304':>6}{'KB':>10}"
+          f"{'Mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for run in ("plain", "conditional"):
+        for label, row in result[run].items():
+            print(f"{run:<13}{label:<32}{row['requests']:>6}{row['ok']:>6}{row['not_modified']:>6}{row['kb']:>10}"
+                  f"{row['mean_ms']:>10}{row['p50_ms']:>9}{row['p95_ms']:>9}")
+
+    print()
+    for label in result["plain"]:
+        plain, conditional = result["plain"][label], result["conditional"].get(label)
+        if not conditional or not plain["kb"]:
+            continue
+        saved = 100 * (1 - conditional["kb"] / plain["kb"])
+        print(f"{label:<32} {saved:5.1f}% fewer bytes, mean {plain['mean_ms']}ms -> {conditional['mean_ms']}ms")
+
+
+def benchmark(args):
+    client = ApiClient(base_url=args.base_url, retries=0)
+    mongo_client = MongoClient(args.mongo_url)
+    db = mongo_client[args.db_name]
+    user_id = None
+    try:
+        print("1. Registering polling user...")
+        response = client.post("/auth/register", json={
+            "email": f"etag_{uuid.uuid4().hex[:10]}@example.com",
+            "password": "password123",
+            "name": "Polling Test User",
+            "role": "user"
+        })
+        if response.status_code != 200:
+            print(f"❌ Failed to register user: {response.status_code} {response.text}")
+            return None
+        user_id = response.json()["user"]["id"]
+        headers = {**HEADERS, "Authorization": f"Bearer {response.json()['token']}"}
+
+        print(f"2. Seeding {args.letters} letters of {args.content_bytes} bytes...")
+        letter_ids = seed_letters(db, user_id, args.letters, args.content_bytes)
+
+        print(f"3. Polling {args.rounds} rounds without validators...")
+        plain, _ = run_polls(client, headers, letter_ids, args.rounds, args.change_every, conditional=False)
+        print(f"4. Polling {args.rounds} rounds with If-None-Match...")
+        conditional, stale = run_polls(client, headers, letter_ids, args.rounds, args.change_every, conditional=True)
+
+        return {
+            "rounds": args.rounds,
+            "letters": args.letters,
+            "plain": plain,
+            "conditional": conditional,
+            "stale_not_modified": stale
+        }
+    finally:
+        if user_id:
+            db.letters.delete_many({"user_id": user_id})
+            db.users.delete_one({"id": user_id})
+        mongo_client.close()
+        client.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure bytes and latency saved by ETag revalidation of letter polls")
+    parser.add_argument("--base-url", default=None, help="API base URL including /api (default: TTML_BASE_URL/TTML_TARGET)")
+    parser.add_argument("--mongo-url", default=DEFAULT_MONGO_URL)
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument("--letters", type=int, default=20, help="Letters owned by the polling user")
+    parser.add_argument("--content-bytes", type=int, default=4000, help="Size of each letter body")
+    parser.add_argument("--rounds", type=int, default=200, help="Poll rounds per run (list + one letter each)")
+    parser.add_argument("--change-every", type=int, default=25, help="Bump a letter's stage every N rounds (0 = never)")
+    parser.add_argument("--json", dest="json_path", help="Write the result as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = benchmark(args)
+    if result is None:
+        return 1
+
+    print_result(result)
+    if result["stale_not_modified"]:
+        print(f"\n❌ {result['stale_not_modified']} poll(s) got 304 right after their letter changed")
+    else:
+        print("\n✅ Every change was picked up by the next conditional poll")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Result written to {args.json_path}")
+    return 1 if result["stale_not_modified"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Asyncio Load Generator for Talk To My Lawyer
+Replays the backend_test.py / auth_test.py scenarios (register -> login -> /auth/me ->
+/letters/generate -> /letters) as concurrent virtual users and reports per-endpoint
+p50/p95/p99 latency and throughput.
+
+Usage:
+    python -m tests.load --users 50 --ramp-up 10
+    python -m tests.load --users 500 --ramp-up 60 --iterations 3 --json load.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from tests.client import HEADERS, resolve_base_url
+
+# Configuration
+DEFAULT_BASE_URL = resolve_base_url("local")
+
+LETTER_REQUEST = {
+    "title": "Load Test Demand Letter",
+    "prompt": "Generate a professional demand letter for unpaid consulting services",
+    "letterType": "demand",
+    "formData": {
+        "fullName": "Sarah Johnson",
+        "yourAddress": "123 Business St, Professional City, NY 10001",
+        "recipientName": "ABC Corporation",
+        "recipientAddress": "456 Corporate Ave, Business Town, NY 10002",
+        "briefDescription": "Unpaid invoice for consulting services",
+        "detailedInformation": "Invoice #2024-001 for $2,500 consulting services remains unpaid after 45 days",
+        "whatToAchieve": "Payment of outstanding invoice within 14 days"
+    },
+    "urgencyLevel": "standard"
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadStats:
+    """Collects per-endpoint latencies, status codes and transport errors"""
+
+    def __init__(self):
+        self.samples = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, endpoint, latency, status):
+        entry = self.samples.setdefault(endpoint, {'latencies': [], 'statuses': {}, 'errors': 0})
+        entry['latencies'].append(latency)
+        entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+        if status == 'error' or (isinstance(status, int) and status >= 500):
+            entry['errors'] += 1
+
+    def summary(self):
+        elapsed = max((self.finished_at or time.perf_counter()) - (self.started_at or 0), 1e-9)
+        report = {}
+        for endpoint, entry in self.samples.items():
+            latencies = sorted(entry['latencies'])
+            report[endpoint] = {
+                'requests': len(latencies),
+                'errors': entry['errors'],
+                'statuses': {str(k): v for k, v in sorted(entry['statuses'].items(), key=lambda kv: str(kv[0]))},
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                'throughput_rps': round(len(latencies) / elapsed, 2)
+            }
+        return {'elapsed_s': round(elapsed, 2), 'endpoints': report}
+
+
+class VirtualUser:
+    """One simulated user walking through the register/login/letters scenario"""
+
+    def __init__(self, session, base_url, stats, index, grant_letters=None, stream=False, async_jobs=False):
+        self.session = session
+        self.base_url = base_url
+        self.stats = stats
+        self.index = index
+        self.grant_letters = grant_letters
+        self.stream = stream
+        self.async_jobs = async_jobs
+        self.email = f"load.{uuid.uuid4().hex[:12]}@example.com"
+        self.password = "LoadTestPass123!"
+        self.token = None
+        self.user_id = None
+
+    async def call(self, method, path, endpoint=None, ttfb=False, **kwargs):
+        """Issue one request and record its latency under a normalized endpoint label.
+
+        With ttfb=True the time to the first body chunk is recorded as well, under
+        "<label> [ttfb]", which is what matters for streamed (SSE) responses.
+        """
+        label = endpoint or f"{method} {path}"
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                if ttfb:
+                    first = await response.content.readany()
+                    self.stats.record(f"{label} [ttfb]", time.perf_counter() - started, response.status)
+                    body = first + await response.read()
+                else:
+                    body = await response.read()
+                self.stats.record(label, time.perf_counter() - started, response.status)
+                if response.content_type == 'application/json' and body:
+                    return response.status, json.loads(body)
+                return response.status, None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats.record(label, time.perf_counter() - started, 'error')
+            return None, None
+
+    def auth_headers(self):
+        return {**HEADERS, "Authorization": f"Bearer {self.token}"}
+
+    async def register(self):
+        status, data = await self.call("POST", "/auth/register", headers=HEADERS, json={
+            "email": self.email,
+            "password": self.password,
+            "name": f"Load User {self.index}",
+            "role": "user"
+        })
+        if status == 200 and data:
+            self.token = data.get('token')
+            self.user_id = data.get('user', {}).get('id')
+        return status == 200
+
+    async def login(self):
+        status, data = await self.call("POST", "/auth/login", headers=HEADERS, json={
+            "email": self.email,
+            "password": self.password
+        })
+        if status == 200 and data:
+            self.token = data.get('token')
+        return status == 200
+
+    async def generate_async(self, poll_interval=0.5, deadline=120):
+        """Queue a generation with Prefer: respond-async and poll /jobs/{id} until it settles"""
+        started = time.perf_counter()
+        status, data = await self.call("POST", "/letters/generate", endpoint="POST /letters/generate (async)",
+                                       headers={**self.auth_headers(), "Prefer": "respond-async"}, json=LETTER_REQUEST)
+        if status != 202 or not data:
+            return
+        job_id = data.get('job_id')
+        while time.perf_counter() - started < deadline:
+            await asyncio.sleep(poll_interval)
+            status, data = await self.call("GET", f"/jobs/{job_id}", endpoint="GET /jobs/{id}", headers=self.auth_headers())
+            job_status = (data or {}).get('job', {}).get('status')
+            if job_status in ('completed', 'failed'):
+                self.stats.record(f"job {job_status} (end-to-end)", time.perf_counter() - started, 200)
+                return
+        self.stats.record("job timeout (end-to-end)", time.perf_counter() - started, 'error')
+
+    async def run(self, iterations, generate=True):
+        if not await self.register():
+            return
+        if self.grant_letters:
+            await asyncio.to_thread(self.grant_letters, self.user_id)
+        for _ in range(iterations):
+            if not await self.login():
+                return
+            await self.call("GET", "/auth/me", headers=self.auth_headers())
+            if generate and self.async_jobs:
+                await self.generate_async()
+            elif generate and self.stream:
+                await self.call("POST", "/letters/generate", endpoint="POST /letters/generate (sse)", ttfb=True,
+                                headers={**self.auth_headers(), "Accept": "text/event-stream"}, json=LETTER_REQUEST)
+            elif generate:
+                await self.call("POST", "/letters/generate", headers=self.auth_headers(), json=LETTER_REQUEST)
+            await self.call("GET", "/letters", headers=self.auth_headers())
+
+
+def make_letter_granter(mongo_url, db_name, letters):
+    """Return a callable that upgrades a user to a paid subscription, as openai_test.py does"""
+    from pymongo import MongoClient
+
+    db = MongoClient(mongo_url)[db_name]
+
+    def grant(user_id):
+        db.users.update_one(
+            {"id": user_id},
+            {
+                "$set": {
+                    "subscription.status": "paid",
+                    "subscription.planId": f"pi_load_{uuid.uuid4()}",
+                    "subscription.packageType": "8letters",
+                    "subscription.lettersRemaining": letters,
+                    "subscription.currentPeriodEnd": datetime.now() + timedelta(days=365),
+                    "updated_at": datetime.now()
+                }
+            }
+        )
+
+    return grant
+
+
+async def run_load(base_url, users, ramp_up, iterations, generate=True, timeout=60, grant_letters=None, stream=False,
+                   async_jobs=False):
+    """Start `users` virtual users spread evenly over `ramp_up` seconds and wait for them all"""
+    stats = LoadStats()
+    connector = aiohttp.TCPConnector(limit=users)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        async def start_user(index):
+            if users > 1 and ramp_up > 0:
+                await asyncio.sleep(index * ramp_up / users)
+            await VirtualUser(session, base_url, stats, index, grant_letters, stream, async_jobs).run(iterations, generate)
+
+        stats.started_at = time.perf_counter()
+        await asyncio.gather(*(start_user(i) for i in range(users)))
+        stats.finished_at = time.perf_counter()
+
+    return stats
+
+
+def print_report(summary):
+    print("\n" + "=" * 100)
+    print("📊 LOAD TEST SUMMARY")
+    print("=" * 100)
+    print(f"{'Endpoint':<28}{'Reqs':>8}{'Errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>10}  Statuses")
+    for endpoint, row in summary['endpoints'].items():
+        print(f"{endpoint:<28}{row['requests']:>8}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}{row['throughput_rps']:>10}  {row['statuses']}")
+    print(f"\nWall time: {summary['elapsed_s']}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Asyncio load generator for the Talk To My Lawyer API")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API base URL including /api")
+    parser.add_argument("--users", type=int, default=50, help="Number of concurrent virtual users")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which users are started")
+    parser.add_argument("--iterations", type=int, default=1, help="Login/me/generate/letters loops per user")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--skip-generate", action="store_true", help="Leave /letters/generate out of the scenario")
+    parser.add_argument("--stream", action="store_true", help="Request /letters/generate as Server-Sent Events")
+    parser.add_argument("--async-jobs", action="store_true", help="Queue generations (202) and poll /jobs/{id}")
+    parser.add_argument("--mongo-url", help="Grant each virtual user paid letters directly in MongoDB")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "letterdash_db"))
+    parser.add_argument("--letters", type=int, default=10, help="Letters granted per user with --mongo-url")
+    parser.add_argument("--json", dest="json_path", help="Write the summary as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    grant_letters = make_letter_granter(args.mongo_url, args.db_name, args.letters) if args.mongo_url else None
+
+    print(f"🚀 Starting load run: {args.users} users, {args.ramp_up}s ramp-up, "
+          f"{args.iterations} iteration(s) against {args.base_url}")
+    stats = asyncio.run(run_load(
+        args.base_url, args.users, args.ramp_up, args.iterations,
+        generate=not args.skip_generate, timeout=args.timeout, grant_letters=grant_letters, stream=args.stream,
+        async_jobs=args.async_jobs
+    ))
+    summary = stats.summary()
+    print_report(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.json_path}")
+
+    total_errors = sum(row['errors'] for row in summary['endpoints'].values())
+    return 0 if total_errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
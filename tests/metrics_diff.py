@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Metrics Snapshot Diff for Talk To My Lawyer
+Scrapes GET /api/metrics before and after a load run and prints what the run did to the
+server: requests, errors and latency per route, calls and latency per dependency (MongoDB,
+OpenAI, Stripe, Resend), and the gauges (Mongo pool, OpenAI gate, event-loop lag) at the end.
+Percentiles come from the histogram bucket deltas, so other traffic before the run does not
+skew them.
+
+Wrap a command (everything after --):
+    python -m tests.metrics_diff -- python -m tests.load --users 20 --iterations 3
+Or snapshot by hand:
+    python -m tests.metrics_diff --save before.prom
+    ... run anything ...
+    python -m tests.metrics_diff --against before.prom
+"""
+
+import argparse
+import json
+import math
+import re
+import subprocess
+import sys
+
+from tests.client import ApiClient
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+REQUESTS = "ttml_http_requests_total"
+REQUEST_DURATION = "ttml_http_request_duration_seconds"
+DEPENDENCY_DURATION = "ttml_dependency_duration_seconds"
+
+
+def unescape(value):
+    return value.replace('\\n', '\n').replace('\\"', '"').replace('\\\\', '\\')
+
+
+def parse_metrics(text):
+    """Parse Prometheus text exposition into ({(name, labels): value}, {family: type})"""
+    samples = {}
+    types = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("# TYPE "):
+            _, _, family, kind = line.split(None, 3)
+            types[family] = kind
+            continue
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, raw_labels, value = match.groups()
+        labels = tuple(sorted((key, unescape(val)) for key, val in LABEL_RE.findall(raw_labels or "")))
+        samples[(name, labels)] = float(value)
+    return samples, types
+
+
+def scrape(client, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = client.get("/metrics", headers=headers)
+    response.raise_for_status()
+    return response.text
+
+
+def delta(before, after, name, labels):
+    return after.get((name, labels), 0.0) - before.get((name, labels), 0.0)
+
+
+def histogram_quantile(q, buckets):
+    """Estimate a quantile from [(upper_bound, cumulative_count)] like PromQL does"""
+    buckets = sorted(buckets)
+    total = buckets[-1][1] if buckets else 0
+    if total <= 0:
+        return None
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def histogram_deltas(before, after, family, group_by):
+    """Per group: count, sum and bucket deltas of a histogram family"""
+    groups = {}
+    for (name, labels), value in after.items():
+        if not name.startswith(family + "_"):
+            continue
+        label_map = dict(labels)
+        key = tuple(label_map.get(label, "") for label in group_by)
+        group = groups.setdefault(key, {"count": 0.0, "sum": 0.0, "buckets": {}})
+        change = value - before.get((name, labels), 0.0)
+        if name == family + "_count":
+            group["count"] += change
+        elif name == family + "_sum":
+            group["sum"] += change
+        elif name == family + "_bucket":
+            bound = float(label_map["le"])
+            group["buckets"][bound] = group["buckets"].get(bound, 0.0) + change
+    return {key: group for key, group in groups.items() if group["count"] > 0}
+
+
+def latency_row(group):
+    buckets = list(group["buckets"].items())
+    to_ms = lambda seconds: None if seconds is None else round(seconds * 1000, 1)
+    return {
+        "count": int(group["count"]),
+        "mean_ms": to_ms(group["sum"] / group["count"]),
+        "p50_ms": to_ms(histogram_quantile(0.5, buckets)),
+        "p95_ms": to_ms(histogram_quantile(0.95, buckets))
+    }
+
+
+def diff(before_text, after_text):
+    before, _ = parse_metrics(before_text)
+    after, types = parse_metrics(after_text)
+
+    routes = {}
+    for (method, route), group in histogram_deltas(before, after, REQUEST_DURATION, ["method", "route"]).items():
+        routes[f"{method} {route}"] = {**latency_row(group), "statuses": {}}
+    for (name, labels), _ in after.items():
+        if name != REQUESTS:
+            continue
+        label_map = dict(labels)
+        change = int(delta(before, after, name, labels))
+        row = routes.get(f"{label_map['method']} {label_map['route']}")
+        if row is not None and change:
+            row["statuses"][label_map["status"]] = change
+    for row in routes.values():
+        row["errors"] = sum(count for status, count in row["statuses"].items() if int(status) >= 500)
+
+    dependencies = {}
+    groups = histogram_deltas(before, after, DEPENDENCY_DURATION, ["dependency", "operation", "outcome"])
+    for (dependency, operation, outcome), group in groups.items():
+        key = f"{dependency} {operation}"
+        row = dependencies.setdefault(key, {"count": 0, "errors": 0, "sum": 0.0, "buckets": {}})
+        row["count"] += group["count"]
+        row["sum"] += group["sum"]
+        if outcome == "error":
+            row["errors"] += int(group["count"])
+        for bound, count in group["buckets"].items():
+            row["buckets"][bound] = row["buckets"].get(bound, 0.0) + count
+    dependencies = {key: {**latency_row(row), "errors": row["errors"]} for key, row in dependencies.items()}
+
+    gauges = {}
+    for (name, labels), value in after.items():
+        if types.get(name) == "gauge":
+            suffix = ",".join(f"{key}={val}" for key, val in labels)
+            gauges[f"{name}{{{suffix}}}" if suffix else name] = value
+
+    return {"routes": routes, "dependencies": dependencies, "gauges": gauges}
+
+
+def print_report(report):
+    print("\n" + "=" * 100)
+    print("📈 METRICS DIFF")
+    print("=" * 100)
+    print(f"{'Route':<44}{'reqs':>7}{'5xx':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}  statuses")
+    for route, row in sorted(report["routes"].items(), key=lambda item: -item[1]["count"]):
+        print(f"{route:<44}{row['count']:>7}{row['errors']:>6}{str(row['mean_ms']):>10}"
+              f"{str(row['p50_ms']):>10}{str(row['p95_ms']):>10}  {row['statuses']}")
+
+    print("\n" + "-" * 100)
+    print(f"{'Dependency call':<44}{'calls':>7}{'errs':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for call, row in sorted(report["dependencies"].items(), key=lambda item: -item[1]["count"]):
+        print(f"{call:<44}{row['count']:>7}{row['errors']:>6}{str(row['mean_ms']):>10}"
+              f"{str(row['p50_ms']):>10}{str(row['p95_ms']):>10}")
+
+    print("\n" + "-" * 100)
+    print("Gauges after run")
+    for name, value in sorted(report["gauges"].items()):
+        print(f"  {name:<60} {value:g}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Diff /api/metrics snapshots around a load run")
+    parser.add_argument("--base-url", help="API base URL including /api (default: TTML_BASE_URL/TTML_TARGET)")
+    parser.add_argument("--token", help="Bearer token when the server sets METRICS_TOKEN")
+    parser.add_argument("--save", metavar="FILE", help="Write the current snapshot to FILE and exit")
+    parser.add_argument("--against", metavar="FILE", help="Diff the current metrics against a saved snapshot")
+    parser.add_argument("--json", dest="json_path", help="Write the diff as JSON to this path")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to run between snapshots (after --)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = ApiClient(base_url=args.base_url, retries=0)
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+
+    if args.save:
+        with open(args.save, "w") as f:
+            f.write(scrape(client, args.token))
+        print(f"Snapshot written to {args.save}")
+        return 0
+
+    if args.against:
+        with open(args.against) as f:
+            before = f.read()
+    elif command:
+        before = scrape(client, args.token)
+    else:
+        print("❌ Pass --save, --against FILE or a command after --")
+        return 2
+
+    exit_code = 0
+    if command:
+        print(f"🚀 Running: {' '.join(command)}")
+        exit_code = subprocess.call(command)
+
+    report = diff(before, scrape(client, args.token))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Diff written to {args.json_path}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
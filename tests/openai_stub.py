@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-Compatible Stand-in for Talk To My Lawyer
+Serves /v1/chat/completions (plain and streaming) with configurable time-to-first-token,
+token rate, error rate, 429 bursts and a provider-style concurrency limit (429 once more
+than --max-concurrency requests are in flight) so generation throughput and tail latency
+can be benchmarked offline and deterministically.
+
+Usage:
+    python -m tests.openai_stub --port 8090 --ttft 0.4 --tokens-per-sec 60
+    OPENAI_BASE_URL=http://localhost:8090/v1 OPENAI_API_KEY=stub yarn dev
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LETTER_WORDS = (
+    "Dear Sir or Madam, this letter serves as formal notice regarding the outstanding matter "
+    "described below. Despite previous correspondence, the obligation remains unresolved and "
+    "we hereby request prompt action within fourteen days of the date of this letter. Should "
+    "you fail to respond, our client reserves all rights and remedies available under applicable "
+    "law, including the initiation of legal proceedings without further notice. We trust that "
+    "this matter can be resolved amicably and look forward to your timely response. "
+).split()
+
+
+class StubConfig:
+    """Latency and failure profile shared by all handler threads"""
+
+    def __init__(self, ttft=0.3, tokens_per_sec=50.0, completion_tokens=400, error_rate=0.0,
+                 burst_every=0, burst_length=0, retry_after=1, max_concurrency=0, seed=1234):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.max_concurrency = max_concurrency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.stats = {'requests': 0, 'completed': 0, 'streamed': 0, 'rate_limited': 0, 'errors': 0, 'in_flight': 0,
+                      'max_in_flight': 0}
+
+    def admit(self):
+        """Number the request and decide its fate: 'ok', 'rate_limited' or 'error'"""
+        with self.lock:
+            index = self.request_count
+            self.request_count += 1
+            self.stats['requests'] += 1
+            if self.burst_every and index % self.burst_every < self.burst_length:
+                self.stats['rate_limited'] += 1
+                return 'rate_limited'
+            if self.max_concurrency and self.stats['in_flight'] >= self.max_concurrency:
+                self.stats['rate_limited'] += 1
+                return 'rate_limited'
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 'error'
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+            return 'ok'
+
+    def finish(self, streamed):
+        with self.lock:
+            self.stats['in_flight'] -= 1
+            self.stats['completed'] += 1
+            if streamed:
+                self.stats['streamed'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def completion_tokens(count):
+    """Deterministic letter-like text split into roughly one word per token"""
+    return [LETTER_WORDS[i % len(LETTER_WORDS)] + " " for i in range(count)]
+
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data):
+        payload = data.encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/v1/models":
+            self.send_json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]})
+        elif self.path == "/_stats":
+            self.send_json(200, self.config.snapshot())
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if self.path != "/v1/chat/completions":
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+
+        verdict = config.admit()
+        if verdict == 'rate_limited':
+            self.send_json(429, {"error": {"message": "Rate limit reached for gpt-4o-mini", "type": "rate_limit_exceeded"}},
+                           {"Retry-After": str(config.retry_after)})
+            return
+        if verdict == 'error':
+            self.send_json(500, {"error": {"message": "The server had an error while processing your request", "type": "server_error"}})
+            return
+
+        model = request.get("model", "gpt-4o-mini")
+        max_tokens = request.get("max_tokens") or config.completion_tokens
+        tokens = completion_tokens(min(max_tokens, config.completion_tokens))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        delay = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+        streamed = bool(request.get("stream"))
+
+        try:
+            time.sleep(config.ttft)
+            if streamed:
+                self.stream_completion(completion_id, created, model, tokens, delay)
+            else:
+                time.sleep(delay * len(tokens))
+                prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+                self.send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens)
+                    }
+                })
+        finally:
+            config.finish(streamed)
+
+    def stream_completion(self, completion_id, created, model, tokens, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None):
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }) + "\n\n"
+
+        self.send_chunk(chunk({"role": "assistant", "content": ""}))
+        for token in tokens:
+            self.send_chunk(chunk({"content": token}))
+            if delay:
+                time.sleep(delay)
+        self.send_chunk(chunk({}, "stop"))
+        self.send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(host, port, config):
+    handler = type("ConfiguredOpenAIStubHandler", (OpenAIStubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="Token emission rate")
+    parser.add_argument("--completion-tokens", type=int, default=400, help="Upper bound on tokens per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--burst-every", type=int, default=0, help="Start a 429 burst every N requests")
+    parser.add_argument("--burst-length", type=int, default=0, help="Consecutive 429s per burst")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Answer 429 while this many requests are in flight (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for the error schedule")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = StubConfig(
+        ttft=args.ttft,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        retry_after=args.retry_after,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"🤖 OpenAI stand-in listening on http://{args.host}:{args.port}/v1 "
+          f"(ttft={args.ttft}s, {args.tokens_per_sec} tok/s, error_rate={args.error_rate}, "
+          f"max_concurrency={args.max_concurrency or 'unlimited'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Final stats: {config.snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Local Resend-Compatible Stand-in for Talk To My Lawyer
+Serves POST /emails and POST /emails/batch with configurable latency, 500 errors, a
+provider-style request rate limit (429 rate_limit_exceeded) and recipients that are always
+rejected (422 validation_error), so the email outbox worker's batching, retries and
+failure isolation can be exercised offline. GET /_stats reports what was accepted,
+including any message delivered more than once.
+
+Usage:
+    python -m tests.resend_stub --port 8091 --latency 0.2 --error-rate 0.1 --rate-limit 5
+    RESEND_BASE_URL=http://localhost:8091 RESEND_API_KEY=re_stub yarn dev
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_BATCH = 100
+
+
+class StubConfig:
+    """Latency and failure profile shared by all handler threads"""
+
+    def __init__(self, latency=0.1, per_email_latency=0.005, error_rate=0.0, rate_limit=0.0,
+                 reject_domain="reject.test", seed=1234):
+        self.latency = latency
+        self.per_email_latency = per_email_latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.reject_domain = reject_domain
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_started = time.monotonic()
+        self.window_requests = 0
+        self.delivered = {}
+        self.stats = {'requests': 0, 'batches': 0, 'emails_accepted': 0, 'rate_limited': 0, 'errors': 0,
+                      'rejected': 0, 'duplicate_deliveries': 0, 'max_batch_size': 0}
+
+    def admit(self):
+        """Decide the request's fate: 'ok', 'rate_limited' or 'error'"""
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self.window_started >= 1.0:
+                    self.window_started = now
+                    self.window_requests = 0
+                self.window_requests += 1
+                if self.window_requests > self.rate_limit:
+                    self.stats['rate_limited'] += 1
+                    return 'rate_limited'
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 'error'
+            return 'ok'
+
+    def accept(self, emails, batch):
+        """Record accepted emails and return their message ids"""
+        ids = []
+        with self.lock:
+            if batch:
+                self.stats['batches'] += 1
+            self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(emails))
+            for email in emails:
+                fingerprint = hashlib.sha256(json.dumps(
+                    [email.get("to"), email.get("subject"), email.get("html")], sort_keys=True).encode()).hexdigest()
+                self.delivered[fingerprint] = self.delivered.get(fingerprint, 0) + 1
+                if self.delivered[fingerprint] > 1:
+                    self.stats['duplicate_deliveries'] += 1
+                self.stats['emails_accepted'] += 1
+                ids.append(str(uuid.uuid4()))
+        return ids
+
+    def reject(self):
+        with self.lock:
+            self.stats['rejected'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def recipients(email):
+    to = email.get("to")
+    return to if isinstance(to, list) else [to]
+
+
+class ResendStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, name, message, extra_headers=None):
+        self.send_json(status, {"statusCode": status, "name": name, "message": message}, extra_headers)
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            self.send_json(200, self.config.snapshot())
+        else:
+            self.send_error_json(404, "not_found", f"Unknown path {self.path}")
+
+    def do_POST(self):
+        if self.path not in ("/emails", "/emails/batch"):
+            self.send_error_json(404, "not_found", f"Unknown path {self.path}")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        batch = self.path == "/emails/batch"
+        emails = payload if batch else [payload]
+        config = self.config
+
+        verdict = config.admit()
+        if verdict == 'rate_limited':
+            self.send_error_json(429, "rate_limit_exceeded",
+                                 f"Too many requests. You can only make {config.rate_limit:g} requests per second.",
+                                 {"Retry-After": "1"})
+            return
+        if verdict == 'error':
+            self.send_error_json(500, "application_error", "An unexpected error occurred")
+            return
+
+        if batch and not 1 <= len(emails) <= MAX_BATCH:
+            self.send_error_json(422, "validation_error", f"Batch must contain 1-{MAX_BATCH} emails")
+            return
+        for email in emails:
+            missing = [field for field in ("from", "to", "subject") if not email.get(field)]
+            if missing:
+                self.send_error_json(422, "missing_required_field", f"Missing `{missing[0]}` field.")
+                return
+            if any(str(to).endswith("@" + config.reject_domain) for to in recipients(email)):
+                # Like the real batch API, one invalid email fails the whole request
+                config.reject()
+                self.send_error_json(422, "validation_error", f"Invalid `to` field: {recipients(email)}")
+                return
+
+        time.sleep(config.latency + config.per_email_latency * len(emails))
+        ids = config.accept(emails, batch)
+        if batch:
+            self.send_json(200, {"data": [{"id": message_id} for message_id in ids]})
+        else:
+            self.send_json(200, {"id": ids[0]})
+
+
+def make_server(host, port, config):
+    handler = type("ConfiguredResendStubHandler", (ResendStubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local Resend-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--per-email-latency", type=float, default=0.005, help="Extra seconds per email in a request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Requests per second before answering 429 (0 = unlimited; Resend's default is 2)")
+    parser.add_argument("--reject-domain", default="reject.test",
+                        help="Recipients at this domain are rejected with validation_error")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for the error schedule")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = StubConfig(
+        latency=args.latency,
+        per_email_latency=args.per_email_latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        reject_domain=args.reject_domain,
+        seed=args.seed
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"📧 Resend stand-in listening on http://{args.host}:{args.port} "
+          f"(latency={args.latency}s, error_rate={args.error_rate}, "
+          f"rate_limit={args.rate_limit or 'unlimited'}/s, rejects @{args.reject_domain})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Final stats: {config.snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
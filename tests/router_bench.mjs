@@ -0,0 +1,90 @@
+#!/usr/bin/env node
+/*
+ * Router Dispatch Micro-benchmark for Talk To My Lawyer
+ * Compares lib/router.js against the linear if-chain it replaced as the route table
+ * grows: the chain pays for every earlier comparison, the trie only for path depth.
+ *
+ *   node --experimental-detect-module tests/router_bench.mjs [--iterations 200000]
+ *
+ * (The flag lets Node 20 load the ESM lib file; it is the default from Node 22.7.)
+ */
+
+import { Router } from '../lib/router.js'
+
+const args = process.argv.slice(2)
+const flag = (name, fallback) => {
+  const index = args.indexOf(name)
+  return index === -1 ? fallback : Number(args[index + 1])
+}
+const ITERATIONS = flag('--iterations', 200000)
+const SIZES = [25, 50, 100, 200, 400, 800]
+
+// Accumulated so the lookups cannot be optimised away
+let sink = 0
+
+// Synthetic routes shaped like the real table: static paths plus /{resource}/:id/{action}
+function buildRoutes(count) {
+  const routes = []
+  for (let i = 0; routes.length < count; i++) {
+    routes.push({ method: 'GET', pattern: `/resource${i}` })
+    routes.push({ method: 'POST', pattern: `/resource${i}/create` })
+    routes.push({ method: 'GET', pattern: `/resource${i}/:id` })
+    routes.push({ method: 'PUT', pattern: `/resource${i}/:id/stage` })
+  }
+  return routes.slice(0, count)
+}
+
+// The old handleRoute: one predicate per route, tested in registration order
+function buildChain(routes) {
+  return routes.map(({ method, pattern }) => {
+    const parts = pattern.split('/')
+    const prefix = parts.slice(0, 2).join('/') + '/'
+    if (!pattern.includes(':')) {
+      return (route, m) => route === pattern && m === method
+    }
+    const suffix = parts.length > 3 ? '/' + parts[3] : null
+    return suffix
+      ? (route, m) => route.startsWith(prefix) && route.endsWith(suffix) && m === method
+      : (route, m) => route.startsWith(prefix) && !route.includes('/stage') && m === method
+  })
+}
+
+function time(fn) {
+  for (let i = 0; i < 10000; i++) fn(i) // warm up
+  const started = process.hrtime.bigint()
+  for (let i = 0; i < ITERATIONS; i++) fn(i)
+  return Number(process.hrtime.bigint() - started) / ITERATIONS
+}
+
+function bench(size) {
+  const routes = buildRoutes(size)
+  const router = new Router()
+  routes.forEach(({ method, pattern }) => router.add(method, pattern, () => null))
+  const chain = buildChain(routes)
+
+  // Worst case for the chain: the last registered route, and a miss (the 404 fallback)
+  const last = routes[routes.length - 1]
+  const lastPath = last.pattern.replace(':id', 'abc123')
+  const lastSegments = lastPath.split('/').filter(Boolean)
+  const missSegments = ['not', 'a', 'route']
+
+  return {
+    routes: size,
+    chain_last_ns: time(() => { sink += chain.findIndex(test => test(lastPath, last.method)) }),
+    chain_miss_ns: time(() => { sink += chain.findIndex(test => test('/not/a/route', 'GET')) }),
+    trie_last_ns: time(() => { sink += router.match(last.method, lastSegments) ? 1 : 0 }),
+    trie_miss_ns: time(() => { sink += router.match('GET', missSegments) ? 1 : 0 })
+  }
+}
+
+console.log('='.repeat(78))
+console.log('📊 ROUTER DISPATCH (ns per lookup)')
+console.log('='.repeat(78))
+console.log(`${'routes'.padStart(8)}${'chain last'.padStart(16)}${'chain miss'.padStart(16)}${'trie last'.padStart(16)}${'trie miss'.padStart(16)}`)
+for (const size of SIZES) {
+  const r = bench(size)
+  console.log(
+    `${String(r.routes).padStart(8)}${r.chain_last_ns.toFixed(1).padStart(16)}${r.chain_miss_ns.toFixed(1).padStart(16)}` +
+    `${r.trie_last_ns.toFixed(1).padStart(16)}${r.trie_miss_ns.toFixed(1).padStart(16)}`
+  )
+}
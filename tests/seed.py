@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Bulk Synthetic Data Seeder for Talk To My Lawyer
+Streams users, admins, contractors, coupons and letters shaped exactly like the documents
+route.js writes into MongoDB with batched insert_many, so list and admin endpoints can be
+benchmarked at production data volumes.
+
+Usage:
+    python -m tests.seed --users 10000 --drop
+    python -m tests.seed --users 10000000 --letters-per-user 2.5 --batch-size 10000 --seed 7
+"""
+
+import argparse
+import math
+import os
+import random
+import string
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+# Configuration
+DEFAULT_MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DEFAULT_DB_NAME = os.environ.get("DB_NAME", "letterdash_db")
+COLLECTIONS = ["users", "admins", "contractors", "coupons", "letters"]
+
+FIRST_NAMES = ["Sarah", "Mike", "Jennifer", "David", "Maria", "James", "Linda", "Robert", "Aisha", "Wei",
+               "Carlos", "Emily", "Daniel", "Priya", "Thomas", "Olivia", "Ahmed", "Grace", "Lucas", "Nina"]
+LAST_NAMES = ["Johnson", "Thompson", "Garcia", "Smith", "Chen", "Patel", "Williams", "Brown", "Nguyen", "Lopez",
+              "Miller", "Davis", "Khan", "Wilson", "Anderson", "Taylor", "Moore", "Martin", "Lee", "Clark"]
+LETTER_TYPES = ["demand", "cease_desist", "complaint", "collection", "breach", "settlement", "general"]
+URGENCY_LEVELS = ["standard", "standard", "standard", "urgent", "very_urgent"]
+PACKAGE_TYPES = {"4letters": 4, "6letters": 6, "8letters": 8}
+LETTER_PARAGRAPHS = [
+    "This letter serves as formal notice regarding the outstanding obligation described herein. "
+    "Despite previous correspondence, the matter remains unresolved.",
+    "According to our records, invoice #{n} in the amount of ${amount} has remained unpaid for more "
+    "than {days} days beyond the agreed payment terms.",
+    "We hereby demand that you remit full payment or otherwise cure the breach within fourteen (14) "
+    "days of the date of this letter.",
+    "Should you fail to respond within the stated timeframe, our client reserves all rights and remedies "
+    "available under applicable law, including the initiation of legal proceedings without further notice.",
+    "Nothing in this letter shall be construed as a waiver of any rights or remedies, all of which are "
+    "expressly reserved.",
+    "We trust that this matter can be resolved amicably and look forward to your prompt response. "
+    "Please direct all further communication regarding this matter to the undersigned."
+]
+
+
+class BatchWriter:
+    """Per-collection buffers flushed with insert_many once they reach batch_size"""
+
+    def __init__(self, db, batch_size):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers = {name: [] for name in COLLECTIONS}
+        self.counts = {name: 0 for name in COLLECTIONS}
+
+    def add(self, collection, document):
+        buffer = self.buffers[collection]
+        buffer.append(document)
+        if len(buffer) >= self.batch_size:
+            self.flush(collection)
+
+    def flush(self, collection=None):
+        for name in [collection] if collection else COLLECTIONS:
+            buffer = self.buffers[name]
+            if buffer:
+                self.db[name].insert_many(buffer, ordered=False)
+                self.counts[name] += len(buffer)
+                self.buffers[name] = []
+
+
+class SyntheticData:
+    """Deterministic document factory; every value is drawn from one seeded RNG"""
+
+    def __init__(self, seed, now, password_hash, history_days=730):
+        self.rng = random.Random(seed)
+        self.now = now
+        self.password_hash = password_hash
+        self.history_days = history_days
+
+    def uuid(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def created_at(self, after=None):
+        start = after or self.now - timedelta(days=self.history_days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def role(self, contractor_ratio, admin_ratio):
+        roll = self.rng.random()
+        if roll < admin_ratio:
+            return "admin"
+        if roll < admin_ratio + contractor_ratio:
+            return "contractor"
+        return "user"
+
+    def user(self, index, role, referrer_id, paid_ratio):
+        name = self.name()
+        created_at = self.created_at()
+        if referrer_id:
+            subscription = {"status": "free", "discount_percent": 20, "referred_by": referrer_id}
+        elif role == "user" and self.rng.random() < paid_ratio:
+            package_type = self.rng.choice(list(PACKAGE_TYPES))
+            subscription = {
+                "status": "paid",
+                "planId": f"pi_{self.rng.getrandbits(96):024x}",
+                "packageType": package_type,
+                "lettersRemaining": self.rng.randint(0, PACKAGE_TYPES[package_type]),
+                "currentPeriodEnd": created_at + timedelta(days=365)
+            }
+        else:
+            subscription = {"status": "free", "planId": None, "packageType": None,
+                            "lettersRemaining": 0, "currentPeriodEnd": None}
+
+        user = {
+            "id": self.uuid(),
+            "email": f"{name.lower().replace(' ', '.')}.{index}@example.com",
+            "password": self.password_hash,
+            "name": name,
+            "role": role,
+            "subscription": subscription,
+            "stripeCustomerId": f"cus_{self.rng.getrandbits(64):016x}" if subscription["status"] == "paid" else None,
+            "isActive": self.rng.random() > 0.02,
+            "created_at": created_at,
+            "updated_at": self.created_at(created_at)
+        }
+        if self.rng.random() < 0.7:
+            user["lastLogin"] = self.created_at(created_at)
+        return user
+
+    def admin(self, user):
+        return {
+            "id": self.uuid(),
+            "user_id": user["id"],
+            "permissions": ["manage_users", "manage_contractors", "manage_letters"],
+            "created_at": user["created_at"]
+        }
+
+    def contractor(self, user, index):
+        signups = int(self.rng.paretovariate(1.5)) - 1
+        return {
+            "id": self.uuid(),
+            "user_id": user["id"],
+            "points": signups,
+            "total_signups": signups,
+            # Sequential base36 keeps 5-character referral usernames unique (36^5 contractors)
+            "username": to_base36(index).rjust(5, "0")[-5:],
+            "created_at": user["created_at"]
+        }
+
+    def coupon(self, contractor_user):
+        created_at = self.created_at(contractor_user["created_at"])
+        max_uses = self.rng.choice([10, 50, 100, 100, 500])
+        return {
+            "id": self.uuid(),
+            "contractor_id": contractor_user["id"],
+            "code": "".join(self.rng.choices(string.ascii_uppercase + string.digits, k=9)),
+            "discount_percent": self.rng.choice([5, 10, 15, 20, 25]),
+            "max_uses": max_uses,
+            "current_uses": min(max_uses, int(self.rng.expovariate(1 / (max_uses * 0.3)))),
+            "created_at": created_at,
+            "expires_at": created_at + timedelta(days=self.rng.choice([7, 30, 30, 90, 365]))
+        }
+
+    def content(self, median_bytes, sigma):
+        """Letter body whose length follows a log-normal distribution around median_bytes"""
+        target = int(min(max(self.rng.lognormvariate(math.log(median_bytes), sigma), 200), 40000))
+        parts = []
+        size = 0
+        while size < target:
+            paragraph = self.rng.choice(LETTER_PARAGRAPHS).format(
+                n=self.rng.randint(1000, 9999), amount=self.rng.randint(250, 25000), days=self.rng.randint(30, 120))
+            parts.append(paragraph)
+            size += len(paragraph) + 2
+        return "\n\n".join(parts)[:target]
+
+    def letter(self, user, median_bytes, sigma):
+        created_at = self.created_at(user["created_at"])
+        submitted = self.rng.random() < 0.15
+        letter_type = self.rng.choice(LETTER_TYPES)
+        return {
+            "id": self.uuid(),
+            "user_id": user["id"],
+            "title": f"{letter_type.replace('_', ' ').title()} Letter",
+            "content": "" if submitted else self.content(median_bytes, sigma),
+            "letter_type": letter_type,
+            "form_data": {
+                "fullName": user["name"],
+                "yourAddress": f"{self.rng.randint(1, 9999)} Main St, Springfield, NY 10001",
+                "recipientName": f"{self.rng.choice(LAST_NAMES)} Holdings LLC",
+                "recipientAddress": f"{self.rng.randint(1, 9999)} Corporate Ave, Business Town, NY 10002",
+                "briefDescription": "Unpaid invoice for services rendered",
+                "detailedInformation": "Payment remains outstanding beyond the agreed terms",
+                "whatToAchieve": "Payment of the outstanding balance within 14 days"
+            },
+            "urgency_level": self.rng.choice(URGENCY_LEVELS),
+            "status": "submitted" if submitted else "ready",
+            "stage": self.rng.randint(1, 3) if submitted else 4,
+            "professional_generated": not submitted,
+            "created_at": created_at,
+            "updated_at": self.created_at(created_at)
+        }
+
+
+def to_base36(value):
+    digits = string.digits + string.ascii_lowercase
+    encoded = ""
+    while True:
+        value, remainder = divmod(value, 36)
+        encoded = digits[remainder] + encoded
+        if value == 0:
+            return encoded
+
+
+def seed_database(db, args):
+    data = SyntheticData(args.seed, datetime.now(), args.password_hash)
+    writer = BatchWriter(db, args.batch_size)
+    referrers = []
+    contractor_index = 0
+    started = time.perf_counter()
+
+    for index in range(args.users):
+        role = data.role(args.contractor_ratio, args.admin_ratio)
+        referrer_id = None
+        if role == "user" and referrers and data.rng.random() < args.referral_ratio:
+            referrer_id = data.rng.choice(referrers)
+
+        user = data.user(index, role, referrer_id, args.paid_ratio)
+        writer.add("users", user)
+
+        if role == "admin":
+            writer.add("admins", data.admin(user))
+        elif role == "contractor":
+            writer.add("contractors", data.contractor(user, contractor_index))
+            contractor_index += 1
+            if len(referrers) < 10000:
+                referrers.append(user["id"])
+            # Pareto(1.2) has mean 6, so this averages --coupons-per-contractor with a long
+            # tail of very busy contractors
+            coupons = min(int(data.rng.paretovariate(1.2) * args.coupons_per_contractor / 6), args.max_coupons)
+            for _ in range(coupons):
+                writer.add("coupons", data.coupon(user))
+        else:
+            for _ in range(poisson(data.rng, args.letters_per_user)):
+                writer.add("letters", data.letter(user, args.content_median, args.content_sigma))
+
+        if (index + 1) % args.progress_every == 0:
+            rate = (index + 1) / (time.perf_counter() - started)
+            print(f"   {index + 1:,} users generated ({rate:,.0f} users/s)")
+
+    writer.flush()
+    return writer.counts, time.perf_counter() - started
+
+
+def poisson(rng, mean):
+    """Knuth's Poisson sampler; fine for the small per-user means used here"""
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed MongoDB with synthetic Talk To My Lawyer data")
+    parser.add_argument("--mongo-url", default=DEFAULT_MONGO_URL)
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument("--users", type=int, default=10000, help="Total users to create (10k - 10M)")
+    parser.add_argument("--letters-per-user", type=float, default=3.0, help="Mean letters per regular user")
+    parser.add_argument("--coupons-per-contractor", type=float, default=5.0, help="Typical coupons per contractor")
+    parser.add_argument("--max-coupons", type=int, default=5000, help="Cap on coupons for a single contractor")
+    parser.add_argument("--contractor-ratio", type=float, default=0.05)
+    parser.add_argument("--admin-ratio", type=float, default=0.001)
+    parser.add_argument("--paid-ratio", type=float, default=0.3)
+    parser.add_argument("--referral-ratio", type=float, default=0.1)
+    parser.add_argument("--content-median", type=int, default=2500, help="Median letter body size in bytes")
+    parser.add_argument("--content-sigma", type=float, default=0.6, help="Log-normal spread of letter sizes")
+    parser.add_argument("--password-hash", default="!", help="bcrypt hash stored for every user ('!' = no login)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--progress-every", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--drop", action="store_true", help="Drop the seeded collections first")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = MongoClient(args.mongo_url)
+    db = client[args.db_name]
+
+    if args.drop:
+        for name in COLLECTIONS:
+            db[name].drop()
+        print(f"🧹 Dropped {', '.join(COLLECTIONS)}")
+
+    print(f"🌱 Seeding {args.users:,} users into {args.db_name} (seed={args.seed}, batch={args.batch_size})")
+    counts, elapsed = seed_database(db, args)
+
+    total = sum(counts.values())
+    print(f"\n✅ Inserted {total:,} documents in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} docs/s)")
+    for name, count in counts.items():
+        print(f"   {name:<12} {count:>12,}")
+    client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Signed Stripe Webhook Replay Tool for Talk To My Lawyer
+Generates correctly signed checkout.session.completed / payment_intent.payment_failed events,
+replays them against /webhooks/stripe at a target rate (with duplicate and out-of-order
+delivery) and reports throughput, latency and the resulting database side effects. With
+--mongo-url it waits for the webhook inbox to drain and checks that every event took effect
+exactly once however many times it was delivered.
+
+The API must run with the same secret: STRIPE_WEBHOOK_SECRET=whsec_local_replay yarn dev
+
+Usage:
+    python -m tests.stripe_replay --count 500 --rate 50 --duplicate-rate 0.2 --shuffle-window 8 \\
+        --mongo-url mongodb://localhost:27017
+Duplicate storm (every event delivered 10 times, as fast as possible):
+    python -m tests.stripe_replay --count 200 --rate 0 --duplicate-rate 1 --copies 10 \\
+        --shuffle-window 50 --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import aiohttp
+
+from tests.client import resolve_base_url
+from tests.load import LoadStats
+
+# Configuration
+DEFAULT_BASE_URL = resolve_base_url("local")
+DEFAULT_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "whsec_local_replay")
+PACKAGE_TYPES = ["4letters", "6letters", "8letters"]
+PACKAGE_AMOUNTS = {"4letters": 19999, "6letters": 49999, "8letters": 99999}
+LOG_FLUSH_GRACE_S = 2.0
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Build a Stripe-Signature header value: t=<ts>,v1=<HMAC-SHA256 of "<ts>.<payload>">"""
+    timestamp = int(timestamp or time.time())
+    signed = f"{timestamp}.{payload}".encode()
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_completed_event(rng, user_id, run_id=""):
+    package_type = rng.choice(PACKAGE_TYPES)
+    return {
+        "id": f"evt_{run_id}{rng.getrandbits(96):024x}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(time.time()),
+        "data": {
+            "object": {
+                "id": f"cs_test_{run_id}{rng.getrandbits(96):024x}",
+                "object": "checkout.session",
+                "payment_intent": f"pi_{rng.getrandbits(96):024x}",
+                "amount_total": PACKAGE_AMOUNTS[package_type],
+                "metadata": {"userId": user_id, "packageType": package_type}
+            }
+        }
+    }
+
+
+def payment_failed_event(rng, user_id, run_id=""):
+    return {
+        "id": f"evt_{run_id}{rng.getrandbits(96):024x}",
+        "object": "event",
+        "type": "payment_intent.payment_failed",
+        "created": int(time.time()),
+        "data": {
+            "object": {
+                "id": f"pi_{rng.getrandbits(96):024x}",
+                "object": "payment_intent",
+                "metadata": {"userId": user_id}
+            }
+        }
+    }
+
+
+def build_schedule(rng, user_ids, count, failed_ratio, duplicate_rate, shuffle_window, copies=2, run_id=""):
+    """Return the delivery order: unique events, plus duplicates (each duplicated event is
+    delivered `copies` times in total), shuffled within a window. run_id is mixed into the
+    event and session ids so repeated runs against one database never collide"""
+    events = []
+    for _ in range(count):
+        user_id = rng.choice(user_ids)
+        if rng.random() < failed_ratio:
+            events.append(payment_failed_event(rng, user_id, run_id))
+        else:
+            events.append(checkout_completed_event(rng, user_id, run_id))
+
+    deliveries = []
+    for event in events:
+        deliveries.append(event)
+        if rng.random() < duplicate_rate:
+            deliveries.extend([event] * (copies - 1))
+
+    if shuffle_window > 1:
+        for start in range(0, len(deliveries), shuffle_window):
+            window = deliveries[start:start + shuffle_window]
+            rng.shuffle(window)
+            deliveries[start:start + shuffle_window] = window
+
+    return events, deliveries
+
+
+async def replay(base_url, secret, deliveries, rate, concurrency, timeout):
+    """Send deliveries at `rate` events/sec with at most `concurrency` in flight"""
+    stats = LoadStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    url = f"{base_url}/webhooks/stripe"
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def deliver(event):
+            payload = json.dumps(event, separators=(",", ":"))
+            headers = {"Content-Type": "application/json", "stripe-signature": sign_payload(payload, secret)}
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, data=payload, headers=headers) as response:
+                        body = await response.read()
+                        stats.record(event["type"], time.perf_counter() - started, response.status)
+                        if response.status == 200 and json.loads(body).get("duplicate"):
+                            stats.duplicate_acks += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    stats.record(event["type"], time.perf_counter() - started, 'error')
+
+        tasks = []
+        stats.duplicate_acks = 0
+        stats.started_at = time.perf_counter()
+        for index, event in enumerate(deliveries):
+            if rate > 0:
+                delay = stats.started_at + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(deliver(event)))
+        await asyncio.gather(*tasks)
+        stats.finished_at = time.perf_counter()
+
+    return stats
+
+
+def prepare_database(db, events, users_to_create):
+    """Ensure target users exist and seed payment_sessions rows for the checkout sessions"""
+    if users_to_create:
+        now = datetime.now()
+        db.users.insert_many([{
+            "id": user_id,
+            "email": f"replay.{user_id[:12]}@example.com",
+            "password": "",
+            "name": "Webhook Replay User",
+            "role": "user",
+            "subscription": {"status": "free", "planId": None, "packageType": None,
+                             "lettersRemaining": 0, "currentPeriodEnd": None},
+            "stripeCustomerId": None,
+            "isActive": True,
+            "created_at": now,
+            "updated_at": now
+        } for user_id in users_to_create])
+
+    sessions = [{
+        "id": str(uuid.uuid4()),
+        "user_id": event["data"]["object"]["metadata"]["userId"],
+        "stripe_session_id": event["data"]["object"]["id"],
+        "package_type": event["data"]["object"]["metadata"]["packageType"],
+        "amount": event["data"]["object"]["amount_total"],
+        "status": "created",
+        "created_at": datetime.now()
+    } for event in events if event["type"] == "checkout.session.completed"]
+    if sessions:
+        db.payment_sessions.insert_many(sessions)
+
+
+def wait_for_inbox(db, events, timeout):
+    """Wait until the background processor has finished with every event of this run"""
+    event_ids = [event["id"] for event in events]
+    deadline = time.monotonic() + timeout
+    while True:
+        unfinished = db.webhook_events.count_documents(
+            {"_id": {"$in": event_ids}, "status": {"$in": ["pending", "processing"]}})
+        if unfinished == 0 or time.monotonic() >= deadline:
+            return unfinished
+        time.sleep(0.25)
+
+
+def check_exactly_once(db, events, deliveries, side_effects, duplicate_acks):
+    """Each event stored once, applied once, logged once, and applied in order per user"""
+    event_ids = [event["id"] for event in events]
+    records = list(db.webhook_events.find(
+        {"_id": {"$in": event_ids}},
+        {"ordering_key": 1, "stripe_created": 1, "received_at": 1, "processed_at": 1, "status": 1, "attempts": 1}))
+
+    out_of_order = 0
+    by_key = {}
+    for record in records:
+        if record.get("processed_at"):
+            by_key.setdefault(record["ordering_key"], []).append(record)
+    for rows in by_key.values():
+        rows.sort(key=lambda row: (row["stripe_created"], row["received_at"]))
+        applied = [row["processed_at"] for row in rows]
+        out_of_order += sum(1 for earlier, later in zip(applied, applied[1:]) if later < earlier)
+
+    redelivered = len(deliveries) - len(events)
+    return [
+        ("One inbox row per event", len(records) == len(events), f"{len(records)} rows for {len(events)} events"),
+        ("Every event processed", all(r["status"] == "processed" for r in records),
+         f"{sum(1 for r in records if r['status'] == 'processed')} processed"),
+        ("Redeliveries acked as duplicates", duplicate_acks == redelivered,
+         f"{duplicate_acks} duplicate acks for {redelivered} redeliveries"),
+        ("Applied once (no retries)", all(r.get("attempts") == 1 for r in records),
+         f"{sum(1 for r in records if r.get('attempts', 0) > 1)} events needed retries"),
+        ("One log row per event", side_effects["duplicate_log_rows"] == 0,
+         f"{side_effects['webhook_logs_rows']} rows for {side_effects['webhook_logs_distinct_events']} events"),
+        ("Per-user order respected", out_of_order == 0, f"{out_of_order} events applied before an older one"),
+    ]
+
+
+def collect_side_effects(db, events, user_ids):
+    """Count what the webhook handler actually wrote for this run's events"""
+    event_ids = [event["id"] for event in events]
+    session_ids = [event["data"]["object"]["id"] for event in events if event["type"] == "checkout.session.completed"]
+    log_rows = db.webhook_logs.count_documents({"event_id": {"$in": event_ids}})
+    logged_events = len(db.webhook_logs.distinct("event_id", {"event_id": {"$in": event_ids}}))
+    return {
+        "webhook_logs_rows": log_rows,
+        "webhook_logs_distinct_events": logged_events,
+        "duplicate_log_rows": log_rows - logged_events,
+        "payment_sessions_completed": db.payment_sessions.count_documents(
+            {"stripe_session_id": {"$in": session_ids}, "status": "completed"}),
+        "paid_users": db.users.count_documents({"id": {"$in": user_ids}, "subscription.status": "paid"})
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay signed Stripe webhooks against /webhooks/stripe")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API base URL including /api")
+    parser.add_argument("--secret", default=DEFAULT_SECRET, help="Webhook signing secret shared with the API")
+    parser.add_argument("--count", type=int, default=200, help="Number of unique events")
+    parser.add_argument("--rate", type=float, default=20.0, help="Target deliveries per second (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum deliveries in flight")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Fraction of events delivered more than once")
+    parser.add_argument("--copies", type=int, default=2, help="Total deliveries of each duplicated event")
+    parser.add_argument("--shuffle-window", type=int, default=1, help="Shuffle deliveries within windows of this size")
+    parser.add_argument("--failed-ratio", type=float, default=0.2, help="Fraction of payment_intent.payment_failed events")
+    parser.add_argument("--users", type=int, default=20, help="Synthetic users to spread events over")
+    parser.add_argument("--user-id", action="append", dest="user_ids", help="Existing user id to target (repeatable)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-delivery timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for event mix, ordering and duplicates")
+    parser.add_argument("--run-id", help="Prefix mixed into generated ids (default: random per run, so reruns "
+                        "against the same database create fresh users, sessions and events)")
+    parser.add_argument("--mongo-url", help="Seed users/payment_sessions and report DB side effects")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "letterdash_db"))
+    parser.add_argument("--drain-timeout", type=float, default=60.0,
+                        help="Seconds to wait for the webhook inbox to finish processing")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    run_id = args.run_id or uuid.uuid4().hex[:8]
+
+    # The seed drives the schedule; the run id keeps the ids unique across runs
+    user_ids = args.user_ids or [str(uuid.uuid5(uuid.NAMESPACE_OID, f"{run_id}:{rng.getrandbits(128)}"))
+                                 for _ in range(args.users)]
+    events, deliveries = build_schedule(rng, user_ids, args.count, args.failed_ratio,
+                                        args.duplicate_rate, args.shuffle_window, args.copies, run_id)
+
+    db = None
+    if args.mongo_url:
+        from pymongo import MongoClient
+        db = MongoClient(args.mongo_url)[args.db_name]
+        prepare_database(db, events, [] if args.user_ids else user_ids)
+
+    print(f"🚀 Replaying {len(deliveries)} deliveries ({len(events)} unique events, run {run_id}) "
+          f"at {args.rate}/s against {args.base_url}/webhooks/stripe")
+    stats = asyncio.run(replay(args.base_url, args.secret, deliveries, args.rate, args.concurrency, args.timeout))
+    summary = stats.summary()
+    summary["run_id"] = run_id
+    summary["deliveries"] = len(deliveries)
+    summary["unique_events"] = len(events)
+    summary["achieved_rate"] = round(len(deliveries) / max(summary["elapsed_s"], 1e-9), 2)
+    summary["duplicate_acks"] = stats.duplicate_acks
+
+    print("\n" + "=" * 90)
+    print("📊 WEBHOOK REPLAY SUMMARY")
+    print("=" * 90)
+    for event_type, row in summary["endpoints"].items():
+        print(f"{event_type:<34} reqs={row['requests']:<6} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+              f"p99={row['p99_ms']}ms statuses={row['statuses']}")
+    print(f"Achieved throughput: {summary['achieved_rate']} deliveries/s over {summary['elapsed_s']}s")
+
+    checks_passed = True
+    if db is not None:
+        drain_started = time.perf_counter()
+        unfinished = wait_for_inbox(db, events, args.drain_timeout)
+        drained_s = time.perf_counter() - drain_started
+        summary["inbox_drain_s"] = round(drained_s, 2)
+        summary["processed_rate"] = round(len(events) / max(summary["elapsed_s"] + drained_s, 1e-9), 2)
+        print(f"Inbox drained {drained_s:.2f}s after the last ack ({unfinished} unfinished); "
+              f"{summary['processed_rate']} events applied/s end to end")
+
+        # webhook_logs rows are bulk-inserted about once a second; let the last batch land
+        time.sleep(LOG_FLUSH_GRACE_S)
+        summary["side_effects"] = collect_side_effects(db, events, user_ids)
+        print(f"DB side effects: {summary['side_effects']}")
+
+        summary["checks"] = {}
+        for name, passed, detail in check_exactly_once(db, events, deliveries, summary["side_effects"],
+                                                       stats.duplicate_acks):
+            print(f"{'✅' if passed else '❌'} {name}: {detail}")
+            summary["checks"][name] = passed
+            checks_passed = checks_passed and passed
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+    failures = sum(row["errors"] for row in summary["endpoints"].values())
+    return 0 if failures == 0 and checks_passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())